@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, EmployeeProfile, Dependent
+from .models import User, EmployeeProfile, Dependent, SlowQueryLog, AuditLog, ExpiryAlert, Agency, DutyStation, Nationality
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -24,6 +24,7 @@ class EmployeeProfileAdmin(admin.ModelAdmin):
     search_fields = ('employee_id', 'name', 'email_official', 'cell_phone_whatsapp')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('agency_project_cluster_office', 'duty_station', 'created_by')
     
     fieldsets = (
         ('Basic Information', {
@@ -50,9 +51,51 @@ class EmployeeProfileAdmin(admin.ModelAdmin):
     # Exclude approval workflow fields from admin
     exclude = ('status', 'submitted_at', 'approved_at', 'approved_by', 'rejection_reason')
 
+@admin.register(Agency, DutyStation, Nationality)
+class LookupTableAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'position')
+    list_editable = ('position',)
+    search_fields = ('name', 'code')
+    ordering = ('position', 'name')
+
 @admin.register(Dependent)
 class DependentAdmin(admin.ModelAdmin):
     list_display = ('name', 'relationship', 'date_of_birth', 'employee_profile')
     list_filter = ('relationship', 'date_of_birth')
     search_fields = ('name', 'employee_profile__name')
     ordering = ('name',)
+
+@admin.register(SlowQueryLog)
+class SlowQueryLogAdmin(admin.ModelAdmin):
+    list_display = ('view_name', 'duration_ms', 'database', 'path', 'created_at')
+    list_filter = ('view_name', 'database', 'created_at')
+    search_fields = ('sql', 'view_name', 'path')
+    ordering = ('-created_at',)
+    readonly_fields = ('view_name', 'path', 'sql', 'params', 'duration_ms', 'database', 'stack', 'explain', 'created_at')
+
+@admin.register(AuditLog)
+class AuditLogAdmin(admin.ModelAdmin):
+    list_display = ('profile_id', 'object_type', 'object_id', 'action', 'actor', 'created_at')
+    list_filter = ('object_type', 'action', 'created_at')
+    search_fields = ('=profile_id', 'actor__username')
+    ordering = ('-created_at',)
+    list_select_related = ('actor',)
+
+    # The audit log is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ExpiryAlert)
+class ExpiryAlertAdmin(admin.ModelAdmin):
+    list_display = ('profile', 'field', 'due_date', 'window', 'created_at')
+    list_filter = ('field', 'window', 'due_date')
+    search_fields = ('profile__employee_id', 'profile__name')
+    ordering = ('due_date',)
+    list_select_related = ('profile',)
+    readonly_fields = ('profile', 'field', 'due_date', 'window', 'created_at')
@@ -0,0 +1,254 @@
+"""
+Demographic analytics over profiles and dependents, computed with NumPy.
+
+The columns the analytics need are read with one query per table into NumPy
+arrays (Demographics), without taking any write lock, and every figure is
+then a vectorized count over those arrays: age pyramids, the number of
+dependents per staff member, children under 18 per zone and blood groups per
+district.
+Arrays and results are cached per worker until the data changes: profile
+and dependent saves in this worker clear the cache, and changes made
+elsewhere (other workers, imports, grid saves) move data_version(), which is
+checked with three single-row index lookups.
+
+NumPy is imported on first use so worker start-up does not pay for it.
+"""
+import threading
+
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AuditLog, Dependent, DutyStation, EmployeeProfile, Nationality
+
+AGE_BAND_YEARS = 5
+# Everyone this old or older shares the last band
+OLDEST_BAND_AGE = 70
+ADULT_AGE = 18
+CHILD_RELATIONSHIPS = ('son', 'daughter')
+# Staff with more dependents than this share the last bucket of the distribution
+MAX_DEPENDENTS_BUCKET = 6
+
+GENDERS = EmployeeProfile._meta.get_field('gender').choices
+BLOOD_GROUPS = [value for value, _ in EmployeeProfile._meta.get_field('blood_group').choices]
+RELATIONSHIPS = Dependent.RELATIONSHIP_CHOICES
+
+# (GET parameter, lookup table, Demographics array) for the analytics filters
+ANALYTICS_FILTERS = [
+    ('duty_station', DutyStation, 'duty_station'),
+    ('nationality', Nationality, 'nationality'),
+]
+
+# Filter combinations whose results are kept per worker
+MAX_CACHED_RESULTS = 64
+
+
+def codes_for(np, values, categories):
+    """Index of each value in categories, -1 for values not in it"""
+    lookup = {category: index for index, category in enumerate(categories)}
+    return np.fromiter((lookup.get(value, -1) for value in values), dtype=np.int16, count=len(values))
+
+
+def ages_on(np, birth_dates, today):
+    """Completed years of age on today for an array of datetime64[D] dates"""
+    years = birth_dates.astype('datetime64[Y]')
+    months = birth_dates.astype('datetime64[M]')
+    birth_year = years.astype(np.int64) + 1970
+    # Month and day as MMDD, to compare with today's without calendar arithmetic
+    month_day = ((months - years).astype(np.int64) + 1) * 100 + (birth_dates - months).astype(np.int64) + 1
+    before_birthday = month_day > today.month * 100 + today.day
+    return today.year - birth_year - before_birthday
+
+
+class Demographics:
+    """The analytics columns of every profile and dependent, as NumPy arrays"""
+
+    def __init__(self, profiles, dependents):
+        import numpy as np
+
+        (profile_ids, birth_dates, genders, nationalities,
+         duty_stations, zones, blood_groups) = zip(*profiles) if profiles else ((),) * 7
+        self.profile_ids = np.array(profile_ids, dtype=np.int64)
+        self.birth_dates = np.array(birth_dates, dtype='datetime64[D]')
+        self.gender = codes_for(np, genders, [value for value, _ in GENDERS])
+        self.nationality = np.array(nationalities, dtype=np.int32)
+        self.duty_station = np.array(duty_stations, dtype=np.int32)
+        self.zones, zone_codes = np.unique(np.array(zones, dtype=str), return_inverse=True)
+        self.zone = zone_codes.astype(np.int32)
+        self.blood_group = codes_for(np, blood_groups, BLOOD_GROUPS)
+
+        owner_ids, relationships, dependent_birth_dates = zip(*dependents) if dependents else ((),) * 3
+        owner_ids = np.array(owner_ids, dtype=np.int64)
+        # Profiles are loaded in pk order, so owners are found by binary search.
+        # Dependents whose profile is not among them are left out.
+        owner = np.minimum(np.searchsorted(self.profile_ids, owner_ids), max(len(self.profile_ids) - 1, 0))
+        found = self.profile_ids[owner] == owner_ids if len(self.profile_ids) else np.zeros(len(owner_ids), dtype=bool)
+        self.owner = owner[found]
+        self.relationship = codes_for(np, relationships, [value for value, _ in RELATIONSHIPS])[found]
+        self.dependent_birth_dates = np.array(dependent_birth_dates, dtype='datetime64[D]')[found]
+
+    @classmethod
+    def load(cls):
+        using = router.db_for_read(EmployeeProfile)
+        connection = connections[using]
+        if connection.vendor == 'sqlite':
+            # No transaction: under WAL every query reads a consistent state
+            # without locking, and dependents read after a profile was
+            # deleted are dropped by __init__
+            return cls(*cls.rows())
+        outermost = not connection.in_atomic_block
+        with transaction.atomic(using=using):
+            if connection.vendor == 'postgresql' and outermost:
+                # Both queries read one snapshot, without taking any write lock
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+            return cls(*cls.rows())
+
+    @staticmethod
+    def rows():
+        profiles = list(
+            EmployeeProfile.objects.order_by('pk').values_list(
+                'pk', 'date_of_birth', 'gender', 'nationality_id', 'duty_station_id', 'zone_key', 'blood_group',
+            )
+        )
+        dependents = list(
+            Dependent.objects.order_by().values_list('employee_profile_id', 'relationship', 'date_of_birth')
+        )
+        return profiles, dependents
+
+    def profile_mask(self, filters):
+        """Boolean mask of the profiles matching {array name: lookup pk}"""
+        import numpy as np
+
+        mask = np.ones(len(self.profile_ids), dtype=bool)
+        for name, pk in filters.items():
+            mask &= getattr(self, name) == pk
+        return mask
+
+
+def band_labels(np):
+    starts = np.arange(0, OLDEST_BAND_AGE + 1, AGE_BAND_YEARS)
+    return [f'{start}-{start + AGE_BAND_YEARS - 1}' for start in starts[:-1]] + [f'{OLDEST_BAND_AGE}+']
+
+
+def age_bands(np, ages):
+    return np.minimum(np.maximum(ages, 0), OLDEST_BAND_AGE) // AGE_BAND_YEARS
+
+
+def pyramid(np, ages, groups, group_choices):
+    """
+    Rows of {'band', 'counts', 'total'} from the oldest band down, counting
+    each age band per group. Values outside group_choices (code -1) are left out.
+    """
+    labels = band_labels(np)
+    known = groups >= 0
+    width = len(group_choices)
+    cells = np.bincount(age_bands(np, ages[known]) * width + groups[known], minlength=len(labels) * width)
+    table = cells.reshape(len(labels), width)
+    return [
+        {'band': label, 'counts': row.tolist(), 'total': int(row.sum())}
+        for label, row in reversed(list(zip(labels, table)))
+    ]
+
+
+def compute(data, filters, today):
+    """Every analytics table for the profiles matching filters, as plain Python values"""
+    import numpy as np
+
+    mask = data.profile_mask(filters)
+    dependent_mask = mask[data.owner] if len(data.owner) else np.zeros(0, dtype=bool)
+    staff_ages = ages_on(np, data.birth_dates[mask], today)
+    dependent_ages = ages_on(np, data.dependent_birth_dates[dependent_mask], today)
+
+    per_staff = np.bincount(data.owner[dependent_mask], minlength=len(data.profile_ids))[mask]
+    distribution = np.bincount(np.minimum(per_staff, MAX_DEPENDENTS_BUCKET), minlength=MAX_DEPENDENTS_BUCKET + 1)
+
+    child_codes = [index for index, (value, _) in enumerate(RELATIONSHIPS) if value in CHILD_RELATIONSHIPS]
+    children = np.isin(data.relationship[dependent_mask], child_codes) & (dependent_ages < ADULT_AGE)
+    child_zones = data.zone[data.owner[dependent_mask][children]]
+    children_by_zone = np.bincount(child_zones, minlength=len(data.zones))
+    staff_by_zone = np.bincount(data.zone[mask], minlength=len(data.zones))
+
+    stations = data.duty_station[mask]
+    station_ids, station_codes = np.unique(stations, return_inverse=True)
+    blood = data.blood_group[mask]
+    known = blood >= 0
+    blood_table = np.bincount(
+        station_codes[known] * len(BLOOD_GROUPS) + blood[known], minlength=len(station_ids) * len(BLOOD_GROUPS),
+    ).reshape(len(station_ids), len(BLOOD_GROUPS))
+
+    return {
+        'staff': int(mask.sum()),
+        'dependents': int(dependent_mask.sum()),
+        'median_age': float(np.median(staff_ages)) if len(staff_ages) else None,
+        'staff_pyramid': pyramid(np, staff_ages, data.gender[mask], GENDERS),
+        'dependent_pyramid': pyramid(np, dependent_ages, data.relationship[dependent_mask], RELATIONSHIPS),
+        'dependents_per_staff': {
+            'mean': float(per_staff.mean()) if len(per_staff) else None,
+            'median': float(np.median(per_staff)) if len(per_staff) else None,
+            'buckets': [
+                {'label': f'{count}+' if count == MAX_DEPENDENTS_BUCKET else str(count), 'staff': int(staff)}
+                for count, staff in enumerate(distribution.tolist())
+            ],
+        },
+        'children_by_zone': sorted(
+            (
+                {'zone': zone.title() or '(No zone)', 'children': children_count, 'staff': staff_count}
+                for zone, children_count, staff_count
+                in zip(data.zones.tolist(), children_by_zone.tolist(), staff_by_zone.tolist())
+                if children_count
+            ),
+            key=lambda row: (-row['children'], row['zone']),
+        ),
+        'blood_by_station': sorted(
+            (
+                {'station': DutyStation.label_for(station_id), 'counts': row.tolist(), 'total': int(row.sum())}
+                for station_id, row in zip(station_ids.tolist(), blood_table)
+            ),
+            key=lambda row: row['station'],
+        ),
+    }
+
+
+def data_version():
+    """Changes whenever a profile or dependent is added, changed or removed anywhere"""
+    latest = [
+        model.objects.order_by('-pk').values_list('pk', flat=True).first()
+        for model in (AuditLog, EmployeeProfile, Dependent)
+    ]
+    return (timezone.localdate(), *latest)
+
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def invalidate_cache():
+    _cache.clear()
+
+
+def demographics(filters=None):
+    """The analytics for {array name: lookup pk} filters, from this worker's cache when the data is unchanged"""
+    filters = dict(sorted((filters or {}).items()))
+    version = data_version()
+    with _lock:
+        if _cache.get('version') != version:
+            _cache.clear()
+            _cache.update(version=version, data=Demographics.load(), results={})
+        results = _cache['results']
+        key = tuple(filters.items())
+        if key not in results:
+            if len(results) >= MAX_CACHED_RESULTS:
+                results.clear()
+            results[key] = compute(_cache['data'], filters, version[0])
+        return results[key]
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+@receiver(post_save, sender=Dependent)
+@receiver(post_delete, sender=Dependent)
+def clear_on_change(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_cache()
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Connect the audit log, compliance summary and analytics cache signal receivers
+        from . import analytics, audit, compliance  # noqa: F401
@@ -0,0 +1,288 @@
+"""
+Field-level audit trail for employee profiles and their dependents.
+
+Every save or delete of an EmployeeProfile or Dependent queues an AuditLog
+entry with the changed fields (old and new values) and the acting user. An
+entry is handed over only when the surrounding transaction commits, so
+rolled-back edits leave no trace. A background thread then writes the queued
+entries in batches with bulk_create, keeping the insert off the request path.
+
+Set AUDIT_LOG_BACKGROUND = False to write each entry synchronously on commit
+instead. Entries still queued when the process exits are flushed by an
+atexit hook. An entry that the background thread is already writing when the
+process is killed can be lost.
+
+A batch that fails with a transient database error (a locked database, a
+dropped connection) is retried with backoff: by the background thread until
+it succeeds, and a few times when written from the calling thread. Other
+errors get each entry of the batch written on its own, so one bad entry does
+not take the rest with it. Entries that still cannot be written are logged
+in full and counted, and wait() reports them.
+"""
+import atexit
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AuditLog, Dependent, EmployeeProfile
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping columns that change on every save and carry no information
+EXCLUDED_FIELDS = {'id', 'created_at', 'updated_at', 'zone_key', 'thana_key', 'version'}
+
+# The acting user's pk, or a callable returning it
+_actor_id = ContextVar('audit_actor_id', default=None)
+
+
+def _current_actor_id():
+    actor_id = _actor_id.get()
+    return actor_id() if callable(actor_id) else actor_id
+
+
+def _request_actor_id(request):
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+class AuditActorMiddleware:
+    """
+    Make the authenticated user the actor of audit entries recorded during the
+    request. The user is only looked up once an entry is recorded, so requests
+    that change nothing (like the emergency roster) need no session query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _actor_id.set(lambda: _request_actor_id(request))
+        try:
+            return self.get_response(request)
+        finally:
+            _actor_id.reset(token)
+
+
+# Seconds before each retry of a batch that failed with a transient error;
+# the background thread keeps retrying at the last delay
+RETRY_DELAYS = (0.5, 1, 2, 5, 10, 30)
+# Writes from the calling thread (synchronous mode, flush) give up after this many retries
+FOREGROUND_RETRIES = 3
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+class AuditWriter:
+    """Background thread that bulk-inserts queued audit entries"""
+
+    def __init__(self, batch_size=500, linger_seconds=0.5):
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        # Entries submitted in this process and not written yet, and those
+        # given up on
+        self._pending = 0
+        self._failed = 0
+        self._idle = threading.Condition()
+
+    def submit(self, entry):
+        self.submit_many([entry])
+
+    def submit_many(self, entries):
+        if not getattr(settings, 'AUDIT_LOG_BACKGROUND', True):
+            self._write(entries, retries=FOREGROUND_RETRIES)
+            return
+        self._ensure_thread()
+        with self._idle:
+            self._pending += len(entries)
+        for entry in entries:
+            self._queue.put(entry)
+
+    def _ensure_thread(self):
+        # Started lazily, and again in each forked worker: threads do not survive fork
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                with self._idle:
+                    self._pending = self._failed = 0
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Give concurrent requests a moment to add to the same batch
+            deadline = time.monotonic() + self.linger_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            # Do not hold a connection (or a pool slot) between batches
+            connections.close_all()
+
+    def flush(self):
+        """Write everything still queued in the calling thread"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch, retries=FOREGROUND_RETRIES)
+
+    def wait(self, timeout=None):
+        """
+        Block until every entry submitted in this process has been written,
+        including a batch the background thread is still writing. Returns
+        False if that takes longer than timeout seconds, or if any entry
+        could not be written.
+        """
+        self.flush()
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout) and not self._failed
+
+    def _settle(self, written, failed=0):
+        with self._idle:
+            self._pending = max(self._pending - written - failed, 0)
+            self._failed += failed
+            self._idle.notify_all()
+
+    def _write(self, batch, retries=None):
+        """Insert batch, retrying transient errors (retries times, or until it succeeds when None)"""
+        for attempt in itertools.count():
+            try:
+                # A savepoint when called inside a transaction, so a failure leaves it usable
+                with transaction.atomic(using=router.db_for_write(AuditLog)):
+                    AuditLog.objects.bulk_create(batch)
+            except TRANSIENT_ERRORS:
+                if retries is not None and attempt >= retries:
+                    logger.exception('Could not write %d audit log entries', len(batch))
+                    self._write_each(batch)
+                    return
+                logger.warning('Could not write %d audit log entries, retrying', len(batch), exc_info=True)
+                connection = connections[router.db_for_write(AuditLog)]
+                if not connection.in_atomic_block:
+                    # Reconnect if the error broke the connection
+                    connection.close_if_unusable_or_obsolete()
+                time.sleep(RETRY_DELAYS[min(attempt, len(RETRY_DELAYS) - 1)])
+            except Exception:
+                logger.exception('Could not write %d audit log entries', len(batch))
+                self._write_each(batch)
+                return
+            else:
+                self._settle(len(batch))
+                return
+
+    def _write_each(self, batch):
+        """Insert entries one at a time after the batch insert failed; log the ones that cannot be written"""
+        written = 0
+        for entry in batch:
+            try:
+                with transaction.atomic(using=router.db_for_write(AuditLog)):
+                    AuditLog.objects.bulk_create([entry])
+            except Exception:
+                logger.exception(
+                    'Lost audit log entry: %s %s of profile %s by user %s at %s: %r',
+                    entry.action, entry.object_type, entry.profile_id, entry.actor_id, entry.created_at, entry.changes,
+                )
+            else:
+                written += 1
+        self._settle(written, len(batch) - written)
+
+
+writer = AuditWriter()
+atexit.register(writer.flush)
+
+
+def _entry(instance, action, changes):
+    if isinstance(instance, Dependent):
+        profile_id, object_type = instance.employee_profile_id, 'dependent'
+    else:
+        profile_id, object_type = instance.pk, 'profile'
+    return AuditLog(
+        profile_id=profile_id,
+        object_type=object_type,
+        object_id=instance.pk,
+        action=action,
+        actor_id=_current_actor_id(),
+        changes=changes,
+        created_at=timezone.now(),
+    )
+
+
+def record(instance, action, changes, using=None):
+    """Queue an audit entry for instance, to be written once the current transaction commits"""
+    entry = _entry(instance, action, changes)
+    transaction.on_commit(lambda: writer.submit(entry), using=using)
+
+
+def record_bulk_create(instances, actor=None, using=None):
+    """Queue create entries for instances inserted with bulk_create, which sends no signals"""
+    token = _actor_id.set(actor.pk) if actor is not None else None
+    try:
+        entries = [
+            _entry(instance, 'create', {
+                field.name: [None, getattr(instance, field.attname)]
+                for field in instance._meta.concrete_fields
+                if field.name not in EXCLUDED_FIELDS and getattr(instance, field.attname) not in (None, '')
+            })
+            for instance in instances
+        ]
+    finally:
+        if token is not None:
+            _actor_id.reset(token)
+    transaction.on_commit(lambda: writer.submit_many(entries), using=using)
+
+
+def record_bulk_update(instances, using=None):
+    """Queue update entries for instances written with bulk_update_dirty, which sends no signals"""
+    entries = [_entry(instance, 'update', changes) for instance in instances if (changes := _diff(instance, False))]
+    transaction.on_commit(lambda: writer.submit_many(entries), using=using)
+
+
+def _diff(instance, created):
+    changes = {}
+    for name, (old, new) in instance.changed_values.items():
+        if name in EXCLUDED_FIELDS:
+            continue
+        # Creations store only the fields that were filled in
+        if created and new in (None, ''):
+            continue
+        changes[name] = [old, new]
+    return changes
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_save, sender=Dependent)
+def record_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    changes = _diff(instance, created)
+    if changes or created:
+        record(instance, 'create' if created else 'update', changes, using=using)
+
+
+@receiver(post_delete, sender=EmployeeProfile)
+@receiver(post_delete, sender=Dependent)
+def record_delete(sender, instance, using=None, **kwargs):
+    record(instance, 'delete', {'name': [instance.name, None]}, using=using)
@@ -0,0 +1,216 @@
+"""
+Training and ID compliance of staff by project, district and zone.
+
+A profile is compliant when its BSAFE, SAT and SBFAT trainings are still
+valid and its ID has not expired, judged on the as_of date of the summary.
+refresh_summary rebuilds the ComplianceSummary rows with one aggregate query
+(nightly, via the refresh_compliance command). In between, every profile save
+or delete, and the bulk imports and grid saves that bypass signals, apply
+their change to the affected rows as a delta once their transaction commits,
+so reading the summary never scans the profiles.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import and_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .expiry import FIELD_LABELS, validity_days
+from .models import Agency, ComplianceSummary, DutyStation, EmployeeProfile
+
+# Date field: its counter column
+COUNTERS = {
+    'id_contact_expiry': 'id_valid',
+    'bsafe': 'bsafe_valid',
+    'sat': 'sat_valid',
+    'sbfat': 'sbfat_valid',
+}
+COUNT_COLUMNS = ('total', *COUNTERS.values(), 'compliant')
+
+# Summary dimension: profile field it groups by
+GROUP_FIELDS = {
+    'agency': 'agency_project_cluster_office',
+    'duty_station': 'duty_station',
+    'zone': 'zone_key',
+}
+WATCHED_FIELDS = frozenset({*GROUP_FIELDS.values(), *COUNTERS})
+
+
+def valid_from(as_of):
+    """{date field: earliest stored date still valid on as_of}"""
+    return {field: as_of - timedelta(days=days) for field, days in validity_days().items()}
+
+
+def valid_q(as_of):
+    return {field: Q(**{f'{field}__gte': limit}) for field, limit in valid_from(as_of).items()}
+
+
+def compliant_q(as_of):
+    return reduce(and_, valid_q(as_of).values())
+
+
+def missing_items(profile, as_of):
+    """Labels of the trainings and ID a profile is not compliant on"""
+    return [
+        FIELD_LABELS[field] for field, limit in valid_from(as_of).items()
+        if getattr(profile, field) is None or getattr(profile, field) < limit
+    ]
+
+
+def summary_keys(values):
+    """The (dimension, key) summary rows a profile with these field values counts in"""
+    keys = [('all', '')]
+    for dimension, field in GROUP_FIELDS.items():
+        value = values[field]
+        keys.append((dimension, '' if value is None else str(value)))
+    return keys
+
+
+def summary_as_of(using=None):
+    return ComplianceSummary.objects.using(using).filter(dimension='all').values_list('as_of', flat=True).first()
+
+
+def _field_values(profile, before=False):
+    values = {}
+    for name in WATCHED_FIELDS:
+        value = getattr(profile, profile._meta.get_field(name).attname)
+        if before and name in profile.changed_values:
+            value = profile.changed_values[name][0]
+        values[name] = value
+    return values
+
+
+def _add(deltas, values, limits, sign):
+    valid = [field for field, limit in limits.items() if values[field] is not None and values[field] >= limit]
+    counts = {'total': sign, **{COUNTERS[field]: sign for field in valid}}
+    if len(valid) == len(COUNTERS):
+        counts['compliant'] = sign
+    for key in summary_keys(values):
+        deltas[key].update(counts)
+
+
+def update_summary(created=(), updated=(), deleted=(), using=None):
+    """
+    Apply created, updated (saved with their changed_values recorded) and
+    deleted profiles to the summary, as of its as_of date.
+
+    The profiles' values are read now, but the summary rows are only changed
+    once the current transaction commits, so a request never holds the lock
+    on the all-staff row (which every profile write touches) while it runs.
+    Does nothing before the first refresh, which counts every profile.
+    """
+    updated = [profile for profile in updated if WATCHED_FIELDS & profile.changed_fields]
+    if not (created or updated or deleted):
+        return
+    changes = [(_field_values(profile), 1) for profile in created]
+    changes += [(_field_values(profile), -1) for profile in deleted]
+    for profile in updated:
+        changes.append((_field_values(profile, before=True), -1))
+        changes.append((_field_values(profile), 1))
+    transaction.on_commit(lambda: apply_changes(changes, using), using=using)
+
+
+def apply_changes(changes, using=None):
+    """Add each (field values, +1 or -1) to the summary rows those values count in"""
+    as_of = summary_as_of(using)
+    if as_of is None:
+        return
+    limits = valid_from(as_of)
+    deltas = defaultdict(Counter)
+    for values, sign in changes:
+        _add(deltas, values, limits, sign)
+
+    now = timezone.now()
+    summaries = ComplianceSummary.objects.using(using)
+    for (dimension, key), delta in deltas.items():
+        delta = {column: value for column, value in delta.items() if value}
+        if not delta:
+            continue
+        updates = {column: F(column) + value for column, value in delta.items()}
+        if summaries.filter(dimension=dimension, key=key).update(updated_at=now, **updates):
+            continue
+        # First profile of a new project, district or zone
+        try:
+            with transaction.atomic(using=using):
+                summaries.create(dimension=dimension, key=key, as_of=as_of, **delta)
+        except IntegrityError:
+            summaries.filter(dimension=dimension, key=key).update(updated_at=now, **updates)
+
+
+def refresh_summary(as_of=None):
+    """
+    Rebuild the summary as of a date (default today) and return its row count.
+
+    All profiles are counted with one GROUP BY over the three group fields;
+    the dimension totals are rolled up from its rows.
+    """
+    as_of = as_of or timezone.localdate()
+    valid = valid_q(as_of)
+    rows = (
+        EmployeeProfile.objects.order_by()
+        .values(*GROUP_FIELDS.values())
+        .annotate(
+            total=Count('pk'),
+            **{COUNTERS[field]: Count('pk', filter=q) for field, q in valid.items()},
+            compliant=Count('pk', filter=reduce(and_, valid.values())),
+        )
+    )
+    totals = defaultdict(Counter)
+    for row in rows:
+        counts = {column: row[column] for column in COUNT_COLUMNS}
+        for key in summary_keys(row):
+            totals[key].update(counts)
+    if not totals:
+        totals[('all', '')] = Counter()
+
+    with transaction.atomic():
+        ComplianceSummary.objects.all().delete()
+        ComplianceSummary.objects.bulk_create([
+            ComplianceSummary(dimension=dimension, key=key, as_of=as_of, **counts)
+            for (dimension, key), counts in totals.items()
+        ])
+    return len(totals)
+
+
+def summary_tables():
+    """
+    The summary for display: (all-staff row, {dimension: rows}) with each
+    row's label and drill-down filter code set, least compliant first.
+    Returns (None, {}) before the first refresh.
+    """
+    overall, tables = None, {dimension: [] for dimension in GROUP_FIELDS}
+    for row in ComplianceSummary.objects.all():
+        if row.dimension == 'all':
+            overall = row
+            continue
+        if row.dimension == 'zone':
+            row.code, row.label = row.key, row.key.title() or '(No zone)'
+        else:
+            lookup = Agency if row.dimension == 'agency' else DutyStation
+            pk = int(row.key) if row.key else None
+            row.code, row.label = lookup.code_for(pk), lookup.label_for(pk)
+        tables[row.dimension].append(row)
+    for rows in tables.values():
+        rows.sort(key=lambda row: (row.compliant / row.total if row.total else 1, row.label))
+    return overall, tables
+
+
+@receiver(post_save, sender=EmployeeProfile)
+def track_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    if created:
+        update_summary(created=[instance], using=using)
+    elif instance._loaded_values is not None:
+        # Without a snapshot the old values are unknown; the nightly refresh catches up
+        update_summary(updated=[instance], using=using)
+
+
+@receiver(post_delete, sender=EmployeeProfile)
+def track_delete(sender, instance, using=None, **kwargs):
+    update_summary(deleted=[instance], using=using)
@@ -0,0 +1,259 @@
+"""
+Read-only emergency roster served from a snapshot file.
+
+When the database is overloaded or down, wardens still need names, phone
+numbers, emergency contacts, blood groups and dependents. build_snapshot
+writes these contact-critical fields of every profile to a gzipped JSON file
+(EMERGENCY_SNAPSHOT_PATH) with two queries; schedule the
+build_emergency_snapshot command to regenerate it. Each worker loads the file
+into memory on first use and again whenever it is replaced, and
+emergency_roster_view serves it without touching the database: access is
+checked against EMERGENCY_SNAPSHOT_TOKEN instead of the session. Every
+response carries the snapshot's age and SHA-256 checksum.
+"""
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+from django.views.decorators.cache import never_cache
+
+from .models import Dependent, DutyStation, EmployeeProfile, normalize_key
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+STAFF_FIELDS = (
+    'id', 'employee_id', 'name', 'cell_phone_whatsapp', 'emergency_contact_number',
+    'emergency_contact_relation', 'zone', 'police_station_thana', 'appointment_unit_based_warden',
+    'radio_call_sign', 'blood_group',
+)
+
+# (GET parameter, snapshot field matched exactly after normalize_key)
+SNAPSHOT_FILTERS = [
+    ('zone', 'zone'),
+    ('thana', 'police_station_thana'),
+    ('warden', 'appointment_unit_based_warden'),
+]
+
+# Staff listed on one HTML page; the JSON response has no limit
+PAGE_MAX_ROWS = 1000
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_path():
+    return Path(getattr(settings, 'EMERGENCY_SNAPSHOT_PATH', settings.BASE_DIR / 'emergency_snapshot.json.gz'))
+
+
+def checksum(staff):
+    """SHA-256 of the staff rows in canonical JSON, stored in the snapshot and verified on load"""
+    body = json.dumps(staff, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def snapshot_rows():
+    """Every profile's contact-critical fields with its dependents, in two queries"""
+    dependents = defaultdict(list)
+    relationships = dict(Dependent.RELATIONSHIP_CHOICES)
+    rows = Dependent.objects.order_by('employee_profile_id', 'name').values_list(
+        'employee_profile_id', 'name', 'relationship', 'date_of_birth',
+    )
+    for profile_id, name, relationship, date_of_birth in rows.iterator(chunk_size=5000):
+        dependents[profile_id].append({
+            'name': name,
+            'relationship': relationships.get(relationship, relationship),
+            'date_of_birth': date_of_birth.isoformat(),
+        })
+
+    staff = []
+    profiles = EmployeeProfile.objects.order_by('name', 'pk').values(*STAFF_FIELDS, 'duty_station')
+    for row in profiles.iterator(chunk_size=5000):
+        row['duty_station'] = DutyStation.label_for(row['duty_station'])
+        row['dependents'] = dependents.get(row['id'], [])
+        staff.append(row)
+    return staff
+
+
+def build_snapshot(path=None):
+    """
+    Write a new snapshot and return its header. The file is written next to
+    the old one and renamed over it, so workers never read a partial file.
+    """
+    path = Path(path or snapshot_path())
+    staff = snapshot_rows()
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'generated_at': timezone.now().isoformat(),
+        'staff_count': len(staff),
+        'dependent_count': sum(len(row['dependents']) for row in staff),
+        'checksum': checksum(staff),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as out:
+            out.write(json.dumps({**header, 'staff': staff}, ensure_ascii=False).encode())
+        os.replace(temp_name, path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+    return header
+
+
+class Snapshot:
+    def __init__(self, data, file_size):
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {data.get('version')!r}")
+        self.staff = data['staff']
+        self.checksum = data['checksum']
+        if checksum(self.staff) != self.checksum:
+            raise SnapshotError('Snapshot checksum does not match its contents')
+        self.generated_at = datetime.fromisoformat(data['generated_at'])
+        self.staff_count = data['staff_count']
+        self.dependent_count = data['dependent_count']
+        self.file_size = file_size
+        # Normalized filter values and their distinct title cased choices, so
+        # requests do no per-row string work
+        self.keys = [
+            {field: normalize_key(row[field]) for _, field in SNAPSHOT_FILTERS}
+            for row in self.staff
+        ]
+        self.choices = {
+            field: sorted({keys[field].title() for keys in self.keys if keys[field]})
+            for _, field in SNAPSHOT_FILTERS
+        }
+
+    @classmethod
+    def load(cls, path):
+        try:
+            raw = Path(path).read_bytes()
+            return cls(json.loads(gzip.decompress(raw)), len(raw))
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            raise SnapshotError(f'Could not read {path}: {exc}') from exc
+
+    def age_seconds(self, now=None):
+        return max(0, int(((now or timezone.now()) - self.generated_at).total_seconds()))
+
+    def search(self, filters, query=''):
+        """Staff rows matching every filter and, when given, a name or employee ID fragment"""
+        wanted = {field: normalize_key(filters[param]) for param, field in SNAPSHOT_FILTERS if param in filters}
+        query = normalize_key(query)
+        return [
+            row for row, keys in zip(self.staff, self.keys)
+            if all(keys[field] == value for field, value in wanted.items())
+            and (not query or query in row['name'].casefold() or query in row['employee_id'].casefold())
+        ]
+
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def current_snapshot():
+    """
+    This worker's copy of the snapshot, reloaded when the file changes.
+    A snapshot that fails to load leaves the previous copy in use until the
+    file changes again.
+    """
+    path = snapshot_path()
+    try:
+        stat = path.stat()
+    except OSError:
+        stat = None
+    signature = (str(path), stat.st_mtime_ns, stat.st_size) if stat else None
+    cached = _loaded.get('snapshot')
+    if cached is not None and signature in (None, _loaded.get('signature'), _loaded.get('failed')):
+        return cached
+    if signature is None:
+        raise SnapshotError(f'No snapshot at {path}; run build_emergency_snapshot')
+    with _lock:
+        if _loaded.get('signature') != signature:
+            try:
+                snapshot = Snapshot.load(path)
+            except SnapshotError:
+                if cached is None:
+                    raise
+                _loaded['failed'] = signature
+                logger.exception('Keeping the previous emergency snapshot')
+                return cached
+            _loaded.update(snapshot=snapshot, signature=signature)
+    return _loaded['snapshot']
+
+
+def token_allowed(request):
+    expected = getattr(settings, 'EMERGENCY_SNAPSHOT_TOKEN', '')
+    supplied = request.META.get('HTTP_X_EMERGENCY_TOKEN') or request.GET.get('token', '')
+    return bool(expected) and hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+def snapshot_headers(response, snapshot):
+    response['X-Snapshot-Generated-At'] = snapshot.generated_at.isoformat()
+    response['X-Snapshot-Age'] = str(snapshot.age_seconds())
+    response['X-Snapshot-Checksum'] = snapshot.checksum
+    return response
+
+
+@never_cache
+def emergency_roster_view(request):
+    """
+    The degraded, read-only roster. Needs no database query: the user is
+    identified by the emergency token rather than the session, and the data
+    comes from this worker's snapshot. ?format=json returns the matching staff.
+    """
+    if not getattr(settings, 'EMERGENCY_SNAPSHOT_TOKEN', ''):
+        raise Http404('The emergency roster is not enabled')
+    if not token_allowed(request):
+        return HttpResponse('A valid emergency token is required.', status=403, content_type='text/plain')
+    try:
+        snapshot = current_snapshot()
+    except SnapshotError as exc:
+        logger.error('Emergency roster unavailable: %s', exc)
+        return HttpResponse('The emergency snapshot is not available.', status=503, content_type='text/plain')
+
+    filters = {param: request.GET[param].strip() for param, _ in SNAPSHOT_FILTERS if request.GET.get(param, '').strip()}
+    query = request.GET.get('q', '').strip()
+    staff = snapshot.search(filters, query)
+    meta = {
+        'generated_at': snapshot.generated_at.isoformat(),
+        'age_seconds': snapshot.age_seconds(),
+        'checksum': snapshot.checksum,
+        'staff_count': snapshot.staff_count,
+        'dependent_count': snapshot.dependent_count,
+        'file_size': snapshot.file_size,
+    }
+    if request.GET.get('format') == 'json':
+        response = JsonResponse({'snapshot': meta, 'filters': filters, 'q': query, 'count': len(staff), 'staff': staff})
+        return snapshot_headers(response, snapshot)
+
+    context = {
+        'snapshot': meta,
+        'generated_at': snapshot.generated_at,
+        'age_minutes': meta['age_seconds'] // 60,
+        'filters': filters,
+        'q': query,
+        'token': request.GET.get('token', ''),
+        'count': len(staff),
+        'dependents': sum(len(row['dependents']) for row in staff),
+        'staff': staff[:PAGE_MAX_ROWS] if filters or query else None,
+        'truncated': len(staff) > PAGE_MAX_ROWS,
+        'page_max_rows': PAGE_MAX_ROWS,
+        'zones': snapshot.choices['zone'],
+        'thanas': snapshot.choices['police_station_thana'],
+        'wardens': snapshot.choices['appointment_unit_based_warden'],
+    }
+    return snapshot_headers(render(request, 'core/emergency_roster.html', context), snapshot)
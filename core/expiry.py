@@ -0,0 +1,167 @@
+"""
+Alerts for ID/contact expiry and training renewal dates.
+
+check_expiries finds, with one indexed range query per date field, every
+profile whose ID expires or whose training falls due within the alert
+windows (by default 60, 30 and 7 days, then once more after the date has
+passed). Each alert is recorded as an ExpiryAlert row, so running the check
+again raises nothing new until the next window is reached. New alerts are
+sent as one notification per employee plus one digest per security admin.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmployeeProfile, ExpiryAlert, Notification, User
+
+DEFAULT_WINDOWS = (60, 30, 7)
+
+# Days a training stays valid after the date it was taken; the ID/contact
+# expiry field holds the due date itself
+DEFAULT_VALIDITY_DAYS = {'bsafe': 3 * 365, 'sat': 3 * 365, 'sbfat': 3 * 365}
+
+FIELD_LABELS = dict(ExpiryAlert.FIELD_CHOICES)
+
+
+def alert_windows():
+    return tuple(getattr(settings, 'EXPIRY_ALERT_WINDOWS', DEFAULT_WINDOWS))
+
+
+def validity_days():
+    """{field: days from the stored date to its due date} for every watched field"""
+    validity = {name: 0 for name in FIELD_LABELS}
+    validity.update(getattr(settings, 'CERTIFICATION_VALIDITY_DAYS', DEFAULT_VALIDITY_DAYS))
+    return validity
+
+
+def window_for(days_left, windows):
+    """The smallest window that still covers days_left; 0 once the due date has passed"""
+    if days_left < 0:
+        return 0
+    return min(window for window in windows if window >= days_left)
+
+
+class DueDate:
+    def __init__(self, profile_id, name, owner_id, field, due_date, window):
+        self.profile_id = profile_id
+        self.name = name
+        self.owner_id = owner_id
+        self.field = field
+        self.due_date = due_date
+        self.window = window
+
+    @property
+    def key(self):
+        return (self.profile_id, self.field, self.due_date, self.window)
+
+    def describe(self, today):
+        label = FIELD_LABELS[self.field]
+        days_left = (self.due_date - today).days
+        if days_left < 0:
+            return f'{label} expired on {self.due_date:%b %d, %Y}'
+        return f'{label} due on {self.due_date:%b %d, %Y} (in {days_left} days)'
+
+
+def find_due_dates(today, windows, overdue_days):
+    """
+    Yield a DueDate for every watched date falling due between overdue_days
+    ago and the largest window from today.
+
+    The range is shifted by each field's validity period so the query is a
+    plain range scan of that field's index.
+    """
+    start, end = today - timedelta(days=overdue_days), today + timedelta(days=max(windows))
+    for field, validity in validity_days().items():
+        offset = timedelta(days=validity)
+        rows = (
+            EmployeeProfile.objects.filter(**{f'{field}__range': (start - offset, end - offset)})
+            .order_by()
+            .values_list('pk', 'name', 'created_by_id', field)
+        )
+        for pk, name, owner_id, value in rows.iterator(chunk_size=2000):
+            due_date = value + offset
+            yield DueDate(pk, name, owner_id, field, due_date, window_for((due_date - today).days, windows))
+
+
+class ExpiryResult:
+    def __init__(self, today, dry_run):
+        self.today = today
+        self.dry_run = dry_run
+        self.due = 0
+        # DueDates not alerted on before, in due date order
+        self.alerts = []
+        self.notifications = 0
+
+
+def digest_message(alerts, today):
+    overdue = sum(1 for alert in alerts if alert.due_date < today)
+    by_field = Counter(FIELD_LABELS[alert.field] for alert in alerts)
+    fields = ', '.join(f'{label}: {count}' for label, count in by_field.most_common())
+    return f'{len(alerts)} new ID and training alerts ({overdue} already expired). {fields}.'
+
+
+def build_notifications(alerts, today):
+    """One notification per affected employee and one digest per security admin"""
+    by_owner = defaultdict(list)
+    for alert in alerts:
+        by_owner[alert.owner_id].append(alert)
+    notifications = []
+    # Super admins own imported and admin-created profiles; the digest covers those
+    owners = User.objects.filter(pk__in=by_owner).exclude(role='super_admin').values_list('pk', flat=True)
+    for owner_id in owners:
+        owned = by_owner[owner_id]
+        profile_ids = {alert.profile_id for alert in owned}
+        notifications.append(Notification(
+            recipient_id=owner_id,
+            notification_type='expiry_alert',
+            title='ID or Training Expiring',
+            message='; '.join(f'{alert.name}: {alert.describe(today)}' for alert in owned) + '.',
+            profile_id=profile_ids.pop() if len(profile_ids) == 1 else None,
+        ))
+    message = digest_message(alerts, today)
+    for admin_id in User.objects.filter(role='security_admin').values_list('pk', flat=True):
+        notifications.append(Notification(
+            recipient_id=admin_id,
+            notification_type='expiry_alert',
+            title='Expiry Digest',
+            message=message,
+        ))
+    return notifications
+
+
+def check_expiries(today=None, windows=None, overdue_days=30, dry_run=False, batch_size=1000):
+    """
+    Raise the alerts due today and notify about them.
+
+    Alerts already recorded for a due date and window are skipped, so the
+    check can run any number of times a day.
+    """
+    today = today or timezone.localdate()
+    windows = tuple(sorted(windows or alert_windows()))
+    result = ExpiryResult(today, dry_run)
+
+    due = list(find_due_dates(today, windows, overdue_days))
+    result.due = len(due)
+    if not due:
+        return result
+    raised = set(
+        ExpiryAlert.objects.filter(due_date__range=(min(d.due_date for d in due), max(d.due_date for d in due)))
+        .values_list('profile_id', 'field', 'due_date', 'window')
+    )
+    result.alerts = sorted((d for d in due if d.key not in raised), key=lambda d: (d.due_date, d.profile_id))
+    if dry_run or not result.alerts:
+        return result
+
+    notifications = build_notifications(result.alerts, today)
+    with transaction.atomic():
+        ExpiryAlert.objects.bulk_create(
+            [ExpiryAlert(profile_id=d.profile_id, field=d.field, due_date=d.due_date, window=d.window)
+             for d in result.alerts],
+            batch_size=batch_size,
+        )
+        Notification.objects.bulk_create(notifications, batch_size=batch_size)
+    result.notifications = len(notifications)
+    return result
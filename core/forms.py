@@ -1,6 +1,21 @@
+import json
+
 from django import forms
-from django.forms import inlineformset_factory
-from .models import EmployeeProfile, Dependent, User
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.forms import inlineformset_factory, modelformset_factory
+from django.forms.models import model_to_dict
+from .models import EmployeeProfile, Dependent, User, normalize_key
+
+# Fields 26-38, maintained by security admins
+SECURITY_FIELDS = [
+    'radio_call_sign', 'radio_serial_id', 'zone_name_with_appointment',
+    'office_location_address', 'appointment_unit_based_warden', 'unid_number',
+    'rfid_number', 'unid_issue_date', 'id_contact_expiry', 'id_deposit_date',
+    'bsafe', 'sat', 'sbfat'
+]
 
 class UserSignupForm(forms.ModelForm):
     password1 = forms.CharField(label='Password', widget=forms.PasswordInput)
@@ -30,7 +45,23 @@ class UserSignupForm(forms.ModelForm):
             user.save()
         return user
 
+class LoadedValuesSerializer(signing.JSONSerializer):
+    # Dates and decimals in the signed snapshot of the loaded values
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), cls=DjangoJSONEncoder).encode('latin-1')
+
+
 class EmployeeProfileForm(forms.ModelForm):
+    # Version of the profile the form was rendered from, checked on save
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+    # Signed field values of that version, so changed_data holds the editor's
+    # own edits even when someone else saved the profile in the meantime
+    loaded = forms.CharField(widget=forms.HiddenInput, required=False)
+
+    # Form fields that carry edit bookkeeping rather than profile data
+    TRACKING_FIELDS = ('version', 'loaded')
+    LOADED_SALT = 'core.forms.EmployeeProfileForm.loaded'
+    
     class Meta:
         model = EmployeeProfile
         exclude = ['created_at', 'updated_at', 'created_by']
@@ -198,12 +229,7 @@ class EmployeeProfileForm(forms.ModelForm):
             'email_official', 'email_personal'
         ]
         
-        security_fields = [
-            'radio_call_sign', 'radio_serial_id', 'zone_name_with_appointment',
-            'office_location_address', 'appointment_unit_based_warden', 'unid_number',
-            'rfid_number', 'unid_issue_date', 'id_contact_expiry', 'id_deposit_date',
-            'bsafe', 'sat', 'sbfat'
-        ]
+        security_fields = SECURITY_FIELDS
         
         # Approval workflow fields that should be hidden from all users except super admin
         approval_fields = ['status', 'submitted_at', 'approved_at', 'approved_by', 'rejection_reason']
@@ -232,21 +258,57 @@ class EmployeeProfileForm(forms.ModelForm):
         
         # Super admins can edit all fields (no restrictions)
         
+        # Render lookup drop-downs from the cached reference tables instead of querying them
+        for field_name in ('agency_project_cluster_office', 'nationality', 'duty_station'):
+            if field_name in self.fields:
+                field = self.fields[field_name]
+                field.choices = field.queryset.model.cached_choices()
+        
         # Store user_role for validation
         self.user_role = user_role
+        self.fields['version'].initial = self.instance.version
+        if self.is_bound:
+            self.initial.update(self.loaded_initial())
+        else:
+            self.fields['loaded'].initial = signing.dumps(
+                model_to_dict(self.instance, fields=[name for name in self.fields if name not in self.TRACKING_FIELDS]),
+                salt=self.LOADED_SALT, serializer=LoadedValuesSerializer, compress=True,
+            )
+
+    def loaded_initial(self):
+        """The submitted snapshot of the loaded values as initial values, or {} if it is missing or tampered with"""
+        try:
+            loaded = signing.loads(self.data.get(self.add_prefix('loaded'), ''), salt=self.LOADED_SALT)
+        except signing.BadSignature:
+            return {}
+        initial = {}
+        for name, value in loaded.items():
+            field = self.fields.get(name)
+            if field is None or name in self.TRACKING_FIELDS:
+                continue
+            if not isinstance(field, forms.ModelChoiceField):
+                # Back from JSON text to the field's type (dates), as has_changed() expects
+                try:
+                    value = field.to_python(value)
+                except forms.ValidationError:
+                    continue
+            initial[name] = value
+        return initial
+
+    def edited_fields(self):
+        """Names of the profile fields the editor changed from the version they loaded"""
+        return [name for name in self.changed_data if name not in self.TRACKING_FIELDS]
     
     def clean(self):
         cleaned_data = super().clean()
         
+        if cleaned_data.get('version') is not None:
+            self.instance.expected_version = cleaned_data['version']
+        
         # If user is security admin, only validate security fields
         if hasattr(self, 'user_role') and self.user_role == 'security_admin':
             # Get the fields that should be validated for security admin
-            security_fields = [
-                'radio_call_sign', 'radio_serial_id', 'zone_name_with_appointment',
-                'office_location_address', 'appointment_unit_based_warden', 'unid_number',
-                'rfid_number', 'unid_issue_date', 'id_contact_expiry', 'id_deposit_date',
-                'bsafe', 'sat', 'sbfat'
-            ]
+            security_fields = SECURITY_FIELDS
             
             # Clear validation errors for non-security fields
             # Create a copy of error keys to avoid "dictionary changed size during iteration"
@@ -379,6 +441,159 @@ class EmployeeProfileForm(forms.ModelForm):
             return self.cleaned_data.get('email_personal', '')
         return self.cleaned_data.get('email_personal')
 
+class LookupValueField(forms.Field):
+    """Accepts a lookup row's code or name in any case and cleans to that row, without a query"""
+    default_error_messages = {
+        'invalid_choice': 'Select a valid choice. %(value)s is not one of the available choices.',
+    }
+
+    def __init__(self, model, **kwargs):
+        super().__init__(**kwargs)
+        self.rows = {}
+        for pk, code, name in model.cached_rows():
+            row = model(pk=pk, code=code, name=name)
+            self.rows[normalize_key(name)] = row
+            self.rows[normalize_key(code)] = row
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        row = self.rows.get(normalize_key(str(value)))
+        if row is None:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+        return row
+
+class ProfileImportForm(EmployeeProfileForm):
+    """
+    Validates one imported spreadsheet row with the super admin rules of
+    EmployeeProfileForm.
+
+    Lookup columns take a code or a name and are resolved from the lookup
+    cache. Employee-ID uniqueness is checked by the importer against one
+    prefetched set, so validating a row runs no queries. Building the form's
+    fields costs far more than validating a row, so one form is created per
+    import and bound to each row in turn with validate_row().
+    """
+    LOOKUP_FIELDS = ('agency_project_cluster_office', 'nationality', 'duty_station')
+    APPROVAL_FIELDS = ('status', 'submitted_at', 'approved_at', 'approved_by', 'rejection_reason')
+
+    def __init__(self, *args, **kwargs):
+        kwargs['user_role'] = 'super_admin'
+        super().__init__(*args, **kwargs)
+        for field_name in self.APPROVAL_FIELDS + self.TRACKING_FIELDS:
+            del self.fields[field_name]
+        for field_name in self.LOOKUP_FIELDS:
+            field = self.fields[field_name]
+            self.fields[field_name] = LookupValueField(
+                field.queryset.model, required=field.required, label=field.label
+            )
+
+    def _get_validation_exclusions(self):
+        # Lookup values were matched against the cache; the model check would query each one
+        exclude = super()._get_validation_exclusions()
+        exclude.update(self.LOOKUP_FIELDS)
+        return exclude
+
+    def validate_unique(self):
+        pass
+
+    def validate_row(self, data):
+        """Bind the form to a new row and a fresh instance, and validate it"""
+        self.data = data
+        self.is_bound = True
+        self.instance = self._meta.model()
+        self._errors = None
+        self._bound_fields_cache = {}
+        self.__dict__.pop('cleaned_data', None)
+        return self.is_valid()
+
+class ProfileImportUploadForm(forms.Form):
+    file = forms.FileField(
+        label='CSV or XLSX file',
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,.xlsx', 'class': 'form-input'}),
+    )
+    dry_run = forms.BooleanField(
+        label='Validate only (do not import)', required=False, initial=True,
+    )
+
+    def clean_file(self):
+        # Imported here: the importers module imports this one
+        from .importers import ImportFileError, has_more_rows
+
+        upload = self.cleaned_data['file']
+        max_rows = getattr(settings, 'PROFILE_IMPORT_MAX_ROWS', 10000)
+        try:
+            too_large = has_more_rows(upload.file, upload.name, max_rows)
+        except ImportFileError as exc:
+            raise forms.ValidationError(str(exc))
+        if too_large:
+            # The upload is imported within the request, which would outlast the worker timeout
+            raise forms.ValidationError(
+                f'The file has more than {max_rows} rows. Import it from the server with '
+                f'"python manage.py import_profiles <file>" instead.'
+            )
+        return upload
+
+class SecurityGridForm(forms.ModelForm):
+    """One row of the security grid: the security fields of a single profile"""
+    # Version of the profile the row was rendered from, checked on save
+    version = forms.IntegerField(widget=forms.HiddenInput)
+
+    class Meta:
+        model = EmployeeProfile
+        fields = SECURITY_FIELDS
+        widgets = {
+            field_name: forms.DateInput(attrs={'type': 'date', 'class': 'grid-input'}, format='%Y-%m-%d')
+            if isinstance(EmployeeProfile._meta.get_field(field_name), models.DateField)
+            else forms.TextInput(attrs={'class': 'grid-input'})
+            for field_name in SECURITY_FIELDS
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['version'].initial = self.instance.version
+
+class LoadedRowField(forms.ModelChoiceField):
+    """Primary key field of a formset row, resolved against the rows the formset already loaded"""
+
+    def __init__(self, lookup, *args, **kwargs):
+        self.lookup = lookup
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            row = self.lookup(int(value))
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return row
+
+class BaseSecurityGridFormSet(forms.BaseModelFormSet):
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        # The stock id field runs one query per row to validate the submitted primary key
+        pk_field = form.fields[self._pk_field.name]
+        form.fields[self._pk_field.name] = LoadedRowField(
+            self._existing_object, pk_field.queryset,
+            initial=pk_field.initial, required=False, widget=pk_field.widget,
+        )
+
+# Security grid page size; also caps the number of rows one POST can submit
+SECURITY_GRID_PAGE_SIZE = 50
+
+SecurityGridFormSet = modelformset_factory(
+    EmployeeProfile,
+    form=SecurityGridForm,
+    formset=BaseSecurityGridFormSet,
+    extra=0,
+    max_num=SECURITY_GRID_PAGE_SIZE,
+    absolute_max=SECURITY_GRID_PAGE_SIZE,
+    validate_max=True,
+)
+
 class DependentForm(forms.ModelForm):
     class Meta:
         model = Dependent
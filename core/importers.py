@@ -0,0 +1,233 @@
+"""
+Bulk import of employee profiles from CSV or XLSX spreadsheets.
+
+Rows are read one at a time, so memory stays flat however large the file is.
+Each row is validated by ProfileImportForm, which applies the super admin
+rules of the profile form without running a query. Employee IDs are checked
+against a single prefetched set. Valid rows are inserted with bulk_create in
+chunks, and each chunk gets its own transaction.
+
+Column headers may be the field names (employee_id) or the labels shown on the
+profile form (Employee ID), in any case. Lookup columns (agency, nationality,
+duty station) take a code or a name.
+"""
+import csv
+import datetime as dt
+import io
+from itertools import islice
+from pathlib import Path
+
+from django.db import transaction
+
+from . import audit, compliance
+from .forms import ProfileImportForm
+from .models import EmployeeProfile, User, normalize_key
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx')
+
+
+class ImportFileError(Exception):
+    """The uploaded file cannot be read as a profile spreadsheet"""
+
+
+def column_map():
+    """Normalized header -> form field name, for field names and their labels"""
+    columns = {}
+    for name, field in ProfileImportForm.base_fields.items():
+        if name in ProfileImportForm.APPROVAL_FIELDS or name in ProfileImportForm.TRACKING_FIELDS:
+            continue
+        columns[normalize_key(name)] = name
+        columns[normalize_key(str(EmployeeProfile._meta.get_field(name).verbose_name))] = name
+    return columns
+
+
+def cell_value(value):
+    """Normalise a CSV or XLSX cell to a form value: stripped text or a date"""
+    if value is None:
+        return ''
+    if isinstance(value, dt.datetime):
+        return value.date()
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheet numbers (R/Ser, phone numbers) arrive as floats
+        return str(int(value))
+    if isinstance(value, dt.date):
+        return value
+    return str(value).strip()
+
+
+def spreadsheet_rows(fileobj, filename):
+    """
+    Stream the rows of a CSV or XLSX file as sequences of cell values.
+
+    CSV files are decoded as UTF-8, with or without a byte order mark. XLSX
+    files are read with openpyxl in read-only mode, which streams the first
+    sheet instead of loading every cell.
+    """
+    extension = Path(filename).suffix.lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ImportFileError(f'Unsupported file type "{extension}"; upload a .csv or .xlsx file')
+    return _xlsx_rows(fileobj) if extension == '.xlsx' else _csv_rows(fileobj)
+
+
+def _csv_rows(fileobj):
+    if isinstance(fileobj, io.TextIOBase):
+        text = fileobj
+    else:
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(f'Could not read the CSV file: {exc}') from exc
+    finally:
+        if text is not fileobj:
+            # Leave fileobj open for the caller; dropping the wrapper would close it
+            text.detach()
+
+
+def _xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Reading .xlsx files requires openpyxl (pip install openpyxl)') from None
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ImportFileError(f'Could not read the XLSX file: {exc}') from exc
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def has_more_rows(fileobj, filename, max_rows):
+    """
+    Whether the file has more than max_rows rows after the header. Reads at
+    most max_rows + 2 rows and rewinds fileobj.
+    """
+    try:
+        rows = sum(1 for _ in islice(spreadsheet_rows(fileobj, filename), max_rows + 2))
+    finally:
+        fileobj.seek(0)
+    return rows > max_rows + 1
+
+
+class ProfileSheet:
+    """
+    Streams the data rows of a CSV or XLSX file as (line number, {field: value}).
+
+    Unrecognised columns are ignored and listed in unknown_columns once the
+    header has been read.
+    """
+
+    def __init__(self, fileobj, filename):
+        self.rows = spreadsheet_rows(fileobj, filename)
+        self.unknown_columns = []
+
+    def __iter__(self):
+        columns = column_map()
+        try:
+            header = next(self.rows)
+        except StopIteration:
+            raise ImportFileError('The file is empty') from None
+        fields = []
+        for heading in header:
+            field_name = columns.get(normalize_key(str(heading or '')))
+            if field_name is None and heading not in (None, ''):
+                self.unknown_columns.append(str(heading))
+            fields.append(field_name)
+        if 'employee_id' not in fields:
+            raise ImportFileError('The file has no Employee ID column')
+
+        for line, row in enumerate(self.rows, start=2):
+            values = {name: cell_value(value) for name, value in zip(fields, row) if name is not None}
+            if any(value != '' for value in values.values()):
+                yield line, values
+
+
+class RowError:
+    def __init__(self, line, employee_id, errors):
+        self.line = line
+        self.employee_id = employee_id
+        # {field label: [messages]}
+        self.errors = errors
+
+    def __str__(self):
+        details = '; '.join(f'{label}: {" ".join(messages)}' for label, messages in self.errors.items())
+        return f'line {self.line} ({self.employee_id or "no employee ID"}): {details}'
+
+
+class ImportResult:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.errors = []
+        self.unknown_columns = []
+
+    @property
+    def valid(self):
+        return self.rows - len(self.errors)
+
+
+def _form_errors(form):
+    return {
+        (form.fields[name].label or name) if name in form.fields else 'Row': list(messages)
+        for name, messages in form.errors.items()
+    }
+
+
+def import_profiles(sheet, created_by, dry_run=False, batch_size=1000, progress=None):
+    """
+    Validate every row of sheet and insert the valid ones as EmployeeProfiles.
+
+    A profile is owned by the existing user whose email matches its official
+    email, if that user has no profile yet, and by created_by otherwise.
+    Invalid rows are skipped and reported in the result. With dry_run nothing
+    is written. progress, if given, is called with the number of rows read
+    after each chunk.
+    """
+    result = ImportResult(dry_run)
+    employee_ids = set(EmployeeProfile.objects.values_list('employee_id', flat=True))
+    owners = {
+        normalize_key(email): pk
+        for pk, email in User.objects.exclude(email='').exclude(
+            pk__in=EmployeeProfile.objects.values('created_by')
+        ).values_list('pk', 'email')
+    }
+    form = ProfileImportForm()
+    batch = []
+
+    def flush():
+        if not dry_run and batch:
+            with transaction.atomic():
+                EmployeeProfile.objects.bulk_create(batch)
+                audit.record_bulk_create(batch, actor=created_by)
+                compliance.update_summary(created=batch)
+            result.created += len(batch)
+        batch.clear()
+        if progress is not None:
+            progress(result.rows)
+
+    for line, values in sheet:
+        result.rows += 1
+        employee_id = str(values.get('employee_id', '')).strip()
+        if not form.validate_row(values):
+            result.errors.append(RowError(line, employee_id, _form_errors(form)))
+            continue
+        employee_id = form.cleaned_data['employee_id']
+        if employee_id in employee_ids:
+            result.errors.append(RowError(line, employee_id, {'Employee ID': ['This employee ID already exists.']}))
+            continue
+        employee_ids.add(employee_id)
+
+        profile = form.save(commit=False)
+        profile.created_by_id = owners.pop(normalize_key(profile.email_official), created_by.pk)
+        # bulk_create bypasses save(), which keeps zone_key and thana_key in sync
+        profile.zone_key = normalize_key(profile.zone)
+        profile.thana_key = normalize_key(profile.police_station_thana)
+        batch.append(profile)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    result.unknown_columns = sheet.unknown_columns
+    return result
@@ -0,0 +1,62 @@
+import copy
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request connection overhead: new connection, persistent connection and psycopg pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Simulated requests per mode')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        base = copy.deepcopy(connections[options['database']].settings_dict)
+        base['OPTIONS'].pop('pool', None)
+        modes = [
+            ('new connection per request', dict(base, CONN_MAX_AGE=0)),
+            ('persistent (CONN_MAX_AGE=600)', dict(base, CONN_MAX_AGE=600)),
+        ]
+        if connections[options['database']].vendor == 'postgresql':
+            pooled = dict(base, CONN_MAX_AGE=0, OPTIONS=dict(base['OPTIONS'], pool={'min_size': 1, 'max_size': 4}))
+            modes.append(('psycopg pool', pooled))
+        else:
+            self.stdout.write(self.style.WARNING('Pool mode skipped: pooling requires PostgreSQL with psycopg 3'))
+
+        baseline = None
+        for index, (label, settings_dict) in enumerate(modes):
+            timings = self.run_mode(f'bench_{index}', settings_dict, options['requests'])
+            mean_ms = statistics.mean(timings) * 1000
+            p95_ms = sorted(timings)[int(len(timings) * 0.95) - 1] * 1000
+            baseline = baseline or mean_ms
+            self.stdout.write(
+                f'{label:<32} mean {mean_ms:7.2f} ms  p95 {p95_ms:7.2f} ms  '
+                f'saved {baseline - mean_ms:6.2f} ms/request'
+            )
+
+    @staticmethod
+    def run_mode(alias, settings_dict, requests):
+        """Time the connection work Django does for one request: connect if needed, query, end-of-request close"""
+        backend = load_backend(settings_dict['ENGINE'])
+        wrapper = backend.DatabaseWrapper(settings_dict, alias=alias)
+        timings = []
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                # What django.db.close_old_connections does on request_finished
+                wrapper.close_if_unusable_or_obsolete()
+                timings.append(time.perf_counter() - start)
+        except Exception as exc:
+            raise CommandError(f'{alias}: {exc}')
+        finally:
+            wrapper.close()
+            if getattr(wrapper, 'pool', None) is not None:
+                wrapper.close_pool()
+        return timings
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.emergency import build_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = 'Write the snapshot served by the read-only emergency roster; schedule it every few minutes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=None, help='Write here instead of EMERGENCY_SNAPSHOT_PATH')
+
+    def handle(self, *args, **options):
+        path = options['path'] or snapshot_path()
+        started = time.perf_counter()
+        header = build_snapshot(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Emergency snapshot written to {path}: {header['staff_count']} staff, "
+            f"{header['dependent_count']} dependents, sha256 {header['checksum']} "
+            f"({time.perf_counter() - started:.1f}s)"
+        ))
@@ -0,0 +1,45 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.expiry import alert_windows, check_expiries
+
+
+class Command(BaseCommand):
+    help = 'Alert employees and security admins about IDs and trainings (BSAFE, SAT, SBFAT) about to expire; run daily'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--windows', default=None,
+                            help='Comma-separated days before a due date to alert at (default: EXPIRY_ALERT_WINDOWS or 60,30,7)')
+        parser.add_argument('--overdue-days', type=int, default=30,
+                            help='Also alert on dates that passed up to this many days ago')
+        parser.add_argument('--date', default=None, help='Check as of this date (YYYY-MM-DD) instead of today')
+        parser.add_argument('--dry-run', action='store_true', help='List the new alerts without recording or sending them')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        try:
+            windows = [int(days) for days in options['windows'].split(',')] if options['windows'] else alert_windows()
+            today = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError as exc:
+            raise CommandError(f'Invalid --windows or --date: {exc}') from exc
+        if not windows or min(windows) < 0:
+            raise CommandError('--windows must list days of zero or more')
+
+        started = time.perf_counter()
+        result = check_expiries(
+            today=today, windows=windows, overdue_days=options['overdue_days'],
+            dry_run=options['dry_run'], batch_size=options['batch_size'],
+        )
+        if options['verbosity'] > 1 or result.dry_run:
+            for alert in result.alerts:
+                self.stdout.write(f'  {alert.name} (#{alert.profile_id}): {alert.describe(result.today)}')
+
+        elapsed = time.perf_counter() - started
+        summary = f'{result.due} dates due, {len(result.alerts)} new alerts'
+        if result.dry_run:
+            summary = 'Dry run: ' + summary
+        else:
+            summary += f', {result.notifications} notifications sent'
+        self.stdout.write(self.style.SUCCESS(f'{summary} ({elapsed:.1f}s)'))
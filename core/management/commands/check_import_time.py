@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules that must stay out of a worker's cold start; they are imported on
+# first use by the views that need them.
+LAZY_MODULES = ['reportlab', 'numpy']
+
+BOOT_CODE = '''
+import resource, sys
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+import form_project.urls
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(rss if sys.platform == 'darwin' else rss * 1024)
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure worker cold-start import time and memory with python -X importtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-ms', type=float, help='Fail if total import time exceeds this many milliseconds')
+        parser.add_argument('--max-rss-mb', type=float, help='Fail if peak RSS after boot exceeds this many MiB')
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest top-level imports to show')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'form_project.settings')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_CODE],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Worker boot failed:\n{result.stderr[-2000:]}')
+
+        total_us, top_level, modules = self.parse_importtime(result.stderr)
+        rss_mb = int(result.stdout.strip().splitlines()[-1]) / (1024 * 1024)
+
+        self.stdout.write(f'Total import time: {total_us / 1000:.1f} ms across {len(modules)} modules')
+        self.stdout.write(f'Peak RSS after boot: {rss_mb:.1f} MiB')
+        self.stdout.write('\nSlowest top-level imports (cumulative):')
+        for name, cumulative_us in sorted(top_level, key=lambda item: item[1], reverse=True)[:options['top']]:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f} ms  {name}')
+
+        failures = []
+        loaded_lazy = [name for name in LAZY_MODULES if any(m == name or m.startswith(name + '.') for m in modules)]
+        if loaded_lazy:
+            failures.append(f'modules that should load lazily were imported at boot: {", ".join(loaded_lazy)}')
+        if options['max_ms'] is not None and total_us / 1000 > options['max_ms']:
+            failures.append(f'import time {total_us / 1000:.1f} ms exceeds {options["max_ms"]} ms')
+        if options['max_rss_mb'] is not None and rss_mb > options['max_rss_mb']:
+            failures.append(f'peak RSS {rss_mb:.1f} MiB exceeds {options["max_rss_mb"]} MiB')
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('\nWorker cold start is within budget'))
+
+    @staticmethod
+    def parse_importtime(stderr):
+        """Return (total self time, [(top-level module, cumulative us)], set of module names)"""
+        total_us = 0
+        top_level = []
+        modules = set()
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            total_us += int(self_us)
+            stripped = name.strip()
+            modules.add(stripped)
+            if name[1:2] != ' ':
+                top_level.append((stripped, int(cumulative_us)))
+        return total_us, top_level, modules
@@ -0,0 +1,96 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from core.middleware import explain_query
+from core.models import User, EmployeeProfile
+
+# The views whose queries must be served by an index, with representative filters
+VIEW_REQUESTS = [
+    '/dashboard/',
+    '/reports/',
+    '/reports/?agency=undp',
+    '/reports/?duty_station=dhaka',
+    '/reports/?contact_type=PA',
+    '/reports/?zone=Gulshan',
+    '/reports/?zone=gulshan&duty_station=Dhaka',
+    '/reports/export-pdf/?duty_station=dhaka',
+    '/reports/export-pdf/?zone=Gulshan',
+    '/reports/compliance/',
+    '/reports/compliance/?duty_station=dhaka',
+    '/reports/trends/profiles-created/',
+    '/reports/trends/edits/',
+    '/reports/trends/completion/',
+    '/security/roster/?zone=gulshan',
+    '/security/roster/?thana=banani%20thana',
+    '/security/roster/headcount/?zone=gulshan',
+    '/security/grid/',
+    '/security/grid/?duty_station=dhaka&page=2',
+    '/notifications/',
+    '/notifications/count/',
+]
+
+INDEXED_TABLES = ('core_employeeprofile', 'core_notification')
+
+# Plan lines that read a whole table without an index
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?P<table>\w+)\b(?! USING)'),
+    'postgresql': re.compile(r'Seq Scan on (?P<table>\w+)'),
+}
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN every query the report, dashboard and notification views run and flag full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as', dest='email', default=None,
+                            help='Super admin email to run the views as (default: the first super admin)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'No plan checks for the {connection.vendor} backend')
+
+        users = User.objects.filter(role='super_admin')
+        if options['email']:
+            users = users.filter(email=options['email'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No super admin user to run the views as')
+        if EmployeeProfile.objects.count() < 100:
+            self.stdout.write(self.style.WARNING(
+                'Fewer than 100 profiles: the planner may prefer scans; run seed_demo_data first'
+            ))
+
+        client = Client()
+        client.force_login(user)
+        failures = 0
+        for path in VIEW_REQUESTS:
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path} returned {response.status_code}')
+            self.stdout.write(self.style.MIGRATE_HEADING(path))
+            for query in captured.captured_queries:
+                sql = query['sql']
+                if not any(table in sql for table in INDEXED_TABLES) or (' WHERE ' not in sql and 'ORDER BY' not in sql):
+                    # Unfiltered, unordered reads (plain counts) scan by design
+                    continue
+                # captured_queries holds the interpolated SQL, so EXPLAIN it without params
+                plan = explain_query(connection, sql, None)
+                scans = [m.group('table') for m in pattern.finditer(plan)
+                         if m.group('table').strip('"') in INDEXED_TABLES]
+                if scans:
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f'  full scan of {", ".join(scans)}: {sql[:160]}'))
+                    self.stdout.write(f'    {plan}')
+                elif options['verbose_plans']:
+                    self.stdout.write(f'  ok: {sql[:160]}\n    {plan}')
+        if failures:
+            raise CommandError(f'{failures} queries scan an indexed table without using an index')
+        self.stdout.write(self.style.SUCCESS('Every filtered or ordered query uses an index'))
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import ImportFileError, ProfileSheet, import_profiles
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = 'Import employee profiles from a CSV or XLSX file, validating every row like the profile form'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file; headers are field names or form labels')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing anything')
+        parser.add_argument('--created-by', dest='email', default=None,
+                            help='Super admin who owns profiles with no matching user account (default: the first super admin)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per transaction')
+        parser.add_argument('--max-errors', type=int, default=200, help='Row errors to print (all are counted)')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(role='super_admin')
+        if options['email']:
+            users = users.filter(email=options['email'])
+        created_by = users.order_by('pk').first()
+        if created_by is None:
+            raise CommandError('No super admin to record as the creator of imported profiles')
+
+        started = time.perf_counter()
+
+        def progress(rows):
+            self.stdout.write(f'  {rows} rows read ({time.perf_counter() - started:.1f}s)')
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = import_profiles(
+                    ProfileSheet(fileobj, options['path']), created_by,
+                    dry_run=options['dry_run'], batch_size=options['batch_size'],
+                    progress=progress if options['verbosity'] > 1 else None,
+                )
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        if result.unknown_columns:
+            self.stdout.write(self.style.WARNING(f'Ignored columns: {", ".join(result.unknown_columns)}'))
+        for error in result.errors[:options['max_errors']]:
+            self.stdout.write(self.style.ERROR(str(error)))
+        if len(result.errors) > options['max_errors']:
+            self.stdout.write(self.style.ERROR(f'... and {len(result.errors) - options["max_errors"]} more row errors'))
+
+        elapsed = time.perf_counter() - started
+        if result.dry_run:
+            summary = f'Dry run: {result.valid} of {result.rows} rows are valid'
+        else:
+            summary = f'Imported {result.created} of {result.rows} rows'
+        summary += f', {len(result.errors)} rejected ({elapsed:.1f}s)'
+        style = self.style.WARNING if result.errors else self.style.SUCCESS
+        self.stdout.write(style(summary))
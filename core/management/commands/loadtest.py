@@ -0,0 +1,318 @@
+import asyncio
+import random
+import re
+import statistics
+import time
+from collections import defaultdict
+from html.parser import HTMLParser
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .seed_demo_data import SEED_PASSWORD
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+EDIT_LINK = re.compile(r'/profile/edit/(\d+)/')
+REPORT_FILTERS = [
+    {},
+    {'duty_station': 'dhaka'},
+    {'contact_type': 'PA'},
+    {'zone': 'Gulshan'},
+    {'agency': 'undp', 'duty_station': 'chittagong'},
+]
+
+
+class FormFieldParser(HTMLParser):
+    """Collect the submittable fields of the first POST form in a page"""
+
+    def __init__(self):
+        super().__init__()
+        self.fields = []
+        self._in_form = False
+        self._done = False
+        self._select = None
+        self._select_value = None
+        self._textarea = None
+        self._textarea_text = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self._done:
+            return
+        if tag == 'form' and (attrs.get('method') or '').lower() == 'post':
+            self._in_form = True
+        if not self._in_form:
+            return
+        name = attrs.get('name')
+        if tag == 'input' and name:
+            kind = (attrs.get('type') or 'text').lower()
+            if kind in ('submit', 'button', 'file'):
+                return
+            if kind in ('checkbox', 'radio') and 'checked' not in attrs:
+                return
+            self.fields.append((name, attrs.get('value') or ''))
+        elif tag == 'select' and name:
+            self._select, self._select_value = name, None
+        elif tag == 'option' and self._select:
+            if self._select_value is None or 'selected' in attrs:
+                self._select_value = attrs.get('value') or ''
+        elif tag == 'textarea' and name:
+            self._textarea, self._textarea_text = name, []
+
+    def handle_endtag(self, tag):
+        if tag == 'select' and self._select:
+            self.fields.append((self._select, self._select_value or ''))
+            self._select = None
+        elif tag == 'textarea' and self._textarea:
+            self.fields.append((self._textarea, ''.join(self._textarea_text)))
+            self._textarea = None
+        elif tag == 'form' and self._in_form:
+            self._in_form, self._done = False, True
+
+    def handle_data(self, data):
+        if self._textarea:
+            self._textarea_text.append(data)
+
+
+class HttpSession:
+    """Minimal keep-alive HTTP/1.1 client with a cookie jar, built on asyncio streams"""
+
+    def __init__(self, base_url, stats):
+        parts = urlsplit(base_url)
+        if parts.scheme != 'http':
+            raise CommandError('Only plain http:// targets are supported')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.stats = stats
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, label, method, path, data=None, headers=None):
+        body = urlencode(data).encode() if data is not None else b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Connection: keep-alive',
+            f'Content-Length: {len(body)}',
+        ]
+        if data is not None:
+            lines.append('Content-Type: application/x-www-form-urlencoded')
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        for key, value in (headers or {}).items():
+            lines.append(f'{key}: {value}')
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+        start = time.perf_counter()
+        try:
+            status, response_headers, content = await self._roundtrip(payload)
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            await self.close()
+            self.stats.record(label, time.perf_counter() - start, error=type(exc).__name__)
+            return None, ''
+        self.stats.record(label, time.perf_counter() - start, error=None if status < 500 else str(status))
+
+        for key, value in response_headers:
+            if key == 'set-cookie':
+                for name, morsel in SimpleCookie(value).items():
+                    self.cookies[name] = morsel.value
+            elif key == 'connection' and value.lower() == 'close':
+                await self.close()
+        return status, content.decode('utf-8', 'replace')
+
+    async def _roundtrip(self, payload):
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server may have closed an idle keep-alive connection
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = []
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers.append((key.strip().lower(), value.strip()))
+        header_map = dict(headers)
+        if header_map.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            content = b''.join(chunks)
+        elif 'content-length' in header_map:
+            content = await self.reader.readexactly(int(header_map['content-length']))
+        else:
+            content = await self.reader.read()
+            await self.close()
+        return status, headers, content
+
+    async def login(self, email, password):
+        _, page = await self.request('login page', 'GET', '/login/')
+        match = CSRF_INPUT.search(page or '')
+        if not match:
+            return False
+        status, _ = await self.request('login', 'POST', '/login/', {
+            'csrfmiddlewaretoken': match.group(1), 'email': email, 'password': password,
+        })
+        return status == 302 and 'sessionid' in self.cookies
+
+
+class Stats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.perf_counter()
+
+    def record(self, label, seconds, error=None):
+        self.latencies[label].append(seconds)
+        if error:
+            self.errors[label] += 1
+
+    def snapshot(self):
+        return self.latencies, self.errors, time.perf_counter() - self.started
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Replay realistic user scenarios against a running server and report throughput and tail latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server')
+        parser.add_argument('--stages', default='5:20,20:20,50:20',
+                            help='Comma separated concurrency:seconds ramp stages')
+        parser.add_argument('--mix', default='employee=70,security_admin=20,super_admin=10',
+                            help='Weighted persona mix for virtual users')
+        parser.add_argument('--think', type=float, default=0.5, help='Mean think time between actions in seconds')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds between notification polls of each open tab')
+        parser.add_argument('--staff-prefix', default='staff', help='Username prefix used by seed_demo_data')
+        parser.add_argument('--staff-count', type=int, default=1000, help='Number of seeded staff users to draw from')
+        parser.add_argument('--staff-password', default=SEED_PASSWORD)
+        parser.add_argument('--security-admin', default='securityadmin@ssdm.com:secure_password_456')
+        parser.add_argument('--super-admin', default='superadmin.test@demo.com:complexpass123')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            self.stages = [tuple(map(float, stage.split(':'))) for stage in options['stages'].split(',')]
+            self.mix = [(name, float(weight)) for name, weight in
+                        (item.split('=') for item in options['mix'].split(','))]
+        except ValueError:
+            raise CommandError('Malformed --stages or --mix')
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        asyncio.run(self.run())
+
+    async def run(self):
+        stats = Stats()
+        users = []
+        staff_ids = list(range(self.options['staff_count']))
+        self.rng.shuffle(staff_ids)
+
+        for concurrency, seconds in self.stages:
+            while len(users) < int(concurrency):
+                persona = self.rng.choices([m[0] for m in self.mix], [m[1] for m in self.mix])[0]
+                staff_id = staff_ids[len(users) % len(staff_ids)]
+                users.append(asyncio.create_task(self.virtual_user(persona, staff_id, stats)))
+            stats.reset()
+            await asyncio.sleep(seconds)
+            self.report(int(concurrency), stats)
+
+        for task in users:
+            task.cancel()
+        await asyncio.gather(*users, return_exceptions=True)
+
+    def credentials(self, persona, staff_id):
+        if persona == 'employee':
+            return f"{self.options['staff_prefix']}{staff_id:05d}@undp.org", self.options['staff_password']
+        email, _, password = self.options[persona].partition(':')
+        return email, password
+
+    async def virtual_user(self, persona, staff_id, stats):
+        session = HttpSession(self.options['url'], stats)
+        rng = random.Random(f'{persona}-{staff_id}')
+        try:
+            if not await session.login(*self.credentials(persona, staff_id)):
+                stats.record('login failed', 0, error='login')
+                return
+            action = getattr(self, f'{persona}_action')
+            next_poll = time.perf_counter()
+            while True:
+                if time.perf_counter() >= next_poll:
+                    await session.request('notifications/count', 'GET', '/notifications/count/')
+                    next_poll = time.perf_counter() + self.options['poll_interval']
+                await action(session, rng)
+                await asyncio.sleep(rng.expovariate(1 / self.options['think']) if self.options['think'] else 0)
+        finally:
+            await session.close()
+
+    async def employee_action(self, session, rng):
+        _, page = await session.request('dashboard', 'GET', '/dashboard/')
+        match = EDIT_LINK.search(page or '')
+        if not match:
+            return
+        edit_path = f'/profile/edit/{match.group(1)}/'
+        _, form_page = await session.request('profile edit form', 'GET', edit_path)
+        if rng.random() < 0.5:
+            parser = FormFieldParser()
+            parser.feed(form_page or '')
+            await session.request('profile save', 'POST', edit_path, parser.fields)
+
+    async def security_admin_action(self, session, rng):
+        _, page = await session.request('dashboard', 'GET', '/dashboard/')
+        profile_ids = EDIT_LINK.findall(page or '')
+        if profile_ids:
+            await session.request('profile detail', 'GET', f'/profile/{rng.choice(profile_ids)}/')
+
+    async def super_admin_action(self, session, rng):
+        query = urlencode(rng.choice(REPORT_FILTERS))
+        await session.request('reports', 'GET', f'/reports/?{query}')
+        if rng.random() < 0.1:
+            await session.request('export pdf', 'GET', f'/reports/export-pdf/?{query}')
+        else:
+            await session.request('dashboard', 'GET', '/dashboard/')
+
+    def report(self, concurrency, stats):
+        latencies, errors, elapsed = stats.snapshot()
+        total = sum(len(v) for v in latencies.values())
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\nConcurrency {concurrency}: {total} requests in {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else 0:.1f} req/s), {sum(errors.values())} errors'
+        ))
+        self.stdout.write(f'  {"endpoint":<24}{"count":>7}{"err":>6}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}')
+        for label in sorted(latencies):
+            values = latencies[label]
+            self.stdout.write(
+                f'  {label:<24}{len(values):>7}{errors[label]:>6}'
+                f'{statistics.median(values) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}'
+                f'{percentile(values, 99) * 1000:>9.1f}{max(values) * 1000:>9.1f}'
+            )
@@ -0,0 +1,64 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import ImportFileError
+from core.provisioning import provision_users, read_roster, send_reset_emails
+
+
+class Command(BaseCommand):
+    help = 'Create user accounts in bulk from a CSV or XLSX roster (email, role, first_name, last_name, username, password)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file; only the email column is required')
+        parser.add_argument('--base-url', default='https://sddm-system.onrender.com',
+                            help='Site URL the password reset links point to')
+        parser.add_argument('--links-out', default=None,
+                            help='Write email,username,reset_url for accounts created without a password to this CSV')
+        parser.add_argument('--send-emails', action='store_true',
+                            help='Email each account created without a password its reset link')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes hashing supplied passwords (default: one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Accounts inserted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the roster without creating accounts')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(stage, count):
+            self.stdout.write(f'  {stage}: {count} ({time.perf_counter() - started:.1f}s)')
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = provision_users(
+                    read_roster(fileobj, options['path']), options['base_url'],
+                    dry_run=options['dry_run'], workers=options['workers'],
+                    batch_size=options['batch_size'], progress=progress,
+                )
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(str(error)))
+
+        if result.reset_links and options['links_out']:
+            with open(options['links_out'], 'w', newline='') as out:
+                writer = csv.writer(out)
+                writer.writerow(['email', 'username', 'reset_url'])
+                for user, url in result.reset_links:
+                    writer.writerow([user.email, user.username, url])
+            self.stdout.write(f'Wrote {len(result.reset_links)} reset links to {options["links_out"]}')
+        if result.reset_links and options['send_emails']:
+            sent = send_reset_emails(result.reset_links)
+            self.stdout.write(f'Sent {sent} password emails')
+        if result.reset_links and not (options['links_out'] or options['send_emails']):
+            self.stdout.write(self.style.WARNING(
+                f'{len(result.reset_links)} accounts have no password yet; '
+                'they can use "Forgot password" or rerun with --links-out / --send-emails'
+            ))
+
+        elapsed = time.perf_counter() - started
+        verb = 'Would create' if result.dry_run else 'Created'
+        summary = f'{verb} {len(result.created)} of {result.rows} accounts, {len(result.errors)} rejected ({elapsed:.1f}s)'
+        self.stdout.write((self.style.WARNING if result.errors else self.style.SUCCESS)(summary))
@@ -0,0 +1,22 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.compliance import refresh_summary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the training and ID compliance summary shown on the reports page; run nightly'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', default=None, help='Judge validity as of this date (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError as exc:
+            raise CommandError(f'Invalid --date: {exc}') from exc
+        started = time.perf_counter()
+        rows = refresh_summary(as_of)
+        self.stdout.write(self.style.SUCCESS(f'Compliance summary rebuilt: {rows} rows ({time.perf_counter() - started:.1f}s)'))
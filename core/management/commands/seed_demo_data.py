@@ -0,0 +1,105 @@
+import datetime as dt
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import User, EmployeeProfile, Dependent, Agency, DutyStation, Nationality, normalize_key
+
+SEED_PASSWORD = 'loadtest-pass-123'
+
+
+def _choice_values(field_name):
+    return [value for value, _ in EmployeeProfile._meta.get_field(field_name).choices]
+
+
+class Command(BaseCommand):
+    help = 'Seed staff users, profiles and dependents for load testing and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=1000, help='Number of staff users/profiles to create')
+        parser.add_argument('--prefix', default='staff', help='Username prefix for the seeded users')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+        existing = set(User.objects.filter(username__startswith=prefix).values_list('username', flat=True))
+
+        # Hash once: every seeded account shares the same password
+        password_hash = make_password(SEED_PASSWORD)
+        users = []
+        for i in range(options['profiles']):
+            username = f'{prefix}{i:05d}'
+            if username in existing:
+                continue
+            users.append(User(
+                username=username,
+                email=f'{username}@undp.org',
+                first_name='Staff',
+                last_name=f'{i:05d}',
+                role='user',
+                password=password_hash,
+            ))
+
+        agencies = [pk for pk, _ in Agency.cached_choices()]
+        nationalities = [Nationality.pk_for_code('bangladesh')] * 8 + [pk for pk, _ in Nationality.cached_choices()]
+        duty_stations = [pk for pk, _ in DutyStation.cached_choices()]
+        contact_types = _choice_values('contact_type')
+        blood_groups = _choice_values('blood_group')
+        zones = ['Gulshan', 'Banani', 'Dhanmondi', 'Uttara', 'Mirpur', 'Motijheel', 'Agrabad', 'Zindabazar']
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+            users = list(User.objects.filter(username__in=[u.username for u in users]))
+
+            profiles = []
+            for user in users:
+                zone = rng.choice(zones)
+                profiles.append(EmployeeProfile(
+                    created_by=user,
+                    agency_project_cluster_office_id=rng.choice(agencies),
+                    r_ser=rng.randint(1, 999),
+                    sl=rng.randint(1, 999),
+                    name=f'{user.first_name} {user.last_name}',
+                    post_title_designation=rng.choice(['Programme Analyst', 'Driver', 'Finance Associate', 'Project Manager']),
+                    nationality_id=rng.choice(nationalities),
+                    employee_id=f'EMP-{user.username}',
+                    gender=rng.choice(['male', 'female', 'other']),
+                    date_of_birth=dt.date(1960, 1, 1) + dt.timedelta(days=rng.randint(0, 15000)),
+                    contact_type=rng.choice(contact_types),
+                    duty_station_id=rng.choice(duty_stations),
+                    number_of_dependents=rng.randint(0, 4),
+                    residential_address=f'House {rng.randint(1, 200)}, Road {rng.randint(1, 50)}, {zone}',
+                    zone=zone,
+                    zone_key=normalize_key(zone),
+                    police_station_thana=f'{zone} Thana',
+                    thana_key=normalize_key(f'{zone} Thana'),
+                    cell_phone_whatsapp=f'+8801{rng.randint(100000000, 999999999)}',
+                    emergency_contact_number=f'+8801{rng.randint(100000000, 999999999)}',
+                    emergency_contact_relation=rng.choice(['Spouse', 'Parent', 'Sibling']),
+                    blood_group=rng.choice(blood_groups),
+                    email_official=user.email,
+                    appointment_unit_based_warden=f'Warden {zone}',
+                ))
+            EmployeeProfile.objects.bulk_create(profiles, batch_size=batch_size)
+            profiles = EmployeeProfile.objects.filter(created_by__in=users).only('id', 'number_of_dependents')
+
+            dependents = []
+            for profile in profiles:
+                for n in range(profile.number_of_dependents):
+                    dependents.append(Dependent(
+                        employee_profile=profile,
+                        name=f'Dependent {profile.id}-{n}',
+                        relationship='spouse' if n == 0 else rng.choice(['son', 'daughter']),
+                        date_of_birth=dt.date(1970, 1, 1) + dt.timedelta(days=rng.randint(0, 19000)),
+                    ))
+            Dependent.objects.bulk_create(dependents, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users/profiles and {len(dependents)} dependents '
+            f'(password for every seeded user: {SEED_PASSWORD})'
+        ))
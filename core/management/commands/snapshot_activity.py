@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.trends import record_activity
+
+
+class Command(BaseCommand):
+    help = "Record yesterday's profile activity and completion for the trend endpoints; run daily after midnight"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', default=None, help='Record this day (YYYY-MM-DD) instead of yesterday')
+        parser.add_argument('--backfill-days', type=int, default=0,
+                            help='Also record this many earlier days that have no row yet (without completion counts)')
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError as exc:
+            raise CommandError(f'Invalid --date: {exc}') from exc
+        if options['backfill_days'] < 0:
+            raise CommandError('--backfill-days cannot be negative')
+        added = record_activity(day, options['backfill_days'])
+        self.stdout.write(self.style.SUCCESS(f'Daily activity recorded: {added} new days'))
@@ -0,0 +1,96 @@
+import multiprocessing
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction, OperationalError
+
+from core.audit import writer as audit_writer
+from core.models import EmployeeProfile
+from core.transactions import write_atomic
+
+# Stock SQLite behaviour: rollback journal, no busy wait, deferred transactions
+# (the baseline writers use transaction.atomic instead of write_atomic)
+BASELINE_OPTIONS = {'init_command': 'PRAGMA journal_mode=DELETE;', 'timeout': 0}
+
+
+def _close_connections():
+    # Children must open their own SQLite handles instead of the parent's
+    connections.close_all()
+
+
+def _writer(args):
+    """Run profile saves the way profile_edit_view does; return (saves, lock errors)"""
+    profile_ids, writes, seed, baseline = args
+    atomic = transaction.atomic if baseline else write_atomic
+    rng = random.Random(seed)
+    saves = lock_errors = 0
+    for _ in range(writes):
+        try:
+            with atomic():
+                profile = EmployeeProfile.objects.get(pk=rng.choice(profile_ids))
+                # Always a new value, so no save is skipped as unchanged
+                profile.r_ser = profile.r_ser % 999 + 1
+                profile.save()
+            saves += 1
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            lock_errors += 1
+    # Pool workers exit without running atexit handlers or waiting for daemon threads
+    if not audit_writer.wait(timeout=30):
+        raise RuntimeError('Audit log entries of the stress saves were not written')
+    connections.close_all()
+    return saves, lock_errors
+
+
+class Command(BaseCommand):
+    help = 'Stress the SQLite database with parallel profile writers and report lock errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Number of parallel writer processes')
+        parser.add_argument('--writes', type=int, default=200, help='Profile saves per writer')
+        parser.add_argument('--baseline', action='store_true',
+                            help='Run with stock SQLite settings instead of SQLITE_OPTIONS for comparison')
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('sqlite_stress only applies to SQLite databases')
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('sqlite_stress needs the fork start method')
+
+        if options['baseline']:
+            connection.close()
+            connection.settings_dict['OPTIONS'] = dict(BASELINE_OPTIONS)
+
+        profile_ids = list(EmployeeProfile.objects.values_list('id', flat=True)[:500])
+        if not profile_ids:
+            raise CommandError('No profiles to write to; run seed_demo_data first')
+        journal_mode = connection.cursor().execute('PRAGMA journal_mode').fetchone()[0]
+        connection.close()
+
+        jobs = [(profile_ids, options['writes'], seed, options['baseline']) for seed in range(options['writers'])]
+        started = time.perf_counter()
+        pool = multiprocessing.get_context('fork').Pool(options['writers'], initializer=_close_connections)
+        try:
+            results = pool.map(_writer, jobs)
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            # Leaving the pool's with block would terminate() the workers instead
+            pool.join()
+        elapsed = time.perf_counter() - started
+
+        saves = sum(r[0] for r in results)
+        lock_errors = sum(r[1] for r in results)
+        self.stdout.write(
+            f'journal_mode={journal_mode}: {options["writers"]} writers, {saves} saves in {elapsed:.2f}s '
+            f'({saves / elapsed:.0f} saves/s), {lock_errors} "database is locked" errors'
+        )
+        if lock_errors and not options['baseline']:
+            raise CommandError(f'{lock_errors} writes failed with "database is locked"')
+        if not lock_errors:
+            self.stdout.write(self.style.SUCCESS('No lock errors under parallel writers'))
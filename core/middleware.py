@@ -0,0 +1,151 @@
+import cProfile
+import logging
+import random
+import time
+import traceback
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CORE_DIR = Path(__file__).resolve().parent
+
+
+def _core_stack():
+    """Return the core/ frames of the current stack, innermost last"""
+    frames = []
+    for frame in traceback.extract_stack():
+        filename = Path(frame.filename).resolve()
+        if CORE_DIR not in filename.parents or filename.name == 'middleware.py':
+            continue
+        frames.append(f'{filename.relative_to(CORE_DIR.parent)}:{frame.lineno} in {frame.name}')
+    return frames
+
+
+class _SlowQueryRecorder:
+    """Database execute wrapper collecting queries slower than the threshold"""
+
+    def __init__(self, threshold_ms, sample_rate):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.records = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= self.threshold_ms and random.random() < self.sample_rate:
+                self.records.append({
+                    'sql': sql,
+                    'params': params,
+                    'many': many,
+                    'duration_ms': duration_ms,
+                    'database': context['connection'].alias,
+                    'stack': _core_stack(),
+                })
+
+
+def explain_query(connection, sql, params):
+    """Run the backend's EXPLAIN for a SELECT statement and return it as text"""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return '\n'.join(' | '.join(str(col) for col in row) for row in cursor.fetchall())
+
+
+class SlowQueryLogMiddleware:
+    """
+    Log ORM queries issued while serving core views that take longer than
+    SLOW_QUERY_THRESHOLD_MS, together with the calling view, the core stack
+    frames and the backend's EXPLAIN output. Records are sampled with
+    SLOW_QUERY_SAMPLE_RATE and the table is capped at SLOW_QUERY_LOG_MAX_ROWS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+        if threshold_ms is None:
+            return self.get_response(request)
+
+        recorder = _SlowQueryRecorder(threshold_ms, getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0))
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if recorder.records and match is not None and match.func.__module__.startswith('core.'):
+            self.persist(request, match.view_name, recorder.records)
+        return response
+
+    def persist(self, request, view_name, records):
+        from .models import SlowQueryLog
+
+        entries = []
+        for record in records:
+            connection = connections[record['database']]
+            explain = ''
+            if not record['many']:
+                try:
+                    explain = explain_query(connection, record['sql'], record['params'])
+                except Exception as exc:
+                    explain = f'EXPLAIN failed: {exc}'
+            entries.append(SlowQueryLog(
+                view_name=view_name or '',
+                path=request.path[:500],
+                sql=record['sql'],
+                params=repr(record['params']),
+                duration_ms=record['duration_ms'],
+                database=record['database'],
+                stack='\n'.join(record['stack']),
+                explain=explain,
+            ))
+        try:
+            SlowQueryLog.objects.bulk_create(entries)
+            SlowQueryLog.prune(getattr(settings, 'SLOW_QUERY_LOG_MAX_ROWS', 1000))
+        except Exception:
+            # Diagnostics must never break the request they describe
+            logger.exception('Could not store slow query log entries')
+
+
+class RequestProfilerMiddleware:
+    """
+    Run a single request under cProfile when a super admin asks for it with
+    the X-Profile-Request header or the _profile query flag. The profile
+    covers the view, the template rendering and the middleware below this one,
+    and Django dispatches the view as usual. It is stored under PROFILE_ROOT
+    and listed at /diagnostics/profiles/.
+    """
+
+    HEADER = 'HTTP_X_PROFILE_REQUEST'
+    QUERY_FLAG = '_profile'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.wants_profile(request):
+            return self.get_response(request)
+
+        from .profiling import save_profile
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        match = getattr(request, 'resolver_match', None)
+        response['X-Profile-Id'] = save_profile(profiler, match.view_name if match else '', request.user)
+        return response
+
+    def wants_profile(self, request):
+        if not (request.META.get(self.HEADER) or request.GET.get(self.QUERY_FLAG)):
+            return False
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_authenticated and user.role == 'super_admin')
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_employeeprofile_approved_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQueryLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(blank=True, default='', max_length=200)),
+                ('path', models.CharField(blank=True, default='', max_length=500)),
+                ('sql', models.TextField()),
+                ('params', models.TextField(blank=True, default='')),
+                ('duration_ms', models.FloatField()),
+                ('database', models.CharField(default='default', max_length=50)),
+                ('stack', models.TextField(blank=True, default='')),
+                ('explain', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Slow Query',
+                'verbose_name_plural': 'Slow Queries',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:29
+
+from django.db import migrations, models
+
+
+def fill_zone_key(apps, schema_editor):
+    EmployeeProfile = apps.get_model('core', 'EmployeeProfile')
+    profiles = EmployeeProfile.objects.only('id', 'zone')
+    batch = []
+    for profile in profiles.iterator(chunk_size=1000):
+        # Same rule as core.models.normalize_key
+        profile.zone_key = (profile.zone or '').strip().casefold()
+        batch.append(profile)
+        if len(batch) >= 1000:
+            EmployeeProfile.objects.bulk_update(batch, ['zone_key'])
+            batch = []
+    EmployeeProfile.objects.bulk_update(batch, ['zone_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_profile_and_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='employeeprofile',
+            name='profile_zone_created_idx',
+        ),
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='zone_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_zone_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['zone_key', '-created_at'], name='profile_zone_key_created_idx'),
+        ),
+    ]
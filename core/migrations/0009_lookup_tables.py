@@ -0,0 +1,280 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:31
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Reference data that used to live in inline choices on EmployeeProfile.
+# After this migration new rows are added through the admin, not migrations.
+
+AGENCIES = [
+    ('undp', 'UNDP - United Nations Development Programme'),
+    ('unicef', "UNICEF - United Nations Children's Fund"),
+    ('who', 'WHO - World Health Organization'),
+    ('unhcr', 'UNHCR - UN Refugee Agency'),
+    ('sdg', 'SDG Integration'),
+    ('climate', 'Climate Change Adaptation'),
+    ('governance', 'Democratic Governance'),
+    ('crisis', 'Crisis Prevention & Recovery'),
+    ('health', 'Health Cluster'),
+    ('education', 'Education Cluster'),
+    ('protection', 'Protection Cluster'),
+    ('shelter', 'Shelter Cluster'),
+    ('co', 'Country Office'),
+    ('ro', 'Regional Office'),
+    ('hq', 'Headquarters'),
+    ('liaison', 'Liaison Office'),
+]
+
+DUTY_STATIONS = [
+    ('dhaka', 'Dhaka'), ('chittagong', 'Chittagong'), ('sylhet', 'Sylhet'),
+    ('rajshahi', 'Rajshahi'), ('khulna', 'Khulna'), ('barisal', 'Barisal'),
+    ('rangpur', 'Rangpur'), ('mymensingh', 'Mymensingh'), ('other', 'Other'),
+]
+
+NATIONALITIES = [
+    ('afghanistan', 'Afghanistan'), ('albania', 'Albania'), ('algeria', 'Algeria'),
+    ('andorra', 'Andorra'), ('angola', 'Angola'), ('antigua_and_barbuda', 'Antigua and Barbuda'),
+    ('argentina', 'Argentina'), ('armenia', 'Armenia'), ('australia', 'Australia'),
+    ('austria', 'Austria'), ('azerbaijan', 'Azerbaijan'), ('bahamas', 'Bahamas'),
+    ('bahrain', 'Bahrain'), ('bangladesh', 'Bangladesh'), ('barbados', 'Barbados'),
+    ('belarus', 'Belarus'), ('belgium', 'Belgium'), ('belize', 'Belize'),
+    ('benin', 'Benin'), ('bhutan', 'Bhutan'), ('bolivia', 'Bolivia'),
+    ('bosnia_and_herzegovina', 'Bosnia and Herzegovina'), ('botswana', 'Botswana'), ('brazil', 'Brazil'),
+    ('brunei', 'Brunei'), ('bulgaria', 'Bulgaria'), ('burkina_faso', 'Burkina Faso'),
+    ('burundi', 'Burundi'), ('cambodia', 'Cambodia'), ('cameroon', 'Cameroon'),
+    ('canada', 'Canada'), ('cape_verde', 'Cape Verde'), ('central_african_republic', 'Central African Republic'),
+    ('chad', 'Chad'), ('chile', 'Chile'), ('china', 'China'),
+    ('colombia', 'Colombia'), ('comoros', 'Comoros'), ('congo', 'Congo'),
+    ('costa_rica', 'Costa Rica'), ('croatia', 'Croatia'), ('cuba', 'Cuba'),
+    ('cyprus', 'Cyprus'), ('czech_republic', 'Czech Republic'), ('denmark', 'Denmark'),
+    ('djibouti', 'Djibouti'), ('dominica', 'Dominica'), ('dominican_republic', 'Dominican Republic'),
+    ('east_timor', 'East Timor'), ('ecuador', 'Ecuador'), ('egypt', 'Egypt'),
+    ('el_salvador', 'El Salvador'), ('equatorial_guinea', 'Equatorial Guinea'), ('eritrea', 'Eritrea'),
+    ('estonia', 'Estonia'), ('eswatini', 'Eswatini'), ('ethiopia', 'Ethiopia'),
+    ('fiji', 'Fiji'), ('finland', 'Finland'), ('france', 'France'),
+    ('gabon', 'Gabon'), ('gambia', 'Gambia'), ('georgia', 'Georgia'),
+    ('germany', 'Germany'), ('ghana', 'Ghana'), ('greece', 'Greece'),
+    ('grenada', 'Grenada'), ('guatemala', 'Guatemala'), ('guinea', 'Guinea'),
+    ('guinea_bissau', 'Guinea-Bissau'), ('guyana', 'Guyana'), ('haiti', 'Haiti'),
+    ('honduras', 'Honduras'), ('hungary', 'Hungary'), ('iceland', 'Iceland'),
+    ('india', 'India'), ('indonesia', 'Indonesia'), ('iran', 'Iran'),
+    ('iraq', 'Iraq'), ('ireland', 'Ireland'), ('israel', 'Israel'),
+    ('italy', 'Italy'), ('ivory_coast', 'Ivory Coast'), ('jamaica', 'Jamaica'),
+    ('japan', 'Japan'), ('jordan', 'Jordan'), ('kazakhstan', 'Kazakhstan'),
+    ('kenya', 'Kenya'), ('kiribati', 'Kiribati'), ('kuwait', 'Kuwait'),
+    ('kyrgyzstan', 'Kyrgyzstan'), ('laos', 'Laos'), ('latvia', 'Latvia'),
+    ('lebanon', 'Lebanon'), ('lesotho', 'Lesotho'), ('liberia', 'Liberia'),
+    ('libya', 'Libya'), ('liechtenstein', 'Liechtenstein'), ('lithuania', 'Lithuania'),
+    ('luxembourg', 'Luxembourg'), ('madagascar', 'Madagascar'), ('malawi', 'Malawi'),
+    ('malaysia', 'Malaysia'), ('maldives', 'Maldives'), ('mali', 'Mali'),
+    ('malta', 'Malta'), ('marshall_islands', 'Marshall Islands'), ('mauritania', 'Mauritania'),
+    ('mauritius', 'Mauritius'), ('mexico', 'Mexico'), ('micronesia', 'Micronesia'),
+    ('moldova', 'Moldova'), ('monaco', 'Monaco'), ('mongolia', 'Mongolia'),
+    ('montenegro', 'Montenegro'), ('morocco', 'Morocco'), ('mozambique', 'Mozambique'),
+    ('myanmar', 'Myanmar'), ('namibia', 'Namibia'), ('nauru', 'Nauru'),
+    ('nepal', 'Nepal'), ('netherlands', 'Netherlands'), ('new_zealand', 'New Zealand'),
+    ('nicaragua', 'Nicaragua'), ('niger', 'Niger'), ('nigeria', 'Nigeria'),
+    ('north_korea', 'North Korea'), ('north_macedonia', 'North Macedonia'), ('norway', 'Norway'),
+    ('oman', 'Oman'), ('pakistan', 'Pakistan'), ('palau', 'Palau'),
+    ('panama', 'Panama'), ('papua_new_guinea', 'Papua New Guinea'), ('paraguay', 'Paraguay'),
+    ('peru', 'Peru'), ('philippines', 'Philippines'), ('poland', 'Poland'),
+    ('portugal', 'Portugal'), ('qatar', 'Qatar'), ('romania', 'Romania'),
+    ('russia', 'Russia'), ('rwanda', 'Rwanda'), ('saint_kitts_and_nevis', 'Saint Kitts and Nevis'),
+    ('saint_lucia', 'Saint Lucia'), ('saint_vincent_and_the_grenadines', 'Saint Vincent and the Grenadines'), ('samoa', 'Samoa'),
+    ('san_marino', 'San Marino'), ('sao_tome_and_principe', 'Sao Tome and Principe'), ('saudi_arabia', 'Saudi Arabia'),
+    ('senegal', 'Senegal'), ('serbia', 'Serbia'), ('seychelles', 'Seychelles'),
+    ('sierra_leone', 'Sierra Leone'), ('singapore', 'Singapore'), ('slovakia', 'Slovakia'),
+    ('slovenia', 'Slovenia'), ('solomon_islands', 'Solomon Islands'), ('somalia', 'Somalia'),
+    ('south_africa', 'South Africa'), ('south_korea', 'South Korea'), ('south_sudan', 'South Sudan'),
+    ('spain', 'Spain'), ('sri_lanka', 'Sri Lanka'), ('sudan', 'Sudan'),
+    ('suriname', 'Suriname'), ('sweden', 'Sweden'), ('switzerland', 'Switzerland'),
+    ('syria', 'Syria'), ('taiwan', 'Taiwan'), ('tajikistan', 'Tajikistan'),
+    ('tanzania', 'Tanzania'), ('thailand', 'Thailand'), ('togo', 'Togo'),
+    ('tonga', 'Tonga'), ('trinidad_and_tobago', 'Trinidad and Tobago'), ('tunisia', 'Tunisia'),
+    ('turkey', 'Turkey'), ('turkmenistan', 'Turkmenistan'), ('tuvalu', 'Tuvalu'),
+    ('uganda', 'Uganda'), ('ukraine', 'Ukraine'), ('united_arab_emirates', 'United Arab Emirates'),
+    ('united_kingdom', 'United Kingdom'), ('united_states', 'United States'), ('uruguay', 'Uruguay'),
+    ('uzbekistan', 'Uzbekistan'), ('vanuatu', 'Vanuatu'), ('vatican_city', 'Vatican City'),
+    ('venezuela', 'Venezuela'), ('vietnam', 'Vietnam'), ('yemen', 'Yemen'),
+    ('zambia', 'Zambia'), ('zimbabwe', 'Zimbabwe'),
+]
+
+# Lookup row for profiles whose old value was blank
+UNKNOWN_CODE = 'unknown'
+
+# (lookup model, old CharField on EmployeeProfile, temporary FK field, seed rows)
+LOOKUPS = [
+    ('Agency', 'agency_project_cluster_office', 'agency_ref', AGENCIES),
+    ('DutyStation', 'duty_station', 'duty_station_ref', DUTY_STATIONS),
+    ('Nationality', 'nationality', 'nationality_ref', NATIONALITIES),
+]
+
+
+def seed_lookups(apps, schema_editor):
+    EmployeeProfile = apps.get_model('core', 'EmployeeProfile')
+    for model_name, old_field, _, rows in LOOKUPS:
+        Lookup = apps.get_model('core', model_name)
+        known = {code for code, _ in rows}
+        # Keep any stored value that is not in the list instead of losing it
+        extra = (EmployeeProfile.objects.exclude(**{f'{old_field}__in': known})
+                 .values_list(old_field, flat=True).distinct())
+        rows = rows + [(code, code.replace('_', ' ').title()) for code in extra if code]
+        Lookup.objects.bulk_create(
+            [Lookup(code=code, name=name, position=position) for position, (code, name) in enumerate(rows)]
+        )
+
+
+def codes_to_keys(apps, schema_editor):
+    EmployeeProfile = apps.get_model('core', 'EmployeeProfile')
+    for model_name, old_field, new_field, _ in LOOKUPS:
+        Lookup = apps.get_model('core', model_name)
+        # One UPDATE per distinct value rather than one per profile
+        for pk, code in Lookup.objects.values_list('pk', 'code'):
+            EmployeeProfile.objects.filter(**{old_field: code}).update(**{new_field: pk})
+        # Blank values have no row of their own, and the column becomes NOT NULL below
+        unmapped = EmployeeProfile.objects.filter(**{f'{new_field}__isnull': True})
+        if unmapped.exists():
+            fallback, _ = Lookup.objects.get_or_create(
+                code=UNKNOWN_CODE, defaults={'name': 'Unknown', 'position': Lookup.objects.count()},
+            )
+            unmapped.update(**{new_field: fallback.pk})
+
+
+def keys_to_codes(apps, schema_editor):
+    EmployeeProfile = apps.get_model('core', 'EmployeeProfile')
+    for model_name, old_field, new_field, _ in LOOKUPS:
+        Lookup = apps.get_model('core', model_name)
+        for pk, code in Lookup.objects.values_list('pk', 'code'):
+            code = '' if code == UNKNOWN_CODE else code
+            EmployeeProfile.objects.filter(**{new_field: pk}).update(**{old_field: code})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_profile_zone_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Agency',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('code', models.SlugField(help_text='Stable key used in report URLs and imports', unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('position', models.PositiveSmallIntegerField(default=0, help_text='Display order in drop-downs')),
+            ],
+            options={
+                'verbose_name': 'Agency/Project/Cluster/Office',
+                'verbose_name_plural': 'Agencies/Projects/Clusters/Offices',
+                'ordering': ['position', 'name'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DutyStation',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('code', models.SlugField(help_text='Stable key used in report URLs and imports', unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('position', models.PositiveSmallIntegerField(default=0, help_text='Display order in drop-downs')),
+            ],
+            options={
+                'verbose_name': 'Duty Station',
+                'verbose_name_plural': 'Duty Stations',
+                'ordering': ['position', 'name'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Nationality',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('code', models.SlugField(help_text='Stable key used in report URLs and imports', unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('position', models.PositiveSmallIntegerField(default=0, help_text='Display order in drop-downs')),
+            ],
+            options={
+                'verbose_name': 'Nationality',
+                'verbose_name_plural': 'Nationalities',
+                'ordering': ['position', 'name'],
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(seed_lookups, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='agency_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.agency'),
+        ),
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='duty_station_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.dutystation'),
+        ),
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='nationality_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.nationality'),
+        ),
+        migrations.RunPython(codes_to_keys, keys_to_codes),
+        migrations.RemoveIndex(
+            model_name='employeeprofile',
+            name='profile_agency_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='employeeprofile',
+            name='profile_station_created_idx',
+        ),
+        migrations.RemoveField(
+            model_name='employeeprofile',
+            name='agency_project_cluster_office',
+        ),
+        migrations.RemoveField(
+            model_name='employeeprofile',
+            name='duty_station',
+        ),
+        migrations.RemoveField(
+            model_name='employeeprofile',
+            name='nationality',
+        ),
+        migrations.RenameField(
+            model_name='employeeprofile',
+            old_name='agency_ref',
+            new_name='agency_project_cluster_office',
+        ),
+        migrations.RenameField(
+            model_name='employeeprofile',
+            old_name='duty_station_ref',
+            new_name='duty_station',
+        ),
+        migrations.RenameField(
+            model_name='employeeprofile',
+            old_name='nationality_ref',
+            new_name='nationality',
+        ),
+        migrations.AlterField(
+            model_name='employeeprofile',
+            name='agency_project_cluster_office',
+            field=models.ForeignKey(db_index=False, default=core.models.default_agency, on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='core.agency', verbose_name='Name of Agency/Project/Cluster/Office'),
+        ),
+        migrations.AlterField(
+            model_name='employeeprofile',
+            name='duty_station',
+            field=models.ForeignKey(db_index=False, default=core.models.default_duty_station, on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='core.dutystation', verbose_name='Duty Station'),
+        ),
+        migrations.AlterField(
+            model_name='employeeprofile',
+            name='nationality',
+            field=models.ForeignKey(default=core.models.default_nationality, on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='core.nationality', verbose_name='Nationality'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['agency_project_cluster_office', '-created_at'], name='profile_agency_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['duty_station', '-created_at'], name='profile_station_created_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_auditlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiryAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('id_contact_expiry', 'ID/Contact Expiry'), ('bsafe', 'BSAFE'), ('sat', 'SAT'), ('sbfat', 'SBFAT')], max_length=20)),
+                ('due_date', models.DateField()),
+                ('window', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Expiry Alert',
+                'verbose_name_plural': 'Expiry Alerts',
+                'ordering': ['due_date'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('profile_submitted', 'Profile Submitted'), ('profile_approved', 'Profile Approved'), ('profile_rejected', 'Profile Rejected'), ('security_update', 'Security Information Updated'), ('profile_edited', 'Profile Edited'), ('expiry_alert', 'ID or Training Expiring')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['id_contact_expiry'], name='profile_id_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['bsafe'], name='profile_bsafe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['sat'], name='profile_sat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['sbfat'], name='profile_sbfat_idx'),
+        ),
+        migrations.AddField(
+            model_name='expiryalert',
+            name='profile',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expiry_alerts', to='core.employeeprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='expiryalert',
+            index=models.Index(fields=['due_date'], name='expiry_alert_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='expiryalert',
+            constraint=models.UniqueConstraint(fields=('profile', 'field', 'due_date', 'window'), name='expiry_alert_unique'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_expiryalert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('all', 'All Staff'), ('agency', 'Project'), ('duty_station', 'District'), ('zone', 'Zone')], max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=100)),
+                ('total', models.IntegerField(default=0)),
+                ('bsafe_valid', models.IntegerField(default=0)),
+                ('sat_valid', models.IntegerField(default=0)),
+                ('sbfat_valid', models.IntegerField(default=0)),
+                ('id_valid', models.IntegerField(default=0)),
+                ('compliant', models.IntegerField(default=0)),
+                ('as_of', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Compliance Summary',
+                'verbose_name_plural': 'Compliance Summaries',
+                'ordering': ['dimension', 'key'],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='compliance_summary_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:04
+
+from django.db import migrations, models
+
+
+def fill_thana_key(apps, schema_editor):
+    EmployeeProfile = apps.get_model('core', 'EmployeeProfile')
+    profiles = EmployeeProfile.objects.only('id', 'police_station_thana')
+    batch = []
+    for profile in profiles.iterator(chunk_size=1000):
+        # Same rule as core.models.normalize_key
+        profile.thana_key = (profile.police_station_thana or '').strip().casefold()
+        batch.append(profile)
+        if len(batch) >= 1000:
+            EmployeeProfile.objects.bulk_update(batch, ['thana_key'])
+            batch = []
+    EmployeeProfile.objects.bulk_update(batch, ['thana_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_compliancesummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='thana_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_thana_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['thana_key'], name='profile_thana_key_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_profile_thana_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('profiles_created', models.IntegerField(default=0)),
+                ('profile_edits', models.IntegerField(default=0)),
+                ('profiles_edited', models.IntegerField(default=0)),
+                ('notifications', models.IntegerField(default=0)),
+                ('total_profiles', models.IntegerField(blank=True, null=True)),
+                ('complete_profiles', models.IntegerField(blank=True, null=True)),
+                ('approved_profiles', models.IntegerField(blank=True, null=True)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Activity',
+                'verbose_name_plural': 'Daily Activity',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['-created_at'], name='notification_created_idx'),
+        ),
+    ]
@@ -1,8 +1,15 @@
+import time
+
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
+def normalize_key(value):
+    """Canonical form of a free-text value, used for case-insensitive lookups that can use an index"""
+    return (value or '').strip().casefold()
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         ('user', 'User'),
@@ -14,109 +21,222 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
-class EmployeeProfile(models.Model):
+# Per-process cache of the lookup tables: model -> (expires_at, rows, labels, pks_by_code, codes)
+_lookup_cache = {}
+LOOKUP_CACHE_SECONDS = 300
+
+class LookupTable(models.Model):
+    """
+    Small reference table (agencies, duty stations, nationalities) referenced
+    by EmployeeProfile through an integer foreign key.
+
+    Rows are cached in-process so forms, reports and exports can turn keys into
+    labels without a query or join. Saving or deleting a row clears this
+    process's cache; other workers pick the change up within
+    LOOKUP_CACHE_SECONDS.
+    """
+    id = models.SmallAutoField(primary_key=True)
+    code = models.SlugField(max_length=50, unique=True, help_text="Stable key used in report URLs and imports")
+    name = models.CharField(max_length=200)
+    position = models.PositiveSmallIntegerField(default=0, help_text="Display order in drop-downs")
+
+    class Meta:
+        abstract = True
+        ordering = ['position', 'name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_cache()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.invalidate_cache()
+        return result
+
+    @classmethod
+    def invalidate_cache(cls):
+        _lookup_cache.pop(cls, None)
+
+    @classmethod
+    def _cached(cls):
+        entry = _lookup_cache.get(cls)
+        if entry is None or entry[0] < time.monotonic():
+            rows = list(cls.objects.order_by('position', 'name').values_list('pk', 'code', 'name'))
+            entry = (
+                time.monotonic() + LOOKUP_CACHE_SECONDS,
+                rows,
+                {pk: name for pk, _, name in rows},
+                {normalize_key(code): pk for pk, code, _ in rows},
+                {pk: code for pk, code, _ in rows},
+            )
+            _lookup_cache[cls] = entry
+        return entry
+
+    @classmethod
+    def cached_choices(cls):
+        """(pk, name) pairs in display order"""
+        return [(pk, name) for pk, _, name in cls._cached()[1]]
+
+    @classmethod
+    def cached_rows(cls):
+        """(pk, code, name) rows in display order"""
+        return cls._cached()[1]
+
+    @classmethod
+    def label_for(cls, pk):
+        return cls._cached()[2].get(pk, '')
+
+    @classmethod
+    def code_for(cls, pk):
+        return cls._cached()[4].get(pk, '')
+
+    @classmethod
+    def pk_for_code(cls, code):
+        """Primary key for a code, matched case-insensitively; None when unknown"""
+        return cls._cached()[3].get(normalize_key(code))
+
+class Agency(LookupTable):
+    class Meta(LookupTable.Meta):
+        verbose_name = "Agency/Project/Cluster/Office"
+        verbose_name_plural = "Agencies/Projects/Clusters/Offices"
+
+class DutyStation(LookupTable):
+    class Meta(LookupTable.Meta):
+        verbose_name = "Duty Station"
+        verbose_name_plural = "Duty Stations"
+
+class Nationality(LookupTable):
+    class Meta(LookupTable.Meta):
+        verbose_name = "Nationality"
+        verbose_name_plural = "Nationalities"
+
+class EditConflict(Exception):
+    """Raised when saving a profile whose row was changed by someone else since it was loaded"""
+
+class DirtyFieldsMixin:
+    """
+    Track which concrete fields changed since the instance was loaded.
+
+    save() on an instance loaded from the database writes only the changed
+    columns (plus auto_now fields) and skips the UPDATE entirely when nothing
+    changed. After each save, changed_fields holds the names of the fields
+    that were written and changed_values maps them to (old, new) attribute
+    values, for consumers such as notifications and the audit log.
+    """
+    _loaded_values = None
+    changed_fields = frozenset()
+    changed_values = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def _take_snapshot(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields if field.attname not in deferred
+        }
+
+    def get_dirty_fields(self):
+        """Names of the loaded fields whose value differs from the database"""
+        if self._loaded_values is None:
+            return {field.name for field in self._meta.concrete_fields}
+        return {
+            field.name for field in self._meta.concrete_fields
+            if field.attname in self._loaded_values
+            and getattr(self, field.attname) != self._loaded_values[field.attname]
+        }
+
+    def save(self, *args, **kwargs):
+        tracked = (
+            self._loaded_values is not None and not self._state.adding and not args
+            and kwargs.get('update_fields') is None and not kwargs.get('force_insert')
+        )
+        if tracked:
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                self.changed_fields = frozenset()
+                self.changed_values = {}
+                return
+            auto_now = {field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)}
+            kwargs['update_fields'] = dirty | auto_now
+        update_fields = kwargs.get('update_fields')
+        self.changed_fields = frozenset(
+            update_fields if update_fields is not None else (f.name for f in self._meta.concrete_fields)
+        )
+        # Set before the write so post_save receivers see this save's changes,
+        # and again after it to pick up the primary key and auto_now values
+        self._collect_changed_values()
+        super().save(*args, **kwargs)
+        self._collect_changed_values()
+        self._take_snapshot()
+
+    @classmethod
+    def bulk_update_dirty(cls, instances, batch_size=None):
+        """
+        Write the dirty fields of instances with one bulk_update and return the
+        instances that had changes.
+
+        bulk_update bypasses save(), so callers set auto_now fields and any
+        other bookkeeping columns themselves. changed_fields and changed_values
+        are recorded on each instance as save() would record them.
+        """
+        changed, fields = [], set()
+        for instance in instances:
+            dirty = instance.get_dirty_fields()
+            if dirty:
+                instance.changed_fields = frozenset(dirty)
+                fields |= dirty
+                changed.append(instance)
+        if changed:
+            cls._default_manager.bulk_update(changed, fields, batch_size=batch_size)
+            for instance in changed:
+                instance._collect_changed_values()
+                instance._take_snapshot()
+        return changed
+
+    def _collect_changed_values(self):
+        loaded = self._loaded_values or {}
+        self.changed_values = {
+            field.name: (loaded.get(field.attname), getattr(self, field.attname))
+            for field in self._meta.concrete_fields if field.name in self.changed_fields
+        }
+
+def default_agency():
+    return Agency.pk_for_code('undp')
+
+def default_duty_station():
+    return DutyStation.pk_for_code('dhaka')
+
+def default_nationality():
+    return Nationality.pk_for_code('bangladesh')
+
+class EmployeeProfile(DirtyFieldsMixin, models.Model):
     # Basic Information (Fields 1-25) - Users can edit these
-    agency_project_cluster_office = models.CharField(
-        max_length=200, 
+    agency_project_cluster_office = models.ForeignKey(
+        Agency,
+        on_delete=models.PROTECT,
         verbose_name="Name of Agency/Project/Cluster/Office",
-        default='undp',
-        choices=[
-            ('undp', 'UNDP - United Nations Development Programme'),
-            ('unicef', 'UNICEF - United Nations Children\'s Fund'),
-            ('who', 'WHO - World Health Organization'),
-            ('unhcr', 'UNHCR - UN Refugee Agency'),
-            ('sdg', 'SDG Integration'),
-            ('climate', 'Climate Change Adaptation'),
-            ('governance', 'Democratic Governance'),
-            ('crisis', 'Crisis Prevention & Recovery'),
-            ('health', 'Health Cluster'),
-            ('education', 'Education Cluster'),
-            ('protection', 'Protection Cluster'),
-            ('shelter', 'Shelter Cluster'),
-            ('co', 'Country Office'),
-            ('ro', 'Regional Office'),
-            ('hq', 'Headquarters'),
-            ('liaison', 'Liaison Office'),
-        ]
+        default=default_agency,
+        db_index=False,  # covered by profile_agency_created_idx
+        related_name='profiles',
     )
     r_ser = models.PositiveIntegerField(verbose_name="R/Ser", default=0)
     sl = models.PositiveIntegerField(verbose_name="SL", default=0)
     name = models.CharField(max_length=200, verbose_name="Name", default="")
     post_title_designation = models.CharField(max_length=200, verbose_name="Post Title/Designation", default="", blank=True)
-    nationality = models.CharField(
-        max_length=100, 
+    nationality = models.ForeignKey(
+        Nationality,
+        on_delete=models.PROTECT,
         verbose_name="Nationality",
-        default='bangladesh',
-        choices=[
-            ('afghanistan', 'Afghanistan'), ('albania', 'Albania'), ('algeria', 'Algeria'),
-            ('andorra', 'Andorra'), ('angola', 'Angola'), ('antigua_and_barbuda', 'Antigua and Barbuda'),
-            ('argentina', 'Argentina'), ('armenia', 'Armenia'), ('australia', 'Australia'),
-            ('austria', 'Austria'), ('azerbaijan', 'Azerbaijan'), ('bahamas', 'Bahamas'),
-            ('bahrain', 'Bahrain'), ('bangladesh', 'Bangladesh'), ('barbados', 'Barbados'),
-            ('belarus', 'Belarus'), ('belgium', 'Belgium'), ('belize', 'Belize'),
-            ('benin', 'Benin'), ('bhutan', 'Bhutan'), ('bolivia', 'Bolivia'),
-            ('bosnia_and_herzegovina', 'Bosnia and Herzegovina'), ('botswana', 'Botswana'),
-            ('brazil', 'Brazil'), ('brunei', 'Brunei'), ('bulgaria', 'Bulgaria'),
-            ('burkina_faso', 'Burkina Faso'), ('burundi', 'Burundi'), ('cambodia', 'Cambodia'),
-            ('cameroon', 'Cameroon'), ('canada', 'Canada'), ('cape_verde', 'Cape Verde'),
-            ('central_african_republic', 'Central African Republic'), ('chad', 'Chad'),
-            ('chile', 'Chile'), ('china', 'China'), ('colombia', 'Colombia'),
-            ('comoros', 'Comoros'), ('congo', 'Congo'), ('costa_rica', 'Costa Rica'),
-            ('croatia', 'Croatia'), ('cuba', 'Cuba'), ('cyprus', 'Cyprus'),
-            ('czech_republic', 'Czech Republic'), ('denmark', 'Denmark'), ('djibouti', 'Djibouti'),
-            ('dominica', 'Dominica'), ('dominican_republic', 'Dominican Republic'),
-            ('east_timor', 'East Timor'), ('ecuador', 'Ecuador'), ('egypt', 'Egypt'),
-            ('el_salvador', 'El Salvador'), ('equatorial_guinea', 'Equatorial Guinea'),
-            ('eritrea', 'Eritrea'), ('estonia', 'Estonia'), ('eswatini', 'Eswatini'),
-            ('ethiopia', 'Ethiopia'), ('fiji', 'Fiji'), ('finland', 'Finland'),
-            ('france', 'France'), ('gabon', 'Gabon'), ('gambia', 'Gambia'),
-            ('georgia', 'Georgia'), ('germany', 'Germany'), ('ghana', 'Ghana'),
-            ('greece', 'Greece'), ('grenada', 'Grenada'), ('guatemala', 'Guatemala'),
-            ('guinea', 'Guinea'), ('guinea_bissau', 'Guinea-Bissau'), ('guyana', 'Guyana'),
-            ('haiti', 'Haiti'), ('honduras', 'Honduras'), ('hungary', 'Hungary'),
-            ('iceland', 'Iceland'), ('india', 'India'), ('indonesia', 'Indonesia'),
-            ('iran', 'Iran'), ('iraq', 'Iraq'), ('ireland', 'Ireland'),
-            ('israel', 'Israel'), ('italy', 'Italy'), ('ivory_coast', 'Ivory Coast'),
-            ('jamaica', 'Jamaica'), ('japan', 'Japan'), ('jordan', 'Jordan'),
-            ('kazakhstan', 'Kazakhstan'), ('kenya', 'Kenya'), ('kiribati', 'Kiribati'),
-            ('kuwait', 'Kuwait'), ('kyrgyzstan', 'Kyrgyzstan'), ('laos', 'Laos'),
-            ('latvia', 'Latvia'), ('lebanon', 'Lebanon'), ('lesotho', 'Lesotho'),
-            ('liberia', 'Liberia'), ('libya', 'Libya'), ('liechtenstein', 'Liechtenstein'),
-            ('lithuania', 'Lithuania'), ('luxembourg', 'Luxembourg'), ('madagascar', 'Madagascar'),
-            ('malawi', 'Malawi'), ('malaysia', 'Malaysia'), ('maldives', 'Maldives'),
-            ('mali', 'Mali'), ('malta', 'Malta'), ('marshall_islands', 'Marshall Islands'),
-            ('mauritania', 'Mauritania'), ('mauritius', 'Mauritius'), ('mexico', 'Mexico'),
-            ('micronesia', 'Micronesia'), ('moldova', 'Moldova'), ('monaco', 'Monaco'),
-            ('mongolia', 'Mongolia'), ('montenegro', 'Montenegro'), ('morocco', 'Morocco'),
-            ('mozambique', 'Mozambique'), ('myanmar', 'Myanmar'), ('namibia', 'Namibia'),
-            ('nauru', 'Nauru'), ('nepal', 'Nepal'), ('netherlands', 'Netherlands'),
-            ('new_zealand', 'New Zealand'), ('nicaragua', 'Nicaragua'), ('niger', 'Niger'),
-            ('nigeria', 'Nigeria'), ('north_korea', 'North Korea'), ('north_macedonia', 'North Macedonia'),
-            ('norway', 'Norway'), ('oman', 'Oman'), ('pakistan', 'Pakistan'),
-            ('palau', 'Palau'), ('panama', 'Panama'), ('papua_new_guinea', 'Papua New Guinea'),
-            ('paraguay', 'Paraguay'), ('peru', 'Peru'), ('philippines', 'Philippines'),
-            ('poland', 'Poland'), ('portugal', 'Portugal'), ('qatar', 'Qatar'),
-            ('romania', 'Romania'), ('russia', 'Russia'), ('rwanda', 'Rwanda'),
-            ('saint_kitts_and_nevis', 'Saint Kitts and Nevis'), ('saint_lucia', 'Saint Lucia'),
-            ('saint_vincent_and_the_grenadines', 'Saint Vincent and the Grenadines'),
-            ('samoa', 'Samoa'), ('san_marino', 'San Marino'), ('sao_tome_and_principe', 'Sao Tome and Principe'),
-            ('saudi_arabia', 'Saudi Arabia'), ('senegal', 'Senegal'), ('serbia', 'Serbia'),
-            ('seychelles', 'Seychelles'), ('sierra_leone', 'Sierra Leone'), ('singapore', 'Singapore'),
-            ('slovakia', 'Slovakia'), ('slovenia', 'Slovenia'), ('solomon_islands', 'Solomon Islands'),
-            ('somalia', 'Somalia'), ('south_africa', 'South Africa'), ('south_korea', 'South Korea'),
-            ('south_sudan', 'South Sudan'), ('spain', 'Spain'), ('sri_lanka', 'Sri Lanka'),
-            ('sudan', 'Sudan'), ('suriname', 'Suriname'), ('sweden', 'Sweden'),
-            ('switzerland', 'Switzerland'), ('syria', 'Syria'), ('taiwan', 'Taiwan'),
-            ('tajikistan', 'Tajikistan'), ('tanzania', 'Tanzania'), ('thailand', 'Thailand'),
-            ('togo', 'Togo'), ('tonga', 'Tonga'), ('trinidad_and_tobago', 'Trinidad and Tobago'),
-            ('tunisia', 'Tunisia'), ('turkey', 'Turkey'), ('turkmenistan', 'Turkmenistan'),
-            ('tuvalu', 'Tuvalu'), ('uganda', 'Uganda'), ('ukraine', 'Ukraine'),
-            ('united_arab_emirates', 'United Arab Emirates'), ('united_kingdom', 'United Kingdom'),
-            ('united_states', 'United States'), ('uruguay', 'Uruguay'), ('uzbekistan', 'Uzbekistan'),
-            ('vanuatu', 'Vanuatu'), ('vatican_city', 'Vatican City'), ('venezuela', 'Venezuela'),
-            ('vietnam', 'Vietnam'), ('yemen', 'Yemen'), ('zambia', 'Zambia'),
-            ('zimbabwe', 'Zimbabwe'),
-        ]
+        default=default_nationality,
+        related_name='profiles',
     )
     employee_id = models.CharField(max_length=20, unique=True, verbose_name="Employee ID", default="")
     gender = models.CharField(
@@ -135,15 +255,13 @@ class EmployeeProfile(models.Model):
         verbose_name="Contact Type",
         default='PA'
     )
-    duty_station = models.CharField(
-        max_length=200,
+    duty_station = models.ForeignKey(
+        DutyStation,
+        on_delete=models.PROTECT,
         verbose_name="Duty Station",
-        default='dhaka',
-        choices=[
-            ('dhaka', 'Dhaka'), ('chittagong', 'Chittagong'), ('sylhet', 'Sylhet'),
-            ('rajshahi', 'Rajshahi'), ('khulna', 'Khulna'), ('barisal', 'Barisal'),
-            ('rangpur', 'Rangpur'), ('mymensingh', 'Mymensingh'), ('other', 'Other')
-        ]
+        default=default_duty_station,
+        db_index=False,  # covered by profile_station_created_idx
+        related_name='profiles',
     )
     number_of_dependents = models.PositiveIntegerField(
         verbose_name="Number of Dependents",
@@ -152,7 +270,11 @@ class EmployeeProfile(models.Model):
     )
     residential_address = models.TextField(verbose_name="Residential Address (at Duty Station)", default="")
     zone = models.CharField(max_length=100, verbose_name="Zone", default="", blank=True)
+    # normalize_key(zone), kept in sync by save() so report filters can match zones exactly
+    zone_key = models.CharField(max_length=100, default="", blank=True, editable=False)
     police_station_thana = models.CharField(max_length=100, verbose_name="Police Station/Thana (Sub Zone)", default="", blank=True)
+    # normalize_key(police_station_thana), kept in sync by save() for the crisis roster filter
+    thana_key = models.CharField(max_length=100, default="", blank=True, editable=False)
     cell_phone_whatsapp = models.CharField(max_length=20, verbose_name="Cell Phone and WhatsApp Number", default="")
     emergency_contact_number = models.CharField(max_length=20, verbose_name="Emergency Contact Number", default="")
     emergency_contact_relation = models.CharField(max_length=100, verbose_name="Emergency Contact (Relation)", default="")
@@ -198,6 +320,9 @@ class EmployeeProfile(models.Model):
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_profiles')
     rejection_reason = models.TextField(blank=True, default="")
     
+    # Optimistic locking: bumped by every UPDATE, which only matches the version being edited
+    version = models.PositiveIntegerField(default=1, editable=False)
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -207,35 +332,97 @@ class EmployeeProfile(models.Model):
         verbose_name = "Employee Profile"
         verbose_name_plural = "Employee Profiles"
         ordering = ['-created_at']
+        indexes = [
+            # Dashboard and report listings are ordered newest first
+            models.Index(fields=['-created_at'], name='profile_created_idx'),
+            # Report/export filters, each followed by the list ordering; the
+            # leading column also serves the per-field GROUP BY statistics
+            models.Index(fields=['agency_project_cluster_office', '-created_at'], name='profile_agency_created_idx'),
+            models.Index(fields=['duty_station', '-created_at'], name='profile_station_created_idx'),
+            models.Index(fields=['contact_type', '-created_at'], name='profile_contact_created_idx'),
+            models.Index(fields=['zone_key', '-created_at'], name='profile_zone_key_created_idx'),
+            # Crisis roster filter by police station
+            models.Index(fields=['thana_key'], name='profile_thana_key_idx'),
+            # Date-range scans of check_expiries
+            models.Index(fields=['id_contact_expiry'], name='profile_id_expiry_idx'),
+            models.Index(fields=['bsafe'], name='profile_bsafe_idx'),
+            models.Index(fields=['sat'], name='profile_sat_idx'),
+            models.Index(fields=['sbfat'], name='profile_sbfat_idx'),
+        ]
     
     def __str__(self):
         return f"{self.employee_id} - {self.name}"
     
+    # Version the editor started from; set by the edit form, defaults to the loaded version
+    expected_version = None
+    
+    def save(self, *args, **kwargs):
+        self.zone_key = normalize_key(self.zone)
+        self.thana_key = normalize_key(self.police_station_thana)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'zone' in update_fields:
+            update_fields = kwargs['update_fields'] = {*update_fields, 'zone_key'}
+        if update_fields is not None and 'police_station_thana' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'thana_key'}
+        super().save(*args, **kwargs)
+    
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Compare-and-set in the UPDATE itself: WHERE id = %s AND version = <expected>
+        expected = self.version if self.expected_version is None else self.expected_version
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, expected + 1))
+        updated = super()._do_update(base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update)
+        if not updated:
+            if base_qs.filter(pk=pk_val).exists():
+                raise EditConflict(f'{self} was changed by someone else (expected version {expected})')
+            return False
+        self.version = expected + 1
+        self.expected_version = None
+        return True
+    
     def get_full_name(self):
         return self.name
 
+    # Labels for the lookup foreign keys, served from the in-process cache
+    @property
+    def agency_label(self):
+        return Agency.label_for(self.agency_project_cluster_office_id)
+
+    @property
+    def nationality_label(self):
+        return Nationality.label_for(self.nationality_id)
+
+    @property
+    def duty_station_label(self):
+        return DutyStation.label_for(self.duty_station_id)
+
     # Completion helpers
+    # Fields a complete profile has filled in; core.trends counts complete
+    # profiles in SQL from the same lists
+    BASIC_REQUIRED_FIELDS = (
+        'agency_project_cluster_office', 'r_ser', 'sl', 'name', 'post_title_designation',
+        'nationality', 'employee_id', 'gender', 'date_of_birth', 'contact_type',
+        'duty_station', 'residential_address', 'cell_phone_whatsapp',
+        'emergency_contact_number', 'emergency_contact_relation', 'email_official'
+    )
+    SECURITY_REQUIRED_FIELDS = (
+        'radio_call_sign', 'radio_serial_id', 'zone_name_with_appointment',
+        'office_location_address', 'appointment_unit_based_warden', 'unid_number',
+        'rfid_number', 'unid_issue_date', 'id_contact_expiry', 'id_deposit_date',
+        'bsafe', 'sat', 'sbfat'
+    )
+
     def is_basic_section_complete(self):
-        required_basic_fields = [
-            'agency_project_cluster_office', 'r_ser', 'sl', 'name', 'post_title_designation',
-            'nationality', 'employee_id', 'gender', 'date_of_birth', 'contact_type',
-            'duty_station', 'residential_address', 'cell_phone_whatsapp',
-            'emergency_contact_number', 'emergency_contact_relation', 'email_official'
-        ]
-        for field_name in required_basic_fields:
-            value = getattr(self, field_name)
+        for field_name in self.BASIC_REQUIRED_FIELDS:
+            # attname reads lookup foreign keys as ids instead of fetching the related rows
+            value = getattr(self, self._meta.get_field(field_name).attname)
             if value in [None, '', 0]:
                 return False
         return True
 
     def is_security_section_complete(self):
-        security_fields = [
-            'radio_call_sign', 'radio_serial_id', 'zone_name_with_appointment',
-            'office_location_address', 'appointment_unit_based_warden', 'unid_number',
-            'rfid_number', 'unid_issue_date', 'id_contact_expiry', 'id_deposit_date',
-            'bsafe', 'sat', 'sbfat'
-        ]
-        for field_name in security_fields:
+        for field_name in self.SECURITY_REQUIRED_FIELDS:
             value = getattr(self, field_name)
             if value in [None, '']:
                 return False
@@ -248,7 +435,7 @@ class EmployeeProfile(models.Model):
             return 'partially_completed'
         return 'incomplete'
 
-class Dependent(models.Model):
+class Dependent(DirtyFieldsMixin, models.Model):
     RELATIONSHIP_CHOICES = [
         ('spouse', 'Spouse'),
         ('son', 'Son'),
@@ -276,6 +463,7 @@ class Notification(models.Model):
         ('profile_rejected', 'Profile Rejected'),
         ('security_update', 'Security Information Updated'),
         ('profile_edited', 'Profile Edited'),
+        ('expiry_alert', 'ID or Training Expiring'),
     )
     
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
@@ -291,6 +479,14 @@ class Notification(models.Model):
         ordering = ['-created_at']
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
+        indexes = [
+            # Unread badge polled by every open tab
+            models.Index(fields=['recipient', 'is_read'], name='notification_unread_idx'),
+            # Notification list and navbar dropdown
+            models.Index(fields=['recipient', '-created_at'], name='notification_recent_idx'),
+            # Notifications per day for the activity trends
+            models.Index(fields=['-created_at'], name='notification_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.recipient.username}"
@@ -298,3 +494,174 @@ class Notification(models.Model):
     def mark_as_read(self):
         self.is_read = True
         self.save()
+
+class SlowQueryLog(models.Model):
+    view_name = models.CharField(max_length=200, blank=True, default="")
+    path = models.CharField(max_length=500, blank=True, default="")
+    sql = models.TextField()
+    params = models.TextField(blank=True, default="")
+    duration_ms = models.FloatField()
+    database = models.CharField(max_length=50, default='default')
+    stack = models.TextField(blank=True, default="")
+    explain = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Slow Query"
+        verbose_name_plural = "Slow Queries"
+
+    def __str__(self):
+        return f"{self.view_name} ({self.duration_ms:.0f} ms)"
+
+    @classmethod
+    def prune(cls, max_rows):
+        """Keep only the newest max_rows entries"""
+        cutoff = cls.objects.order_by('-id').values_list('id', flat=True)[max_rows:max_rows + 1].first()
+        if cutoff is not None:
+            cls.objects.filter(id__lte=cutoff).delete()
+
+class AuditLog(models.Model):
+    """
+    Append-only, field-level history of EmployeeProfile and Dependent changes.
+
+    One row per save or delete; changes maps each changed field to [old, new]
+    (foreign keys as ids). profile_id is a plain column so history outlives
+    deleted profiles. Rows are written by core.audit, never edited.
+    """
+    ACTION_CHOICES = (
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    )
+    OBJECT_TYPES = (
+        ('profile', 'Employee Profile'),
+        ('dependent', 'Dependent'),
+    )
+
+    profile_id = models.BigIntegerField()
+    object_type = models.CharField(max_length=20, choices=OBJECT_TYPES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Audit Log Entry"
+        verbose_name_plural = "Audit Log"
+        indexes = [
+            # History of one profile, newest first, optionally bounded in time
+            models.Index(fields=['profile_id', '-created_at'], name='audit_profile_created_idx'),
+            # Time-range queries across all profiles
+            models.Index(fields=['-created_at'], name='audit_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} {self.object_type} #{self.object_id} by {self.actor_id or 'system'}"
+
+class ExpiryAlert(models.Model):
+    """
+    An ID or training date of a profile that check_expiries has alerted on.
+
+    One row per profile, field, due date and alert window, so running the
+    check again never repeats an alert. A renewed date has a new due date and
+    starts a new series of alerts.
+    """
+    FIELD_CHOICES = (
+        ('id_contact_expiry', 'ID/Contact Expiry'),
+        ('bsafe', 'BSAFE'),
+        ('sat', 'SAT'),
+        ('sbfat', 'SBFAT'),
+    )
+
+    profile = models.ForeignKey(EmployeeProfile, on_delete=models.CASCADE, related_name='expiry_alerts')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    due_date = models.DateField()
+    # Days before the due date the alert was raised for; 0 once it has passed
+    window = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['due_date']
+        verbose_name = "Expiry Alert"
+        verbose_name_plural = "Expiry Alerts"
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'field', 'due_date', 'window'], name='expiry_alert_unique'),
+        ]
+        indexes = [
+            # Alerts already raised for the due dates a check covers
+            models.Index(fields=['due_date'], name='expiry_alert_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_field_display()} of profile #{self.profile_id} due {self.due_date}"
+
+class ComplianceSummary(models.Model):
+    """
+    Counts of staff with valid BSAFE, SAT and SBFAT training and an unexpired
+    ID, per project, district and zone (plus one row for all staff).
+
+    Rebuilt nightly by refresh_compliance as of that day and kept current in
+    between by core.compliance, which applies each profile change as a delta.
+    key is the lookup primary key for projects and districts and the zone_key
+    for zones.
+    """
+    DIMENSION_CHOICES = (
+        ('all', 'All Staff'),
+        ('agency', 'Project'),
+        ('duty_station', 'District'),
+        ('zone', 'Zone'),
+    )
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=100, blank=True, default="")
+    total = models.IntegerField(default=0)
+    bsafe_valid = models.IntegerField(default=0)
+    sat_valid = models.IntegerField(default=0)
+    sbfat_valid = models.IntegerField(default=0)
+    id_valid = models.IntegerField(default=0)
+    # Valid on all four counts
+    compliant = models.IntegerField(default=0)
+    # Date validity is judged on, until the next refresh
+    as_of = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['dimension', 'key']
+        verbose_name = "Compliance Summary"
+        verbose_name_plural = "Compliance Summaries"
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='compliance_summary_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_dimension_display()} {self.key}: {self.compliant}/{self.total}"
+
+class DailyActivity(models.Model):
+    """
+    One day's profile activity, recorded once the day is over by the
+    snapshot_activity command so trend charts never recount old days.
+
+    The completion counts can only be taken at the moment the snapshot runs;
+    they are empty for days filled in later with --backfill-days.
+    """
+    date = models.DateField(unique=True)
+    profiles_created = models.IntegerField(default=0)
+    # Audit log update entries, and the distinct profiles they touched
+    profile_edits = models.IntegerField(default=0)
+    profiles_edited = models.IntegerField(default=0)
+    notifications = models.IntegerField(default=0)
+    total_profiles = models.IntegerField(null=True, blank=True)
+    complete_profiles = models.IntegerField(null=True, blank=True)
+    approved_profiles = models.IntegerField(null=True, blank=True)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = "Daily Activity"
+        verbose_name_plural = "Daily Activity"
+
+    def __str__(self):
+        return f"{self.date}: {self.profiles_created} created, {self.profile_edits} edits"
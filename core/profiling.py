@@ -0,0 +1,55 @@
+import datetime as dt
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_SUFFIX = '.prof'
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def profile_root():
+    root = Path(getattr(settings, 'PROFILE_ROOT', settings.BASE_DIR / 'profiles'))
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def save_profile(profiler, view_name, user):
+    """
+    Dump a finished cProfile.Profile to PROFILE_ROOT and return the file name.
+    The .prof file can be opened with pstats/snakeviz or turned into a
+    flamegraph with flameprof.
+    """
+    stamp = timezone.now().strftime('%Y%m%d_%H%M%S_%f')
+    name = _SAFE_NAME.sub('_', f'{stamp}_{view_name or "view"}_{user.username}') + PROFILE_SUFFIX
+    profiler.dump_stats(profile_root() / name)
+    prune_profiles(getattr(settings, 'PROFILE_MAX_FILES', 50))
+    return name
+
+
+def list_profiles():
+    """Stored profiles, newest first"""
+    profiles = []
+    for path in profile_root().glob(f'*{PROFILE_SUFFIX}'):
+        stat = path.stat()
+        profiles.append({
+            'name': path.name,
+            'size': stat.st_size,
+            'created_at': dt.datetime.fromtimestamp(stat.st_mtime, tz=dt.timezone.utc),
+        })
+    profiles.sort(key=lambda p: p['created_at'], reverse=True)
+    return profiles
+
+
+def get_profile_path(name):
+    """Resolve a stored profile by name, or None if it does not exist"""
+    if _SAFE_NAME.search(name) or not name.endswith(PROFILE_SUFFIX):
+        return None
+    path = profile_root() / name
+    return path if path.is_file() else None
+
+
+def prune_profiles(max_files):
+    for profile in list_profiles()[max_files:]:
+        (profile_root() / profile['name']).unlink(missing_ok=True)
@@ -0,0 +1,66 @@
+"""
+Lean projections of EmployeeProfile for list pages.
+
+The dashboard, report table and PDF export show about six columns per
+profile. Rather than loading full model instances (38 fields, including the
+address TextFields), they fetch just those columns with values() and wrap
+each row in a ProfileRow.
+"""
+from .models import Agency, DutyStation, User
+
+PROFILE_LIST_FIELDS = (
+    'id', 'name', 'employee_id', 'agency_project_cluster_office', 'duty_station',
+    'contact_type', 'created_at', 'created_by__username', 'created_by__role',
+)
+
+ROLE_LABELS = dict(User.ROLE_CHOICES)
+
+
+class ProfileRow:
+    """Read-only profile row exposing the attributes the list templates use"""
+
+    __slots__ = (
+        'id', 'name', 'employee_id', 'agency_project_cluster_office_id', 'duty_station_id',
+        'contact_type', 'created_at', 'created_by_username', 'created_by_role',
+    )
+
+    def __init__(self, values):
+        self.id = values['id']
+        self.name = values['name']
+        self.employee_id = values['employee_id']
+        self.agency_project_cluster_office_id = values['agency_project_cluster_office']
+        self.duty_station_id = values['duty_station']
+        self.contact_type = values['contact_type']
+        self.created_at = values['created_at']
+        self.created_by_username = values['created_by__username']
+        self.created_by_role = values['created_by__role']
+
+    @property
+    def agency_label(self):
+        return Agency.label_for(self.agency_project_cluster_office_id)
+
+    @property
+    def agency_code(self):
+        return Agency.code_for(self.agency_project_cluster_office_id)
+
+    @property
+    def duty_station_label(self):
+        return DutyStation.label_for(self.duty_station_id)
+
+    @property
+    def duty_station_code(self):
+        return DutyStation.code_for(self.duty_station_id)
+
+    @property
+    def created_by_role_display(self):
+        return ROLE_LABELS.get(self.created_by_role, self.created_by_role)
+
+
+def profile_rows(profiles):
+    """
+    Evaluate a profile queryset as a list of ProfileRow objects.
+
+    Only the list columns are selected; the creator's username and role come
+    from the same query through a join on created_by.
+    """
+    return [ProfileRow(values) for values in profiles.values(*PROFILE_LIST_FIELDS)]
@@ -0,0 +1,203 @@
+"""
+Bulk creation of user accounts from a roster spreadsheet.
+
+Roster columns: email (required), role, first_name, last_name, username and
+password. A row without a password gets an unusable password and a password
+reset link, so the staff member chooses their own password. Supplied passwords
+are hashed in a process pool: each PBKDF2 hash takes hundreds of milliseconds
+of CPU, which dominates the cost of creating an account. Accounts are then
+inserted with bulk_create.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.validators import validate_email
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .importers import ImportFileError, RowError, cell_value, spreadsheet_rows
+from .models import User, normalize_key
+
+ROSTER_COLUMNS = ('email', 'role', 'first_name', 'last_name', 'username', 'password')
+ROLES = dict(User.ROLE_CHOICES)
+
+# Passwords per pool task: enough work to outweigh the task's IPC
+HASH_CHUNK_SIZE = 25
+
+
+def hash_passwords(passwords):
+    """Pool task: hash a chunk of passwords with the configured hasher"""
+    return [make_password(password) for password in passwords]
+
+
+def hash_in_pool(passwords, workers=None, progress=None):
+    """Hash passwords in worker processes, preserving order"""
+    chunks = [passwords[i:i + HASH_CHUNK_SIZE] for i in range(0, len(passwords), HASH_CHUNK_SIZE)]
+    pool = None
+    if workers != 1 and len(chunks) > 1:
+        # Spawned workers (macOS, Windows) must set Django up before they unpickle a task
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+    hashed = []
+    try:
+        for chunk in (pool.map if pool else map)(hash_passwords, chunks):
+            hashed.extend(chunk)
+            if progress is not None:
+                progress(len(hashed))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return hashed
+
+
+def reset_link(base_url, user):
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    return base_url.rstrip('/') + reverse('reset_password_confirm', args=[uid, token])
+
+
+class ProvisionResult:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = []
+        self.errors = []
+        # [(user, reset URL)] for accounts created without a password
+        self.reset_links = []
+
+
+def read_roster(fileobj, filename):
+    """Yield (line number, {column: value}) for the non-empty rows of a roster file"""
+    rows = spreadsheet_rows(fileobj, filename)
+    try:
+        header = [normalize_key(str(heading or '')).replace(' ', '_') for heading in next(rows)]
+    except StopIteration:
+        raise ImportFileError('The file is empty') from None
+    if 'email' not in header:
+        raise ImportFileError('The roster has no email column')
+    for line, row in enumerate(rows, start=2):
+        values = {
+            column: str(cell_value(value))
+            for column, value in zip(header, row) if column in ROSTER_COLUMNS
+        }
+        if any(values.values()):
+            yield line, values
+
+
+def _unique_username(base, usernames):
+    username, n = base, 1
+    while normalize_key(username) in usernames:
+        n += 1
+        username = f'{base}{n}'
+    return username
+
+
+def provision_users(roster, base_url, dry_run=False, workers=None, batch_size=1000, progress=None):
+    """
+    Validate the roster rows and create their accounts.
+
+    Emails and usernames are checked against sets prefetched in one query
+    each. Invalid rows and rows whose email already has an account are
+    skipped and reported. progress, if given, is called with a stage name and
+    a count as the work advances.
+    """
+    result = ProvisionResult(dry_run)
+    emails = set()
+    usernames = set()
+    for email, username in User.objects.values_list('email', 'username'):
+        emails.add(normalize_key(email))
+        usernames.add(normalize_key(username))
+
+    users, passwords = [], []
+    for line, values in roster:
+        result.rows += 1
+        email = values.get('email', '').strip()
+        role = values.get('role', '').strip() or 'user'
+        errors = {}
+        try:
+            validate_email(email)
+        except ValidationError as exc:
+            errors['Email'] = exc.messages
+        if normalize_key(email) in emails:
+            errors['Email'] = ['An account with this email already exists.']
+        if role not in ROLES:
+            errors['Role'] = [f'Unknown role "{role}"; use one of {", ".join(ROLES)}.']
+
+        username = values.get('username', '').strip()
+        if username and normalize_key(username) in usernames:
+            errors['Username'] = ['This username is already taken.']
+        user = User(
+            username=username or _unique_username(email.split('@')[0], usernames),
+            email=email,
+            first_name=values.get('first_name', '').strip(),
+            last_name=values.get('last_name', '').strip(),
+            role=role,
+            is_staff=role != 'user',
+        )
+        password = values.get('password', '')
+        if password:
+            try:
+                validate_password(password, user=user)
+            except ValidationError as exc:
+                errors['Password'] = exc.messages
+        if errors:
+            result.errors.append(RowError(line, email, errors))
+            continue
+
+        emails.add(normalize_key(email))
+        usernames.add(normalize_key(user.username))
+        users.append(user)
+        passwords.append(password or None)
+    if progress is not None:
+        progress('validated', result.rows)
+    if dry_run:
+        result.created = users
+        return result
+
+    to_hash = [password for password in passwords if password]
+    hashed = iter(hash_in_pool(
+        to_hash, workers=workers,
+        progress=(lambda count: progress('hashed', count)) if progress is not None else None,
+    ))
+    for user, password in zip(users, passwords):
+        # make_password(None) is an unusable password and costs no hashing
+        user.password = next(hashed) if password else make_password(None)
+
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        with transaction.atomic():
+            User.objects.bulk_create(batch)
+        result.created.extend(batch)
+        if progress is not None:
+            progress('created', len(result.created))
+
+    result.reset_links = [
+        (user, reset_link(base_url, user))
+        for user, password in zip(users, passwords) if not password
+    ]
+    return result
+
+
+def send_reset_emails(reset_links, batch_size=100):
+    """Email each new account its password link, reusing one mail connection per batch"""
+    sent = 0
+    for start in range(0, len(reset_links), batch_size):
+        messages = []
+        for user, url in reset_links[start:start + batch_size]:
+            body = render_to_string('core/emails/password_reset_email.html', {'user': user, 'reset_url': url})
+            message = EmailMultiAlternatives(
+                'Your SDDM Account - Set Your Password', body, settings.DEFAULT_FROM_EMAIL, [user.email]
+            )
+            message.attach_alternative(body, 'text/html')
+            messages.append(message)
+        with get_connection() as connection:
+            sent += connection.send_messages(messages) or 0
+    return sent
@@ -0,0 +1,343 @@
+"""
+Report generation, PDF export, the compliance drill-down and demographic
+analytics for super admins.
+
+ReportLab (and NumPy, in core.analytics) is only imported when a PDF or the
+analytics are actually built, so gunicorn workers, management commands and
+tests do not pay its import cost at startup.
+"""
+from io import BytesIO
+import datetime as dt
+from zoneinfo import ZoneInfo
+
+from django.shortcuts import redirect, render
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.paginator import Paginator
+from django.http import HttpResponse
+from django.db.models import Count
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from . import analytics, compliance
+from .models import EmployeeProfile, Agency, ComplianceSummary, DutyStation, Nationality, normalize_key
+from .views import is_super_admin
+from .routers import pin_to_primary, use_replica
+from .projections import profile_rows
+
+COMPLIANCE_PAGE_SIZE = 50
+
+# (GET parameter, model field, label) for the filters shared by the report and PDF export
+REPORT_FILTERS = [
+    ('agency', 'agency_project_cluster_office', 'Project'),
+    ('duty_station', 'duty_station', 'District'),
+    ('contact_type', 'contact_type', 'Level'),
+    ('zone', 'zone_key', 'Zone'),
+]
+
+def filter_profiles(profiles, params):
+    """
+    Apply the report filters found in params, case-insensitively.
+
+    Values are canonicalized before filtering (lookup codes to their primary
+    key, choice fields to their stored key, zones to zone_key) so every filter is an exact match that can use
+    the composite indexes. Returns the filtered, newest-first queryset and a
+    dict of the filters that were applied.
+    """
+    filters = {}
+    for param, field_name, _ in REPORT_FILTERS:
+        value = params.get(param)
+        if not value:
+            continue
+        filters[param] = value
+        profiles = profiles.filter(**{field_name: canonical_filter_value(field_name, value)})
+    return profiles.order_by('-created_at'), filters
+
+def canonical_filter_value(field_name, value):
+    """Map a user-supplied filter value to the value stored in field_name"""
+    key = normalize_key(value)
+    if field_name == 'zone_key':
+        return key
+    field = EmployeeProfile._meta.get_field(field_name)
+    if field.is_relation:
+        return field.related_model.pk_for_code(key)
+    stored = {normalize_key(choice): choice for choice, _ in field.choices}
+    return stored.get(key, value.strip())
+
+def with_labels(rows, field_name, lookup):
+    """Add the cached lookup label to GROUP BY rows keyed by a lookup foreign key"""
+    return [dict(row, label=lookup.label_for(row[field_name])) for row in rows]
+
+@login_required
+@user_passes_test(is_super_admin)
+@use_replica
+def report_generation_view(request):
+    """Report generation view for super admins"""
+    profiles = EmployeeProfile.objects.all()
+    total_profiles = profiles.count()
+    
+    profiles, filters = filter_profiles(profiles, request.GET)
+    
+    # Get unique values for filter dropdowns (restricted to Project, District, Level, Zone)
+    all_profiles = EmployeeProfile.objects.all()
+    
+    # Agencies and duty stations that occur in the data, as (code, label) in display order
+    agency_ids = set(all_profiles.values_list('agency_project_cluster_office', flat=True)
+                     .order_by('agency_project_cluster_office').distinct())
+    agencies = [(code, name) for pk, code, name in Agency.cached_rows() if pk in agency_ids]
+    
+    station_ids = set(all_profiles.values_list('duty_station', flat=True)
+                      .order_by('duty_station').distinct())
+    duty_stations = [(code, name) for pk, code, name in DutyStation.cached_rows() if pk in station_ids]
+    
+    # Get unique contact types and sort them alphabetically (handle whitespace and case)
+    contact_types = sorted(set([contact.strip() for contact in 
+                               all_profiles.values_list('contact_type', flat=True)
+                               .exclude(contact_type__isnull=True)
+                               .exclude(contact_type='')
+                               .order_by('contact_type').distinct() if contact.strip()]))
+    
+    # Get unique zones from the normalized column, title cased for display
+    zones = sorted(set([zone_key.title() for zone_key in
+                       all_profiles.values_list('zone_key', flat=True)
+                       .exclude(zone_key='')
+                       .order_by('zone_key').distinct()]))
+    
+    # Generate statistics based on filtered profiles
+    stats = {
+        'total_profiles': total_profiles,
+        'filtered_profiles': profiles.count(),
+        'by_agency': with_labels(profiles.values('agency_project_cluster_office').annotate(count=Count('id')),
+                                 'agency_project_cluster_office', Agency),
+        'by_duty_station': with_labels(profiles.values('duty_station').annotate(count=Count('id')),
+                                       'duty_station', DutyStation),
+        'by_nationality': with_labels(profiles.values('nationality').annotate(count=Count('id')),
+                                      'nationality', Nationality),
+        'by_contact_type': profiles.values('contact_type').annotate(count=Count('id')),
+        'by_gender': profiles.values('gender').annotate(count=Count('id')),
+        'by_role': profiles.values('created_by__role').annotate(count=Count('id')),
+    }
+    
+    compliance_overall, compliance_tables = compliance.summary_tables()
+
+    context = {
+        'profiles': profile_rows(profiles),
+        'stats': stats,
+        'compliance_overall': compliance_overall,
+        'compliance_tables': [
+            ('District', 'duty_station', compliance_tables.get('duty_station', [])),
+            ('Project', 'agency', compliance_tables.get('agency', [])),
+            ('Zone', 'zone', compliance_tables.get('zone', [])),
+        ],
+        'filters': filters,
+        'filter_options': {
+            'agencies': agencies,            # Project wise
+            'duty_stations': duty_stations,  # District wise
+            'contact_types': contact_types,  # Level wise
+            'zones': zones,                  # Zone wise
+        }
+    }
+    
+    return render(request, 'core/report_generation.html', context)
+
+def non_compliant_count(filters):
+    """
+    Number of non-compliant staff from the compliance summary, for no filter
+    or a single project, district or zone filter; None otherwise.
+    """
+    if len(filters) > 1:
+        return None
+    dimension, key = 'all', ''
+    for param, field_name, _ in REPORT_FILTERS:
+        if param in filters:
+            if param not in compliance.GROUP_FIELDS:
+                return None
+            value = canonical_filter_value(field_name, filters[param])
+            dimension, key = param, '' if value is None else str(value)
+    counts = ComplianceSummary.objects.filter(dimension=dimension, key=key).values_list('total', 'compliant').first()
+    if counts is None:
+        return 0 if compliance.summary_as_of() else None
+    return counts[0] - counts[1]
+
+@login_required
+@user_passes_test(is_super_admin)
+@use_replica
+def compliance_detail_view(request):
+    """Staff missing a valid training or ID, for the project, district or zone in the query"""
+    as_of = compliance.summary_as_of() or timezone.localdate()
+    profiles = EmployeeProfile.objects.exclude(compliance.compliant_q(as_of)).only(
+        'id', 'name', 'employee_id', 'created_at', 'agency_project_cluster_office', 'duty_station', 'zone',
+        *compliance.COUNTERS,
+    )
+    profiles, filters = filter_profiles(profiles, request.GET)
+    paginator = Paginator(profiles, COMPLIANCE_PAGE_SIZE)
+    count = non_compliant_count(filters)
+    if count is not None:
+        # Take the count from the summary instead of a COUNT(*) over every profile
+        paginator.count = count
+    page = paginator.get_page(request.GET.get('page'))
+    for profile in page.object_list:
+        profile.missing = compliance.missing_items(profile, as_of)
+
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'page': page,
+        'as_of': as_of,
+        'query': query.urlencode(),
+        'filter_text': ', '.join(
+            f"{label}: {filters[param]}" for param, _, label in REPORT_FILTERS if param in filters
+        ) or 'All staff',
+    }
+    return render(request, 'core/compliance_detail.html', context)
+
+@login_required
+@user_passes_test(is_super_admin)
+@require_POST
+def compliance_refresh_view(request):
+    """Rebuild the compliance summary now instead of waiting for the nightly refresh"""
+    rows = compliance.refresh_summary()
+    pin_to_primary(request)
+    messages.success(request, f'Compliance summary refreshed ({rows} rows).')
+    return redirect('report_generation')
+
+@login_required
+@user_passes_test(is_super_admin)
+@use_replica
+def demographics_view(request):
+    """Age pyramids, dependents per staff, children per zone and blood groups per district"""
+    filters, applied = {}, {}
+    for param, lookup, name in analytics.ANALYTICS_FILTERS:
+        value = request.GET.get(param)
+        if not value:
+            continue
+        filters[name] = lookup.pk_for_code(value)
+        applied[param] = lookup.label_for(filters[name]) or value
+    context = {
+        'results': analytics.demographics(filters),
+        'filters': applied,
+        'genders': [label for _, label in analytics.GENDERS],
+        'relationships': [label for _, label in analytics.RELATIONSHIPS],
+        'blood_groups': analytics.BLOOD_GROUPS,
+        'adult_age': analytics.ADULT_AGE,
+        'duty_stations': [(code, name) for _, code, name in DutyStation.cached_rows()],
+        'nationalities': [(code, name) for _, code, name in Nationality.cached_rows()],
+        'selected': {param: request.GET.get(param, '') for param, _, _ in analytics.ANALYTICS_FILTERS},
+    }
+    return render(request, 'core/demographics.html', context)
+
+@login_required
+@user_passes_test(is_super_admin)
+@use_replica
+def export_pdf_view(request):
+    """Export filtered profiles to PDF"""
+    profiles = EmployeeProfile.objects.all()
+    
+    # Apply the same filters as the report generation view
+    profiles, filters = filter_profiles(profiles, request.GET)
+    
+    # Build filter description (restricted filters)
+    filter_descriptions = [f"{label}: {filters[param]}" for param, _, label in REPORT_FILTERS if param in filters]
+    
+    filter_text = ', '.join(filter_descriptions) if filter_descriptions else 'None'
+    
+    # Create the HttpResponse object with PDF headers
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="employee_profiles_{dt.datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
+    response.write(build_profiles_pdf(profiles, filter_text))
+    return response
+
+def build_profiles_pdf(profiles, filter_text):
+    """Render the profiles table as a PDF document and return its bytes"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    # Create the PDF object using ReportLab
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    elements = []
+    
+    # Get styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=1,  # Center alignment
+        textColor=colors.HexColor('#1e40af')  # UNDP blue
+    )
+    
+    # Add title
+    title = Paragraph("Employee Profiles Report", title_style)
+    elements.append(title)
+    
+    # Add report metadata
+    metadata_style = ParagraphStyle(
+        'Metadata',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=20,
+        textColor=colors.grey
+    )
+    
+    # Use Bangladesh time for generation timestamp
+    metadata = f"""
+    Generated on: {timezone.localtime(timezone.now(), ZoneInfo('Asia/Dhaka')).strftime("%B %d, %Y at %I:%M %p")}<br/>
+    Total Profiles: {profiles.count()}<br/>
+    Filters Applied: {filter_text}
+    """
+    elements.append(Paragraph(metadata, metadata_style))
+    elements.append(Spacer(1, 20))
+    
+    if profiles.exists():
+        # Create table data
+        table_data = [['Name', 'Employee ID', 'Agency', 'Duty Station', 'Contact Type', 'Created Date']]
+        
+        for profile in profile_rows(profiles):
+            table_data.append([
+                profile.name,
+                profile.employee_id,
+                # Codes rather than labels keep the table within the page width
+                profile.agency_code,
+                profile.duty_station_code,
+                profile.contact_type,
+                profile.created_at.strftime("%b %d, %Y")
+            ])
+        
+        # Create table
+        table = Table(table_data)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),  # UNDP blue header
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+        
+        elements.append(table)
+    else:
+        no_data_style = ParagraphStyle(
+            'NoData',
+            parent=styles['Normal'],
+            fontSize=14,
+            spaceAfter=20,
+            textColor=colors.grey,
+            alignment=1  # Center alignment
+        )
+        elements.append(Paragraph("No profiles found with the applied filters.", no_data_style))
+    
+    # Build PDF
+    doc.build(elements)
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
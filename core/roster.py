@@ -0,0 +1,172 @@
+"""
+Crisis headcounts and warden call lists.
+
+During an incident security admins need to know how many staff and
+dependents are in a zone, police station or district, grouped by warden
+(appointment_unit_based_warden), and whom each warden has to call. Dependents
+are counted with a correlated COUNT subquery that reads the dependent
+table's profile index, so the headcount is one aggregate query and the call
+lists one query, however many profiles match.
+"""
+import csv
+from itertools import groupby
+
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Lower, Trim
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+
+from .models import Dependent, DutyStation, EmployeeProfile, normalize_key
+from .routers import use_replica
+from .views import is_admin_user
+
+# (GET parameter, model field, label) for the roster filters
+ROSTER_FILTERS = [
+    ('zone', 'zone_key', 'Zone'),
+    ('thana', 'thana_key', 'Police Station'),
+    ('duty_station', 'duty_station', 'District'),
+]
+
+CALL_LIST_FIELDS = (
+    'id', 'name', 'employee_id', 'cell_phone_whatsapp', 'emergency_contact_number',
+    'emergency_contact_relation', 'radio_call_sign', 'zone', 'police_station_thana',
+    'appointment_unit_based_warden',
+)
+
+NO_WARDEN = '(No warden assigned)'
+
+# Larger call lists are offered as CSV only; rendering thousands of rows takes seconds
+CALL_LIST_MAX_ROWS = 1000
+
+
+def warden_key():
+    """
+    The key wardens are grouped by, computed by the database. Headcounts and
+    call lists both sort and group on this one value, so a warden is never
+    split where the database and Python would normalize a name differently.
+    """
+    return Lower(Trim('appointment_unit_based_warden'))
+
+
+def dependent_count():
+    """Number of Dependent rows of the outer profile, 0 when it has none"""
+    dependents = (
+        Dependent.objects.filter(employee_profile=OuterRef('pk'))
+        .order_by().values('employee_profile')
+        .annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(dependents, output_field=IntegerField()), 0)
+
+
+def roster_profiles(params):
+    """Profiles matching the roster filters in params, and the filters applied"""
+    profiles = EmployeeProfile.objects.order_by()
+    filters = {}
+    for param, field_name, _ in ROSTER_FILTERS:
+        value = params.get(param, '').strip()
+        if not value:
+            continue
+        filters[param] = value
+        if field_name == 'duty_station':
+            profiles = profiles.filter(duty_station=DutyStation.pk_for_code(value))
+        else:
+            profiles = profiles.filter(**{field_name: normalize_key(value)})
+    return profiles, filters
+
+
+def headcount(profiles):
+    """
+    Staff and dependents per warden, largest first, with one aggregate query.
+    Wardens are grouped case-insensitively.
+    """
+    rows = (
+        profiles.alias(dependent_total=dependent_count())
+        .annotate(warden_key=warden_key())
+        .values('warden_key')
+        .annotate(warden=Max('appointment_unit_based_warden'), staff=Count('pk'), dependents=Sum('dependent_total'))
+    )
+    wardens = [
+        {
+            'warden': row['warden'].strip() or NO_WARDEN,
+            'staff': row['staff'],
+            'dependents': row['dependents'] or 0,
+            'people': row['staff'] + (row['dependents'] or 0),
+        }
+        for row in rows
+    ]
+    wardens.sort(key=lambda row: (-row['people'], row['warden']))
+    return {
+        'staff': sum(row['staff'] for row in wardens),
+        'dependents': sum(row['dependents'] for row in wardens),
+        'people': sum(row['people'] for row in wardens),
+        'wardens': wardens,
+    }
+
+
+def call_lists(profiles):
+    """[(warden, [profile row])] with each profile's phones and dependent count, by warden and name"""
+    rows = (
+        profiles.annotate(dependent_total=dependent_count(), warden_key=warden_key())
+        .order_by('warden_key', 'name')
+        .values(*CALL_LIST_FIELDS, 'dependent_total', 'warden_key')
+    )
+    return [
+        # Named like headcount() names the group, after its greatest spelling
+        (max(row['appointment_unit_based_warden'] for row in group).strip() or NO_WARDEN, group)
+        for group in (list(members) for _, members in groupby(rows, key=lambda row: row['warden_key']))
+    ]
+
+
+def call_list_csv(lists, filename):
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    writer = csv.writer(response)
+    writer.writerow([
+        'Warden', 'Name', 'Employee ID', 'Cell Phone/WhatsApp', 'Emergency Contact',
+        'Emergency Contact Relation', 'Radio Call Sign', 'Zone', 'Police Station', 'Dependents',
+    ])
+    for warden, rows in lists:
+        for row in rows:
+            writer.writerow([
+                warden, row['name'], row['employee_id'], row['cell_phone_whatsapp'],
+                row['emergency_contact_number'], row['emergency_contact_relation'], row['radio_call_sign'],
+                row['zone'], row['police_station_thana'], row['dependent_total'],
+            ])
+    return response
+
+
+@login_required
+@user_passes_test(is_admin_user)
+@use_replica
+def crisis_roster_view(request):
+    """Headcount by warden for an area, with each warden's call list once the area is narrowed down"""
+    profiles, filters = roster_profiles(request.GET)
+    if request.GET.get('format') == 'csv':
+        return call_list_csv(call_lists(profiles), 'crisis_roster.csv')
+
+    counts = headcount(profiles)
+    # Distinct values straight from the key indexes, title cased for display
+    all_profiles = EmployeeProfile.objects.order_by()
+    context = {
+        'headcount': counts,
+        'call_lists': call_lists(profiles) if filters and counts['staff'] <= CALL_LIST_MAX_ROWS else None,
+        'call_list_max_rows': CALL_LIST_MAX_ROWS,
+        'filters': filters,
+        'query': request.GET.urlencode(),
+        'zones': sorted({key.title() for key in all_profiles.exclude(zone_key='')
+                         .values_list('zone_key', flat=True).distinct()}),
+        'thanas': sorted({key.title() for key in all_profiles.exclude(thana_key='')
+                          .values_list('thana_key', flat=True).distinct()}),
+        'duty_stations': [(code, name) for _, code, name in DutyStation.cached_rows()],
+    }
+    return render(request, 'core/crisis_roster.html', context)
+
+
+@login_required
+@user_passes_test(is_admin_user)
+@use_replica
+def crisis_headcount_view(request):
+    """The headcount of crisis_roster_view as JSON, for polling during an incident"""
+    profiles, filters = roster_profiles(request.GET)
+    return JsonResponse({'filters': filters, **headcount(profiles)})
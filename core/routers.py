@@ -0,0 +1,62 @@
+"""
+Read-replica routing for the heavy read-only views.
+
+Views decorated with ``use_replica`` send their reads to the database alias
+named by DATABASE_REPLICA_ALIAS when it is configured. All writes, and all
+reads outside those views, stay on the primary. A user who just saved is
+pinned to the primary for REPLICA_STICKY_SECONDS so they always read their
+own writes, whatever the replication lag.
+"""
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_SESSION_KEY = 'db_primary_until'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_alias():
+    """The configured replica alias, or None when reads should use the primary"""
+    alias = getattr(settings, 'DATABASE_REPLICA_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def pin_to_primary(request):
+    """Route this user's replica-eligible reads to the primary for a while after a write"""
+    request.session[STICKY_SESSION_KEY] = time.time() + getattr(settings, 'REPLICA_STICKY_SECONDS', 30)
+
+
+def is_pinned_to_primary(request):
+    session = getattr(request, 'session', None)
+    return bool(session) and session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+
+def use_replica(view_func):
+    """Serve a read-only view's queries from the replica when one is configured"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_alias()
+        if alias is None or request.method not in ('GET', 'HEAD') or is_pinned_to_primary(request):
+            return view_func(request, *args, **kwargs)
+        token = _read_alias.set(alias)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary
+        return True
@@ -0,0 +1,313 @@
+"""
+Editing of the security fields (26-38) for security admins.
+
+The grid lists a page of profiles with one row of inputs per profile. Changed
+rows are saved together: their versions are checked and the rows written with
+a single bulk_update, all in one transaction. Each affected employee then gets
+one notification covering all of their changes.
+
+The security modal edits one profile through a small JSON API instead: GET
+returns the security fields with the profile version as ETag, and PATCH
+updates just the fields sent, guarded by If-Match.
+"""
+import json
+from collections import defaultdict
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+
+from . import audit, compliance
+from .forms import SECURITY_FIELDS, SECURITY_GRID_PAGE_SIZE, SecurityGridForm, SecurityGridFormSet
+from .models import Agency, DutyStation, EditConflict, EmployeeProfile, Notification, User
+from .reports import filter_profiles
+from .routers import pin_to_primary
+from .views import describe_changes, is_admin_user
+
+
+def grid_queryset():
+    """Profiles with just the columns the grid shows or writes, and those the compliance summary groups by"""
+    return EmployeeProfile.objects.only(
+        'id', 'name', 'employee_id', 'created_by', 'version', 'updated_at', *SECURITY_FIELDS,
+        'agency_project_cluster_office', 'duty_station', 'zone_key',
+    )
+
+
+def posted_profile_ids(data):
+    """Primary keys of the rows in a submitted grid, capped at one page"""
+    try:
+        total = min(int(data.get('form-TOTAL_FORMS', 0)), SECURITY_GRID_PAGE_SIZE)
+    except ValueError:
+        return []
+    return [pk for i in range(total) if (pk := data.get(f'form-{i}-id', '')).isdigit()]
+
+
+def edited_forms(formset):
+    """Rows whose security fields were edited (a changed version alone is not an edit)"""
+    return [form for form in formset.forms if any(name != 'version' for name in form.changed_data)]
+
+
+def notify_security_updates(profiles, sender):
+    """Send one notification per affected employee, listing every profile and field changed"""
+    by_owner = defaultdict(list)
+    for profile in profiles:
+        by_owner[profile.created_by_id].append(profile)
+    # Super admins own imported and admin-created profiles; they are not notified
+    owners = User.objects.filter(pk__in=by_owner).exclude(role='super_admin').values_list('pk', flat=True)
+    notifications = []
+    for owner_id in owners:
+        owned = by_owner[owner_id]
+        details = '; '.join(f'{profile.name}: {describe_changes(profile)}' for profile in owned)
+        notifications.append(Notification(
+            recipient_id=owner_id,
+            sender=sender,
+            notification_type='security_update',
+            title='Security Information Updated',
+            message=f'Security-related fields for your profile were updated by Security Admin ({details}).',
+            profile=owned[0] if len(owned) == 1 else None,
+        ))
+    Notification.objects.bulk_create(notifications)
+
+
+def save_security_grid(formset, user):
+    """
+    Save the edited rows of a valid grid formset in one transaction.
+
+    Returns (saved profiles, {profile id: current version or None}) where the
+    second item lists rows changed or deleted by someone else since the grid
+    was loaded. If there are any such rows, nothing is saved.
+    """
+    forms = edited_forms(formset)
+    if not forms:
+        return [], {}
+    with transaction.atomic():
+        current = dict(
+            EmployeeProfile.objects.select_for_update()
+            .filter(pk__in=[form.instance.pk for form in forms])
+            .values_list('pk', 'version')
+        )
+        conflicts = {
+            form.instance.pk: current.get(form.instance.pk)
+            for form in forms if current.get(form.instance.pk) != form.cleaned_data['version']
+        }
+        if conflicts:
+            return [], conflicts
+
+        now = timezone.now()
+        profiles = []
+        for form in forms:
+            profile = form.save(commit=False)
+            # bulk_update bypasses save(), which bumps the version and updated_at
+            profile.version = current[profile.pk] + 1
+            profile.updated_at = now
+            profiles.append(profile)
+        saved = EmployeeProfile.bulk_update_dirty(profiles)
+        audit.record_bulk_update(saved)
+        compliance.update_summary(updated=saved)
+        notify_security_updates(saved, user)
+    return saved, {}
+
+
+def conflict_message(form, current_version):
+    if current_version is None:
+        return 'This profile was deleted by someone else; remove your changes to this row and save again.'
+    current = ', '.join(
+        f'{form.fields[name].label}: {form.initial.get(name) or "(empty)"}'
+        for name in SECURITY_FIELDS if name in form.changed_data
+    )
+    return (f'Someone else changed this profile since you loaded the grid. Current values: {current}. '
+            'Save again to overwrite them with yours.')
+
+
+@login_required
+@user_passes_test(is_admin_user)
+def security_grid_view(request):
+    """Spreadsheet-style editing of the security fields of a page of profiles"""
+    status = 200
+    if request.method == 'POST':
+        queryset = grid_queryset().filter(pk__in=posted_profile_ids(request.POST))
+        formset = SecurityGridFormSet(request.POST, queryset=queryset)
+        if formset.is_valid():
+            saved, conflicts = save_security_grid(formset, request.user)
+            if not conflicts:
+                if saved:
+                    pin_to_primary(request)
+                    messages.success(request, f'Security information saved for {len(saved)} profiles.')
+                else:
+                    messages.info(request, 'No changes to save.')
+                return redirect(request.get_full_path())
+
+            # Rebase the conflicting rows on the current versions so saving again overwrites them
+            data = request.POST.copy()
+            for form in formset.forms:
+                if conflicts.get(form.instance.pk) is not None:
+                    data[form.add_prefix('version')] = conflicts[form.instance.pk]
+            # A fresh queryset: the cached rows already hold the posted values
+            formset = SecurityGridFormSet(data, queryset=queryset.all())
+            formset.is_valid()
+            for form in formset.forms:
+                if form.instance.pk in conflicts:
+                    form.add_error(None, conflict_message(form, conflicts[form.instance.pk]))
+            messages.error(request, f'{len(conflicts)} profiles were changed by someone else; nothing was saved.')
+            status = 409
+        page = None
+    else:
+        profiles, _ = filter_profiles(grid_queryset(), request.GET)
+        page = Paginator(profiles, SECURITY_GRID_PAGE_SIZE).get_page(request.GET.get('page'))
+        formset = SecurityGridFormSet(queryset=page.object_list)
+
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'formset': formset,
+        'page': page,
+        'query': query.urlencode(),
+        'filters': request.GET,
+        'agencies': [(code, name) for _, code, name in Agency.cached_rows()],
+        'duty_stations': [(code, name) for _, code, name in DutyStation.cached_rows()],
+        'user_role': request.user.role,
+    }
+    return render(request, 'core/security_grid.html', context, status=status)
+
+
+# Input names used by the security modals, for the fields whose name differs
+MODAL_FIELD_NAMES = {
+    'zone_name': 'zone_name_with_appointment',
+    'office_address': 'office_location_address',
+    'appointment': 'appointment_unit_based_warden',
+    'unid': 'unid_number',
+    'rfid': 'rfid_number',
+    'id_expiry': 'id_contact_expiry',
+    'bsafe_date': 'bsafe',
+    'sat_date': 'sat',
+    'sbfat_date': 'sbfat',
+}
+
+
+def security_payload(profile):
+    """The security fields of a profile as JSON, under both field and modal input names"""
+    payload = {'id': profile.pk, 'version': profile.version}
+    for name in SECURITY_FIELDS:
+        value = getattr(profile, name)
+        payload[name] = value.isoformat() if hasattr(value, 'isoformat') else value
+    payload.update((alias, payload[name]) for alias, name in MODAL_FIELD_NAMES.items())
+    return payload
+
+
+def security_response(profile, status=200, **extra):
+    response = JsonResponse({**extra, **security_payload(profile)}, status=status)
+    response['ETag'] = quote_etag(str(profile.version))
+    return response
+
+
+def if_match_version(request):
+    """
+    The profile version the client's If-Match header names: None when the
+    header is absent or '*', False when it names no version.
+    """
+    header = request.headers.get('If-Match')
+    if header is None:
+        return None
+    etags = parse_etags(header)
+    if etags == ['*']:
+        return None
+    for etag in etags:
+        value = etag.removeprefix('W/').strip('"')
+        if value.isdigit():
+            return int(value)
+    return False
+
+
+def parse_security_patch(request):
+    """
+    The {field name: value} a PATCH or modal POST sends, accepting the modal
+    input names. Raises ValueError for a body that is not a JSON object or
+    names a field outside the security fields.
+    """
+    if request.content_type == 'application/json':
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('The body must be a JSON object')
+    elif request.method == 'POST':
+        data = request.POST.dict()
+    else:
+        raise ValueError('Send the fields as a JSON object')
+    data.pop('csrfmiddlewaretoken', None)
+    version = data.pop('version', None)
+    patch = {}
+    for key, value in data.items():
+        name = MODAL_FIELD_NAMES.get(key, key)
+        if name not in SECURITY_FIELDS:
+            raise ValueError(f'Unknown field "{key}"')
+        patch[name] = '' if value is None else value
+    return patch, version
+
+
+@login_required
+@user_passes_test(is_admin_user)
+def security_api_view(request, pk):
+    """
+    GET or PATCH the security fields of one profile as JSON.
+
+    PATCH (or a form POST from the modals) updates only the fields sent. The
+    profile version is the ETag; a request whose If-Match (or version) names
+    an older version is refused with 412 and the current values.
+    """
+    if request.method not in ('GET', 'HEAD', 'PATCH', 'POST'):
+        return JsonResponse({'success': False, 'error': 'Use GET or PATCH'}, status=405)
+    try:
+        profile = EmployeeProfile.objects.get(pk=pk)
+    except EmployeeProfile.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Profile not found'}, status=404)
+
+    if request.method in ('GET', 'HEAD'):
+        if quote_etag(str(profile.version)) in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=304)
+            response['ETag'] = quote_etag(str(profile.version))
+            return response
+        return security_response(profile)
+
+    try:
+        patch, version = parse_security_patch(request)
+    except ValueError as exc:
+        return JsonResponse({'success': False, 'error': str(exc)}, status=400)
+    expected = if_match_version(request)
+    if expected is None and version not in (None, ''):
+        expected = int(version) if str(version).isdigit() else False
+    if expected is False:
+        return JsonResponse({'success': False, 'error': 'If-Match must name a profile version'}, status=400)
+    if expected is not None and expected != profile.version:
+        return security_response(
+            profile, status=412, success=False,
+            error='Someone else changed this profile since you loaded it.',
+        )
+
+    # Fields not sent keep their saved values
+    data = {name: getattr(profile, name) or '' for name in SECURITY_FIELDS}
+    data.update(patch)
+    data['version'] = profile.version
+    form = SecurityGridForm(data, instance=profile)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+
+    profile = form.save(commit=False)
+    profile.expected_version = profile.version if expected is None else expected
+    try:
+        with transaction.atomic():
+            profile.save()
+            if profile.changed_fields:
+                notify_security_updates([profile], request.user)
+    except EditConflict:
+        return security_response(
+            EmployeeProfile.objects.get(pk=pk), status=412, success=False,
+            error='Someone else changed this profile since you loaded it.',
+        )
+    if profile.changed_fields:
+        pin_to_primary(request)
+    changed = [name for name in SECURITY_FIELDS if name in profile.changed_fields]
+    return security_response(profile, success=True, changed=changed)
@@ -1,3 +1,572 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .management.commands.check_import_time import LAZY_MODULES
+from . import emergency
+from .analytics import Demographics
+from .compliance import refresh_summary
+from .audit import AuditWriter
+from .forms import ProfileImportUploadForm
+from .models import AuditLog, ComplianceSummary, DailyActivity, Dependent, EmployeeProfile, ExpiryAlert, Notification, User
+from .profiling import profile_root
+from .transactions import write_atomic
+
+# Worker cold-start budgets, with headroom over the measured boot for slower machines
+IMPORT_TIME_BUDGET_MS = 1000
+BOOT_RSS_BUDGET_MB = 120
+
+
+class ImportTimeTests(SimpleTestCase):
+    def test_worker_boot_is_within_budget(self):
+        self.assertIn('reportlab', LAZY_MODULES)
+        output = StringIO()
+        # Raises CommandError if a lazy module is imported at boot or a budget is exceeded
+        call_command(
+            'check_import_time', max_ms=IMPORT_TIME_BUDGET_MS, max_rss_mb=BOOT_RSS_BUDGET_MB, stdout=output,
+        )
+        self.assertIn('within budget', output.getvalue())
+
+
+class SQLiteStressTests(TransactionTestCase):
+    def test_parallel_writers_hit_no_lock_errors(self):
+        # Forked writers need a database file; the test database lives in
+        # memory, and close() keeps an in-memory connection open
+        connection = connections['default']
+        original_name, memory_connection = connection.settings_dict['NAME'], connection.connection
+        output = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            connection.connection = None
+            connection.settings_dict['NAME'] = os.path.join(directory, 'stress.sqlite3')
+            try:
+                call_command('migrate', verbosity=0)
+                call_command('seed_demo_data', profiles=20, stdout=StringIO())
+                # Raises CommandError if any write fails with "database is locked"
+                call_command('sqlite_stress', writers=4, writes=25, stdout=output)
+                # Workers write their queued audit entries before the pool is joined
+                audited = AuditLog.objects.filter(action='update').count()
+            finally:
+                connection.close()
+                connection.settings_dict['NAME'] = original_name
+                connection.connection = memory_connection
+        self.assertIn('100 saves', output.getvalue())
+        self.assertIn('0 "database is locked" errors', output.getvalue())
+        self.assertEqual(audited, 100)
+
+
+class WriteAtomicTests(TransactionTestCase):
+    def test_only_write_blocks_take_the_write_lock(self):
+        with CaptureQueriesContext(connection) as captured:
+            with write_atomic():
+                EmployeeProfile.objects.count()
+            with transaction.atomic():
+                EmployeeProfile.objects.count()
+        begins = [query['sql'] for query in captured.captured_queries if query['sql'].startswith('BEGIN')]
+        self.assertEqual(begins, ['BEGIN IMMEDIATE', 'BEGIN'])
+
+
+class DemographicsLoadTests(TransactionTestCase):
+    def test_load_takes_no_lock(self):
+        call_command('seed_demo_data', profiles=5, stdout=StringIO())
+        with CaptureQueriesContext(connection) as captured:
+            data = Demographics.load()
+        self.assertEqual(len(data.profile_ids), 5)
+        self.assertEqual([query['sql'] for query in captured.captured_queries if query['sql'].startswith('BEGIN')], [])
+
+
+class ExplainViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Enough profiles that the planner prefers the indexes, as in production
+        call_command('create_admin_users', stdout=StringIO())
+        call_command('seed_demo_data', profiles=300, stdout=StringIO())
+        # Deployed databases have the nightly compliance summary; before the
+        # first refresh the compliance views count the profiles instead
+        call_command('refresh_compliance', stdout=StringIO())
+
+    def test_view_queries_use_indexes(self):
+        output = StringIO()
+        # Raises CommandError if a filtered or ordered query scans an indexed table
+        call_command('explain_views', stdout=output)
+        self.assertIn('Every filtered or ordered query uses an index', output.getvalue())
+
+
+@override_settings(PROFILE_IMPORT_MAX_ROWS=3)
+class ProfileImportUploadTests(SimpleTestCase):
+    def upload_form(self, rows):
+        content = 'employee_id,name\n' + ''.join(f'EMP-{i},Staff {i}\n' for i in range(rows))
+        upload = SimpleUploadedFile('staff.csv', content.encode(), content_type='text/csv')
+        return ProfileImportUploadForm(data={'dry_run': 'on'}, files={'file': upload})
+
+    def test_files_within_the_limit_are_accepted(self):
+        form = self.upload_form(3)
+        self.assertTrue(form.is_valid(), form.errors)
+        # The row count leaves the file open and rewound for the import
+        self.assertEqual(form.cleaned_data['file'].file.read(11), b'employee_id')
+
+    def test_larger_files_are_sent_to_the_command(self):
+        form = self.upload_form(4)
+        self.assertFalse(form.is_valid())
+        self.assertIn('manage.py import_profiles', form.errors['file'][0])
+
+
+class RequestProfilerTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(PROFILE_ROOT=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.admin = User.objects.create_user('profiler-admin', 'profiler-admin@example.com', role='super_admin')
+
+    def test_requested_profile_is_stored(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/dashboard/', {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue((profile_root() / response['X-Profile-Id']).exists())
+
+    def test_requests_are_not_profiled_unless_asked(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+
+
+def form_post_data(form, *formsets):
+    """The POST data a browser would send for an unbound form as rendered"""
+    data = {}
+    for bound in [*form, *(field for formset in formsets for field in formset.management_form)]:
+        value = bound.value()
+        data[bound.html_name] = '' if value is None else value.isoformat() if hasattr(value, 'isoformat') else value
+    return data
+
+
+def formset_post_data(formset):
+    data = form_post_data(formset.management_form)
+    for form in formset.forms:
+        data.update(form_post_data(form))
+    return data
+
+
+class EditConflictTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=1, stdout=StringIO())
+        cls.admin = User.objects.create_user('conflict-admin', 'conflict-admin@example.com', role='super_admin')
+        cls.profile = EmployeeProfile.objects.get()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = f'/profile/edit/{self.profile.pk}/'
+
+    def load_form(self):
+        response = self.client.get(self.url)
+        return form_post_data(response.context['form'], response.context['dependent_formset'])
+
+    def save_elsewhere(self, **values):
+        other = EmployeeProfile.objects.get(pk=self.profile.pk)
+        for name, value in values.items():
+            setattr(other, name, value)
+        other.save()
+
+    def test_resubmit_keeps_the_other_change(self):
+        data = self.load_form()
+        self.save_elsewhere(zone='Banani Changed')
+        data['name'] = 'Edited Name'
+
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.context['edit_conflicts'], [])
+        merged = response.context['form']
+        self.assertEqual(merged['zone'].value(), 'Banani Changed')
+        self.assertEqual(merged['name'].value(), 'Edited Name')
+
+        response = self.client.post(self.url, form_post_data(merged, response.context['dependent_formset']))
+        self.assertEqual(response.status_code, 302)
+        profile = EmployeeProfile.objects.get(pk=self.profile.pk)
+        self.assertEqual((profile.name, profile.zone), ('Edited Name', 'Banani Changed'))
+
+    def test_fields_changed_on_both_sides_are_conflicts(self):
+        data = self.load_form()
+        self.save_elsewhere(name='Their Name', zone='Banani Changed')
+        data['name'] = 'Edited Name'
+
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            [(conflict['field'], conflict['yours'], conflict['current']) for conflict in response.context['edit_conflicts']],
+            [('name', 'Edited Name', 'Their Name')],
+        )
+        self.assertEqual(response.context['form']['name'].value(), 'Edited Name')
+
+
+class DirtyFieldSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=1, stdout=StringIO())
+        cls.admin = User.objects.create_user('dirty-admin', 'dirty-admin@example.com', role='security_admin')
+        cls.profile = EmployeeProfile.objects.get()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = f'/profile/edit/{self.profile.pk}/'
+
+    def load_form(self):
+        response = self.client.get(self.url)
+        return form_post_data(response.context['form'], response.context['dependent_formset'])
+
+    def test_unchanged_save_writes_nothing(self):
+        profile = EmployeeProfile.objects.get()
+        with self.assertNumQueries(0):
+            profile.save()
+        self.assertEqual(profile.changed_fields, frozenset())
+
+        response = self.client.post(self.url, self.load_form())
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(EmployeeProfile.objects.get().version, self.profile.version)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_single_field_change_writes_only_that_column(self):
+        data = self.load_form()
+        data['radio_call_sign'] = 'ALPHA-9'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "core_employeeprofile"')]
+        self.assertEqual(len(updates), 1)
+        assignments = updates[0].split(' SET ')[1].split(' WHERE ')[0]
+        self.assertEqual(
+            sorted(column.split(' = ')[0].strip('"') for column in assignments.split(', ')),
+            ['radio_call_sign', 'updated_at', 'version'],
+        )
+        self.assertEqual(Notification.objects.get().notification_type, 'security_update')
+
+
+@override_settings(AUDIT_LOG_BACKGROUND=False)
+@mock.patch('core.audit.RETRY_DELAYS', (0,))
+class AuditWriterTests(TestCase):
+    def entries(self, count):
+        return [
+            AuditLog(profile_id=1, object_type='profile', object_id=1, action='update', changes={'name': ['A', str(n)]})
+            for n in range(count)
+        ]
+
+    def test_transient_errors_are_retried(self):
+        writer = AuditWriter()
+        failures = [OperationalError('database is locked'), mock.DEFAULT]
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=failures, wraps=AuditLog.objects.bulk_create):
+            with self.assertLogs('core.audit', 'WARNING'):
+                writer.submit_many(self.entries(3))
+        self.assertEqual(AuditLog.objects.count(), 3)
+        self.assertTrue(writer.wait(timeout=1))
+
+    def test_entries_that_cannot_be_written_are_reported(self):
+        writer = AuditWriter()
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=OperationalError('disk I/O error')):
+            with self.assertLogs('core.audit', 'ERROR') as logs:
+                writer.submit_many(self.entries(2))
+        self.assertEqual(sum('Lost audit log entry' in line for line in logs.output), 2)
+        self.assertFalse(writer.wait(timeout=1))
+
+    def test_one_bad_entry_does_not_lose_the_batch(self):
+        writer = AuditWriter()
+        entries = self.entries(3)
+        entries[1].object_type = None
+        with self.assertLogs('core.audit', 'ERROR'):
+            writer.submit_many(entries)
+        self.assertEqual(AuditLog.objects.count(), 2)
+        self.assertFalse(writer.wait(timeout=1))
+
+
+@override_settings(AUDIT_LOG_BACKGROUND=False)
+class AuditLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=1, stdout=StringIO())
+
+    def setUp(self):
+        self.profile = EmployeeProfile.objects.get()
+
+    def test_entries_are_written_when_the_transaction_commits(self):
+        old_name = self.profile.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.name = 'Renamed'
+            self.profile.save()
+            self.assertFalse(AuditLog.objects.exists())
+        entry = AuditLog.objects.get()
+        self.assertEqual((entry.action, entry.profile_id), ('update', self.profile.pk))
+        self.assertEqual(entry.changes, {'name': [old_name, 'Renamed']})
+
+    def test_rolled_back_saves_leave_no_entry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.profile.name = 'Renamed'
+                    self.profile.save()
+                    raise RuntimeError('roll back')
+        self.assertFalse(AuditLog.objects.exists())
+
+
+@override_settings(AUDIT_LOG_BACKGROUND=False)
+class SecurityGridTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=2, stdout=StringIO())
+        cls.admin = User.objects.create_user('grid-admin', 'grid-admin@example.com', role='security_admin')
+
+    def load_grid(self):
+        self.client.force_login(self.admin)
+        data = formset_post_data(self.client.get('/security/grid/').context['formset'])
+        row = next(key.removesuffix('-id') for key in data if key.endswith('-id'))
+        return data, row, EmployeeProfile.objects.get(pk=data[f'{row}-id'])
+
+    def test_edited_rows_are_saved(self):
+        data, row, profile = self.load_grid()
+        data[f'{row}-radio_call_sign'] = 'MINE'
+        response = self.client.post('/security/grid/', data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(EmployeeProfile.objects.get(pk=profile.pk).radio_call_sign, 'MINE')
+
+    def test_stale_save_is_refused_and_writes_nothing(self):
+        data, row, profile = self.load_grid()
+        profile.radio_call_sign = 'THEIRS'
+        profile.save()
+        data[f'{row}-radio_call_sign'] = 'MINE'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/security/grid/', data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(EmployeeProfile.objects.get(pk=profile.pk).radio_call_sign, 'THEIRS')
+        self.assertFalse(Notification.objects.filter(notification_type='security_update').exists())
+
+
+class SecurityApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=1, stdout=StringIO())
+        cls.admin = User.objects.create_user('api-admin', 'api-admin@example.com', role='security_admin')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.profile = EmployeeProfile.objects.get()
+        self.url = f'/api/profiles/{self.profile.pk}/security/'
+
+    def patch(self, fields, etag):
+        return self.client.patch(self.url, json.dumps(fields), content_type='application/json', headers={'If-Match': etag})
+
+    def test_unchanged_profile_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_patch_with_current_version_is_saved(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.patch({'radio_call_sign': 'MINE'}, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['changed'], ['radio_call_sign'])
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_patch_with_stale_version_is_refused(self):
+        etag = self.client.get(self.url)['ETag']
+        self.profile.radio_call_sign = 'THEIRS'
+        self.profile.save()
+        response = self.patch({'radio_call_sign': 'MINE'}, etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.json()['radio_call_sign'], 'THEIRS')
+        self.assertEqual(EmployeeProfile.objects.get().radio_call_sign, 'THEIRS')
+
+
+class CheckExpiriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=1, stdout=StringIO())
+        User.objects.create_user('expiry-admin', 'expiry-admin@example.com', role='security_admin')
+        EmployeeProfile.objects.update(
+            id_contact_expiry=timezone.localdate() + timedelta(days=5), bsafe=None, sat=None, sbfat=None,
+        )
+
+    def test_rerun_sends_nothing_new(self):
+        call_command('check_expiries', stdout=StringIO())
+        alerts, notifications = ExpiryAlert.objects.count(), Notification.objects.count()
+        self.assertEqual(alerts, 1)
+        # The employee and the security admin's digest
+        self.assertEqual(notifications, 2)
+
+        output = StringIO()
+        call_command('check_expiries', stdout=output)
+        self.assertIn('0 new alerts', output.getvalue())
+        self.assertEqual((ExpiryAlert.objects.count(), Notification.objects.count()), (alerts, notifications))
+
+
+@override_settings(AUDIT_LOG_BACKGROUND=False)
+class ComplianceSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=6, stdout=StringIO())
+        refresh_summary()
+
+    def summary(self):
+        return {
+            (row['dimension'], row['key']): row
+            for row in ComplianceSummary.objects.filter(total__gt=0).values(
+                'dimension', 'key', 'total', 'bsafe_valid', 'sat_valid', 'sbfat_valid', 'id_valid', 'compliant',
+            )
+        }
+
+    def test_deltas_match_a_full_refresh(self):
+        today = timezone.localdate()
+        first, second, third = EmployeeProfile.objects.order_by('pk')[:3]
+        with self.captureOnCommitCallbacks(execute=True):
+            first.zone = 'Nowhere'
+            first.bsafe = None
+            first.save()
+            second.id_contact_expiry = today + timedelta(days=30)
+            second.sat = second.sbfat = second.bsafe = today
+            second.save()
+            third.delete()
+            new = EmployeeProfile.objects.get(pk=first.pk)
+            new.pk, new._state.adding = None, True
+            new.employee_id, new.zone = 'NEW-1', 'Elsewhere'
+            new.save()
+
+        incremental = self.summary()
+        self.assertEqual(incremental[('all', '')]['total'], 6)
+        refresh_summary()
+        self.assertEqual(incremental, self.summary())
+
+
+class CrisisRosterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=5, stdout=StringIO())
+        cls.admin = User.objects.create_user('roster-admin', 'roster-admin@example.com', role='security_admin')
+        Dependent.objects.all().delete()
+        profiles = list(EmployeeProfile.objects.order_by('pk'))
+        for profile, warden in zip(profiles, ['Warden Rahman', ' warden rahman ', 'Warden Karim', '', 'Warden Karim']):
+            profile.appointment_unit_based_warden = warden
+            profile.zone = 'Gulshan' if profile is not profiles[-1] else 'Banani'
+            profile.save()
+        for profile, count in zip(profiles, [2, 0, 1, 0, 3]):
+            Dependent.objects.bulk_create(
+                Dependent(employee_profile=profile, name=f'Dependent {n}', relationship='son', date_of_birth='2015-01-01')
+                for n in range(count)
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_headcount_groups_wardens_and_counts_dependents(self):
+        with self.assertNumQueries(3):  # session, user and the one aggregate query
+            response = self.client.get('/security/roster/headcount/', {'zone': ' gulshan'})
+        counts = response.json()
+        self.assertEqual(counts['filters'], {'zone': 'gulshan'})
+        self.assertEqual((counts['staff'], counts['dependents'], counts['people']), (4, 3, 7))
+        self.assertEqual(
+            [(row['warden'], row['staff'], row['dependents']) for row in counts['wardens']],
+            [('Warden Rahman', 2, 2), ('Warden Karim', 1, 1), ('(No warden assigned)', 1, 0)],
+        )
+
+    def test_call_lists_follow_the_headcount_groups(self):
+        response = self.client.get('/security/roster/', {'zone': 'Gulshan'})
+        lists = response.context['call_lists']
+        self.assertEqual(
+            [(warden, len(rows), sum(row['dependent_total'] for row in rows)) for warden, rows in lists],
+            [('(No warden assigned)', 1, 0), ('Warden Karim', 1, 1), ('Warden Rahman', 2, 2)],
+        )
+
+        response = self.client.get('/security/roster/', {'zone': 'Gulshan', 'format': 'csv'})
+        rows = response.content.decode().splitlines()
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(rows[-1].startswith('Warden Rahman,'))
+
+
+class EmergencyRosterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_demo_data', profiles=3, stdout=StringIO())
+        Dependent.objects.create(
+            employee_profile=EmployeeProfile.objects.first(), name='Dependent', relationship='son', date_of_birth='2015-01-01',
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'snapshot.json.gz')
+        settings = override_settings(EMERGENCY_SNAPSHOT_PATH=self.path, EMERGENCY_SNAPSHOT_TOKEN='secret')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        emergency._loaded.clear()
+        self.addCleanup(emergency._loaded.clear)
+        self.header = emergency.build_snapshot()
+
+    def test_roster_is_served_without_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/emergency/roster/', {'format': 'json'}, headers={'X-Emergency-Token': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        dependents = Dependent.objects.count()
+        self.assertEqual((data['count'], data['snapshot']['dependent_count']), (3, dependents))
+        self.assertEqual(sum(len(row['dependents']) for row in data['staff']), dependents)
+        self.assertEqual(response['X-Snapshot-Checksum'], self.header['checksum'])
+
+    def test_checksum_verifies_contents(self):
+        with gzip.open(self.path, 'rt') as snapshot:
+            data = json.load(snapshot)
+        self.assertEqual(emergency.checksum(data['staff']), data['checksum'])
+
+        data['staff'][0]['cell_phone_whatsapp'] = '000'
+        with gzip.open(self.path, 'wt') as snapshot:
+            json.dump(data, snapshot)
+        with self.assertRaisesMessage(emergency.SnapshotError, 'checksum'):
+            emergency.Snapshot.load(self.path)
+
+    def test_token_is_required(self):
+        response = self.client.get('/emergency/roster/', {'token': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+
+
+class TrendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('trend-admin', 'trend-admin@example.com', role='super_admin')
+
+    def edit_on(self, day, profile_id):
+        created_at = timezone.make_aware(datetime.combine(day, time(12)))
+        AuditLog.objects.create(
+            profile_id=profile_id, object_type='profile', object_id=profile_id, action='update', created_at=created_at,
+        )
+
+    def test_edits_series_counts_days_without_a_snapshot_live(self):
+        today = timezone.localdate()
+        DailyActivity.objects.create(date=today - timedelta(days=3), profile_edits=4, profiles_edited=3)
+        DailyActivity.objects.create(date=today - timedelta(days=1), profile_edits=2, profiles_edited=1)
+        # A day the snapshot missed, and today
+        for profile_id in (1, 1, 2):
+            self.edit_on(today - timedelta(days=2), profile_id)
+        self.edit_on(today, 5)
+        # Recorded days are read from their snapshot, not recounted
+        self.edit_on(today - timedelta(days=1), 9)
+
+        self.client.force_login(self.admin)
+        points = self.client.get('/reports/trends/edits/', {'days': 5}).json()['points']
+        self.assertEqual(
+            [(point['date'], point['profile_edits'], point['profiles_edited']) for point in points],
+            [
+                ((today - timedelta(days=4)).isoformat(), 0, 0),
+                ((today - timedelta(days=3)).isoformat(), 4, 3),
+                ((today - timedelta(days=2)).isoformat(), 3, 2),
+                ((today - timedelta(days=1)).isoformat(), 2, 1),
+                (today.isoformat(), 1, 1),
+            ],
+        )
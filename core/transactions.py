@@ -0,0 +1,33 @@
+"""
+Write transactions that take SQLite's write lock up front.
+
+A transaction that reads a profile and then saves it starts as a reader. If
+another worker commits in between, SQLite cannot upgrade it to a writer and
+fails at once with "database is locked"; busy_timeout does not help, because
+waiting would not make the snapshot current again. ``write_atomic`` opens the
+outermost block with BEGIN IMMEDIATE instead, so the write lock is taken (and
+waited for under busy_timeout) before the first read. Use it only for blocks
+that write: an IMMEDIATE transaction holds the lock until it ends and blocks
+every other writer meanwhile. Other databases get a plain atomic block.
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class ImmediateAtomic(transaction.Atomic):
+    def __enter__(self):
+        connection = transaction.get_connection(self.using)
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            return super().__enter__()
+        connection.ensure_connection()
+        mode, connection.transaction_mode = connection.transaction_mode, 'IMMEDIATE'
+        try:
+            return super().__enter__()
+        finally:
+            connection.transaction_mode = mode
+
+
+def write_atomic(using=None, savepoint=True, durable=False):
+    """transaction.atomic() that starts with BEGIN IMMEDIATE on SQLite; also usable as a decorator"""
+    if callable(using):
+        return ImmediateAtomic(DEFAULT_DB_ALIAS, savepoint, durable)(using)
+    return ImmediateAtomic(using, savepoint, durable)
@@ -0,0 +1,219 @@
+"""
+Profile growth, edit activity and completion trends.
+
+Closed days are read from DailyActivity, which the snapshot_activity command
+fills in once a day with one TruncDate GROUP BY per series (profiles
+created, audit log edits and notifications), so an old day is never counted
+again. The trend endpoints read that small table (the weekly series with
+one TruncWeek GROUP BY) and count only the days it has no row for
+(normally just today, or days a missed snapshot run skipped) live, through
+the created_at indexes.
+"""
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db import transaction
+from django.db.models import CharField, Count, IntegerField, Q, Sum, TextField
+from django.db.models.functions import TruncDate, TruncWeek
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+
+from .models import AuditLog, DailyActivity, EmployeeProfile, Notification
+from .routers import use_replica
+from .views import is_super_admin
+
+# Longest range a trend request may ask for, in days
+MAX_TREND_DAYS = 2 * 366
+DEFAULT_TREND_DAYS = {'profiles-created': 26 * 7, 'edits': 30, 'completion': 90}
+
+ACTIVITY_COUNTERS = ('profiles_created', 'profile_edits', 'profiles_edited', 'notifications')
+
+
+def complete_q():
+    """Profiles whose get_completion_status() is 'complete', as a filter"""
+    q = Q()
+    for name in EmployeeProfile.BASIC_REQUIRED_FIELDS + EmployeeProfile.SECURITY_REQUIRED_FIELDS:
+        field = EmployeeProfile._meta.get_field(name)
+        q &= Q(**{f'{field.attname}__isnull': False})
+        if isinstance(field, (CharField, TextField)):
+            q &= ~Q(**{name: ''})
+        # Basic section numbers left at 0 count as missing
+        elif name in EmployeeProfile.BASIC_REQUIRED_FIELDS and isinstance(field, IntegerField):
+            q &= ~Q(**{name: 0})
+    return q
+
+
+def day_bounds(start, end):
+    """Aware datetimes spanning the local dates start..end inclusive"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def daily_counts(start, end):
+    """{date: {counter: value}} for start..end inclusive, one TruncDate GROUP BY per series"""
+    since, until = day_bounds(start, end)
+    days = {}
+
+    def add(rows, **columns):
+        for row in rows:
+            counts = days.setdefault(row['day'], dict.fromkeys(ACTIVITY_COUNTERS, 0))
+            counts.update({column: row[key] for column, key in columns.items()})
+
+    add(
+        EmployeeProfile.objects.filter(created_at__gte=since, created_at__lt=until).order_by()
+        .annotate(day=TruncDate('created_at')).values('day').annotate(created=Count('pk')),
+        profiles_created='created',
+    )
+    add(
+        AuditLog.objects.filter(created_at__gte=since, created_at__lt=until, action='update').order_by()
+        .annotate(day=TruncDate('created_at')).values('day')
+        .annotate(edits=Count('pk'), edited=Count('profile_id', distinct=True)),
+        profile_edits='edits', profiles_edited='edited',
+    )
+    add(
+        Notification.objects.filter(created_at__gte=since, created_at__lt=until).order_by()
+        .annotate(day=TruncDate('created_at')).values('day').annotate(sent=Count('pk')),
+        notifications='sent',
+    )
+    return days
+
+
+def completion_counts():
+    """Profiles now: total, complete and approved, with one aggregate query"""
+    return EmployeeProfile.objects.aggregate(
+        total_profiles=Count('pk'),
+        complete_profiles=Count('pk', filter=complete_q()),
+        approved_profiles=Count('pk', filter=Q(status='approved')),
+    )
+
+
+def record_activity(day=None, backfill_days=0):
+    """
+    Store DailyActivity rows for day (default yesterday) and the
+    backfill_days before it that have none yet, and return how many were
+    added. Days already recorded are left as they are. Only day itself gets
+    completion counts, taken now.
+    """
+    day = day or timezone.localdate() - timedelta(days=1)
+    start = day - timedelta(days=backfill_days)
+    recorded = set(DailyActivity.objects.filter(date__range=(start, day)).values_list('date', flat=True))
+    missing = [start + timedelta(days=offset) for offset in range(backfill_days + 1)]
+    missing = [date for date in missing if date not in recorded]
+    if not missing:
+        return 0
+    counts = daily_counts(missing[0], missing[-1])
+    completion = completion_counts() if day in missing else {}
+    rows = [
+        DailyActivity(date=date, **counts.get(date, {}), **(completion if date == day else {}))
+        for date in missing
+    ]
+    with transaction.atomic():
+        DailyActivity.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def trend_start(request, series):
+    try:
+        days = int(request.GET.get('days', DEFAULT_TREND_DAYS[series]))
+    except ValueError:
+        days = DEFAULT_TREND_DAYS[series]
+    days = min(max(days, 1), MAX_TREND_DAYS)
+    today = timezone.localdate()
+    return today - timedelta(days=days - 1), today
+
+
+def live_days(start, today):
+    """
+    Counts for the days in start..today that have no DailyActivity row,
+    which the snapshot table cannot answer. The missing days are counted
+    with one daily_counts() over the span from the first to the last of them.
+    """
+    recorded = set(DailyActivity.objects.filter(date__range=(start, today)).values_list('date', flat=True))
+    missing = [start + timedelta(days=n) for n in range((today - start).days + 1)]
+    missing = [date for date in missing if date not in recorded]
+    if not missing:
+        return {}
+    counts = daily_counts(missing[0], missing[-1])
+    return {date: counts[date] for date in missing if date in counts}
+
+
+def week_of(date):
+    return date - timedelta(days=date.weekday())
+
+
+def profiles_created_series(start, today):
+    """Profiles created per week (weeks start on Monday)"""
+    start = week_of(start)
+    live = live_days(start, today)
+    weeks = {
+        row['week']: row['created']
+        for row in DailyActivity.objects.filter(date__range=(start, today)).order_by()
+        .annotate(week=TruncWeek('date')).values('week').annotate(created=Sum('profiles_created'))
+    }
+    for date, counts in live.items():
+        weeks[week_of(date)] = weeks.get(week_of(date), 0) + counts['profiles_created']
+    return [
+        {'week': week.isoformat(), 'profiles_created': weeks.get(week, 0)}
+        for week in (start + timedelta(weeks=n) for n in range((today - start).days // 7 + 1))
+    ]
+
+
+def edits_series(start, today):
+    """Edits, distinct profiles edited and notifications per day"""
+    live = live_days(start, today)
+    days = {
+        row['date']: row
+        for row in DailyActivity.objects.filter(date__range=(start, today)).values('date', *ACTIVITY_COUNTERS)
+    }
+    days.update(live)
+    empty = dict.fromkeys(ACTIVITY_COUNTERS, 0)
+    return [
+        {'date': date.isoformat(), **{counter: days.get(date, empty)[counter] for counter in ACTIVITY_COUNTERS[1:]}}
+        for date in (start + timedelta(days=n) for n in range((today - start).days + 1))
+    ]
+
+
+def completion_series(start, today):
+    """Share of complete and approved profiles per recorded day, ending with the current value"""
+    points = list(
+        DailyActivity.objects.filter(date__gte=start, date__lt=today, total_profiles__isnull=False)
+        .order_by('date').values_list('date', 'total_profiles', 'complete_profiles', 'approved_profiles')
+    )
+    current = completion_counts()
+    points.append((today, current['total_profiles'], current['complete_profiles'], current['approved_profiles']))
+    return [
+        {
+            'date': day.isoformat(),
+            'total_profiles': total,
+            'complete_profiles': complete,
+            'approved_profiles': approved,
+            'completion_rate': round(complete / total, 4) if total else None,
+            'approval_rate': round(approved / total, 4) if total else None,
+        }
+        for day, total, complete, approved in points
+    ]
+
+
+SERIES = {
+    'profiles-created': profiles_created_series,
+    'edits': edits_series,
+    'completion': completion_series,
+}
+
+
+@login_required
+@user_passes_test(is_super_admin)
+@use_replica
+def trend_view(request, series):
+    """One trend series as JSON; ?days= sets how far back it goes"""
+    if series not in SERIES:
+        raise Http404('Unknown trend series')
+    start, today = trend_start(request, series)
+    return JsonResponse({
+        'series': series,
+        'start': start.isoformat(),
+        'end': today.isoformat(),
+        'points': SERIES[series](start, today),
+    })
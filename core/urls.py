@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, emergency, reports, roster, security, trends
 
 urlpatterns = [
     path('', views.home_view, name='home'),
@@ -9,15 +9,32 @@ urlpatterns = [
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('profile/create/', views.profile_create_view, name='profile_create'),
     path('profile/edit/<int:pk>/', views.profile_edit_view, name='profile_edit'),
+    path('profile/import/', views.profile_import_view, name='profile_import'),
     path('profile/delete/<int:pk>/', views.profile_delete_view, name='profile_delete'),
     path('profile/<int:pk>/', views.profile_detail_view, name='profile_detail'),
+    path('profile/<int:pk>/history/', views.profile_history_view, name='profile_history'),
     path('notifications/', views.notifications_view, name='notifications'),
     path('notifications/<int:notification_id>/mark-read/', views.mark_notification_read_view, name='mark_notification_read'),
     path('notifications/count/', views.get_notification_count_view, name='get_notification_count'),
     path('notifications/list/', views.get_notifications_list_view, name='get_notifications_list'),
     path('update-dependent-forms/', views.update_dependent_forms, name='update_dependent_forms'),
-    path('reports/', views.report_generation_view, name='report_generation'),
-    path('reports/export-pdf/', views.export_pdf_view, name='export_pdf'),
+    path('security/grid/', security.security_grid_view, name='security_grid'),
+    path('security/roster/', roster.crisis_roster_view, name='crisis_roster'),
+    path('security/roster/headcount/', roster.crisis_headcount_view, name='crisis_headcount'),
+    path('emergency/roster/', emergency.emergency_roster_view, name='emergency_roster'),
+    path('api/profiles/<int:pk>/security/', security.security_api_view, name='security_api'),
+    # Route used by the dashboard security modal
+    path('api/submissions/<int:pk>/security/', security.security_api_view),
+    path('reports/', reports.report_generation_view, name='report_generation'),
+    path('reports/export-pdf/', reports.export_pdf_view, name='export_pdf'),
+    path('reports/compliance/', reports.compliance_detail_view, name='compliance_detail'),
+    path('reports/compliance/refresh/', reports.compliance_refresh_view, name='compliance_refresh'),
+    path('reports/demographics/', reports.demographics_view, name='demographics'),
+    path('reports/trends/<slug:series>/', trends.trend_view, name='trend'),
+    path('diagnostics/slow-queries/', views.slow_query_log_view, name='slow_query_log'),
+    path('diagnostics/profiles/', views.request_profiles_view, name='request_profiles'),
+    path('diagnostics/profiles/<str:name>/', views.download_request_profile_view, name='download_request_profile'),
+    path('diagnostics/db-pool/', views.db_pool_stats_view, name='db_pool_stats'),
     path('forget-password/', views.forget_password_view, name='forget_password'),
     path('reset-password/<str:uidb64>/<str:token>/', views.reset_password_confirm_view, name='reset_password_confirm'),
 ]
@@ -4,18 +4,16 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import JsonResponse
 from django.forms import formset_factory
-from django.db import transaction
-from django.db.models import Count
-from .models import User, EmployeeProfile, Dependent, Notification
-from .forms import UserSignupForm, EmployeeProfileForm, DependentFormSet, UserLoginForm
-from django.http import HttpResponse
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from io import BytesIO
-import datetime as dt
+from django.forms.models import model_to_dict
+from django.db import transaction, connections
+from .models import User, EmployeeProfile, Dependent, Notification, SlowQueryLog, EditConflict, AuditLog
+from .forms import UserSignupForm, EmployeeProfileForm, DependentFormSet, UserLoginForm, ProfileImportUploadForm
+from .importers import ImportFileError, ProfileSheet, import_profiles
+from . import profiling
+from .routers import use_replica, pin_to_primary
+from .transactions import write_atomic
+from .projections import profile_rows
+from django.http import FileResponse, Http404
 from django.contrib.auth.forms import PasswordResetForm, SetPasswordForm
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -24,7 +22,9 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from zoneinfo import ZoneInfo
+from datetime import datetime, time
 
 def is_security_admin(user):
     return user.is_authenticated and user.role == 'security_admin'
@@ -95,6 +95,7 @@ def logout_view(request):
     return redirect('login')
 
 @login_required
+@use_replica
 def dashboard_view(request):
     user = request.user
     
@@ -114,8 +115,8 @@ def dashboard_view(request):
                 'profile_status': 'incomplete'
             }
     else:
-        # Admin dashboard - show all profiles
-        profiles = EmployeeProfile.objects.all().order_by('-created_at')
+        # Admin dashboard - show all profiles, fetching only the listed columns
+        profiles = profile_rows(EmployeeProfile.objects.all().order_by('-created_at'))
         
         context = {
             'profiles': profiles,
@@ -151,7 +152,7 @@ def profile_create_view(request):
             # Try to validate dependent formset, but don't fail if it's not valid
             dependents_valid = dependent_formset.is_valid()
             
-            with transaction.atomic():
+            with write_atomic():
                 profile = form.save(commit=False)
                 profile.created_by = request.user
                 profile.save()
@@ -179,6 +180,7 @@ def profile_create_view(request):
                         # Swallow notification errors to not block profile creation
                         pass
                 transaction.on_commit(lambda: notify_security_admins(profile.id, request.user.id))
+                pin_to_primary(request)
                 
                 messages.success(request, 'Profile created successfully!')
                 return redirect('dashboard')
@@ -201,6 +203,58 @@ def profile_create_view(request):
     }
     return render(request, 'core/profile_form.html', context)
 
+def edit_conflict_details(form, current):
+    """
+    Fields that both the editor (against the version they loaded) and someone
+    else since then changed, as dicts with the field name, its label and both
+    values for display.
+    """
+    edited = form.edited_fields()
+    saved_values = model_to_dict(current, fields=edited)
+    conflicts = []
+    for name in edited:
+        field = form.fields[name]
+        if not field.has_changed(form.get_initial_for_field(field, name), saved_values.get(name)):
+            # Still as the editor loaded it: only the editor changed it
+            continue
+        value, saved = form.cleaned_data.get(name), getattr(current, name)
+        conflicts.append({
+            'field': name,
+            'label': field.label,
+            'yours': '' if value is None else str(value),
+            'current': '' if saved is None else str(saved),
+        })
+    return conflicts
+
+def edit_conflict_response(request, form, dependent_formset, profile):
+    """Re-render the edit form with a merge table after a lost-update conflict (HTTP 409)"""
+    current = EmployeeProfile.objects.get(pk=profile.pk)
+    conflicts = edit_conflict_details(form, current)
+    # Lay the editor's own changes over the current version and take every
+    # field they did not touch from it, so submitting again keeps the other
+    # change and only overwrites the fields listed as conflicts
+    initial = {name: getattr(form.cleaned_data[name], 'pk', form.cleaned_data[name]) for name in form.edited_fields()}
+    initial['version'] = current.version
+    form = EmployeeProfileForm(instance=current, initial=initial, user_role=request.user.role)
+    context = {
+        'form': form,
+        'dependent_formset': dependent_formset,
+        'profile': current,
+        'user_role': request.user.role,
+        'is_create': False,
+        'profile_status': current.get_completion_status(),
+        'edit_conflict': True,
+        'edit_conflicts': conflicts,
+    }
+    return render(request, 'core/profile_form.html', context, status=409)
+
+def describe_changes(profile):
+    """Verbose names of the form-editable fields written by the profile's last save, comma separated"""
+    return ', '.join(
+        str(field.verbose_name) for field in profile._meta.concrete_fields
+        if field.name in profile.changed_fields and field.editable and not getattr(field, 'auto_now', False)
+    )
+
 @login_required
 def profile_edit_view(request, pk):
     profile = get_object_or_404(EmployeeProfile, pk=pk)
@@ -229,68 +283,80 @@ def profile_edit_view(request, pk):
         if request.user.role == 'security_admin':
             # Security admins can save with just security fields
             if form.is_valid():
-                with transaction.atomic():
-                    updated_profile = form.save(commit=False)
+                try:
+                    with write_atomic():
+                        updated_profile = form.save(commit=False)
                     
-                    # No approval workflow needed
-                    updated_profile.save()
+                        # No approval workflow needed
+                        updated_profile.save()
                     
-                    # Don't require dependent formset validation for security admins
-                    try:
-                        if dependent_formset.is_valid():
-                            dependent_formset.save()
-                    except:
-                        pass  # Ignore dependent formset errors for security admins
-                    # Notify employee that security information was updated
-                    try:
-                        # Do not notify super admins
-                        if getattr(updated_profile.created_by, 'role', None) != 'super_admin':
-                            Notification.objects.create(
-                                recipient=updated_profile.created_by,
-                                sender=request.user,
-                                notification_type='security_update',
-                                title='Security Information Updated',
-                                message=f'Security-related fields for your profile ({updated_profile.name}) were updated by Security Admin.',
-                                profile=updated_profile
-                            )
-                    except Exception:
-                        pass
+                        # Don't require dependent formset validation for security admins
+                        try:
+                            if dependent_formset.is_valid():
+                                dependent_formset.save()
+                        except:
+                            pass  # Ignore dependent formset errors for security admins
+                        # Notify employee that security information was updated
+                        changes = describe_changes(updated_profile)
+                        try:
+                            # Do not notify super admins, or anyone when nothing changed
+                            if changes and getattr(updated_profile.created_by, 'role', None) != 'super_admin':
+                                Notification.objects.create(
+                                    recipient=updated_profile.created_by,
+                                    sender=request.user,
+                                    notification_type='security_update',
+                                    title='Security Information Updated',
+                                    message=f'Security-related fields for your profile ({updated_profile.name}) were updated by Security Admin: {changes}.',
+                                    profile=updated_profile
+                                )
+                        except Exception:
+                            pass
                     
-                    messages.success(request, 'Security information updated successfully!')
-                    return redirect('dashboard')
+                        pin_to_primary(request)
+                        messages.success(request, 'Security information updated successfully!')
+                        return redirect('dashboard')
+                except EditConflict:
+                    return edit_conflict_response(request, form, dependent_formset, profile)
         else:
             # Regular validation for other roles
             if form.is_valid():
-                with transaction.atomic():
-                    updated_profile = form.save(commit=False)
+                try:
+                    with write_atomic():
+                        updated_profile = form.save(commit=False)
                     
                     
                     
-                    updated_profile.save()
+                        updated_profile.save()
                     
-                    # Try to save dependent formset, but don't fail if it's not valid
-                    try:
-                        if dependent_formset.is_valid():
-                            dependent_formset.save()
-                    except:
-                        pass  # Ignore dependent formset errors for regular users
-                    # Notify all security admins that employee updated data
-                    try:
-                        security_admins = User.objects.filter(role='security_admin')
-                        for admin in security_admins:
-                            Notification.objects.create(
-                                recipient=admin,
-                                sender=request.user,
-                                notification_type='profile_edited',
-                                title='Employee Profile Updated',
-                                message=f'{request.user.get_full_name()} updated their profile ({updated_profile.name}).',
-                                profile=updated_profile
-                            )
-                    except Exception:
-                        pass
+                        # Try to save dependent formset, but don't fail if it's not valid
+                        try:
+                            if dependent_formset.is_valid():
+                                dependent_formset.save()
+                        except:
+                            pass  # Ignore dependent formset errors for regular users
+                        # Notify all security admins that employee updated data
+                        changes = describe_changes(updated_profile)
+                        if dependent_formset.is_bound and dependent_formset.has_changed():
+                            changes = ', '.join(filter(None, [changes, 'Dependents']))
+                        try:
+                            security_admins = User.objects.filter(role='security_admin') if changes else []
+                            for admin in security_admins:
+                                Notification.objects.create(
+                                    recipient=admin,
+                                    sender=request.user,
+                                    notification_type='profile_edited',
+                                    title='Employee Profile Updated',
+                                    message=f'{request.user.get_full_name()} updated their profile ({updated_profile.name}): {changes}.',
+                                    profile=updated_profile
+                                )
+                        except Exception:
+                            pass
                     
-                    messages.success(request, 'Profile updated successfully!')
-                    return redirect('dashboard')
+                        pin_to_primary(request)
+                        messages.success(request, 'Profile updated successfully!')
+                        return redirect('dashboard')
+                except EditConflict:
+                    return edit_conflict_response(request, form, dependent_formset, profile)
     else:
         form = EmployeeProfileForm(instance=profile, user_role=request.user.role)
         dependent_formset = DependentFormSet(instance=profile)
@@ -312,11 +378,44 @@ def profile_delete_view(request, pk):
     
     if request.method == 'POST':
         profile.delete()
+        pin_to_primary(request)
         messages.success(request, 'Profile deleted successfully!')
         return redirect('dashboard')
     
     return render(request, 'core/profile_confirm_delete.html', {'profile': profile})
 
+@login_required
+@user_passes_test(is_super_admin)
+def profile_import_view(request):
+    """Upload a CSV/XLSX spreadsheet of profiles, validate every row and import the valid ones"""
+    result = None
+    if request.method == 'POST':
+        form = ProfileImportUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_profiles(
+                    ProfileSheet(upload.file, upload.name), request.user,
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except ImportFileError as exc:
+                messages.error(request, str(exc))
+            else:
+                if result.created:
+                    pin_to_primary(request)
+                    messages.success(request, f'Imported {result.created} profiles.')
+    else:
+        form = ProfileImportUploadForm()
+
+    context = {
+        'form': form,
+        'result': result,
+        'errors': result.errors[:200] if result else [],
+        'max_rows': getattr(settings, 'PROFILE_IMPORT_MAX_ROWS', 10000),
+        'user_role': request.user.role,
+    }
+    return render(request, 'core/profile_import.html', context)
+
 @login_required
 @user_passes_test(is_admin_user)
 def profile_detail_view(request, pk):
@@ -328,6 +427,52 @@ def profile_detail_view(request, pk):
     }
     return render(request, 'core/profile_detail.html', context)
 
+def parse_history_bound(value, end_of_day=False):
+    """Parse a since/until query value given as an ISO date or datetime"""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+@login_required
+@user_passes_test(is_admin_user)
+def profile_history_view(request, pk):
+    """JSON audit trail of a profile and its dependents, newest first"""
+    try:
+        since = parse_history_bound(request.GET.get('since'))
+        until = parse_history_bound(request.GET.get('until'), end_of_day=True)
+        limit = max(1, min(int(request.GET.get('limit', 100)), 1000))
+    except ValueError:
+        return JsonResponse({'error': 'since/until must be ISO dates or datetimes and limit an integer'}, status=400)
+
+    entries = AuditLog.objects.filter(profile_id=pk)
+    if since:
+        entries = entries.filter(created_at__gte=since)
+    if until:
+        entries = entries.filter(created_at__lte=until)
+    entries = entries.values(
+        'object_type', 'object_id', 'action', 'changes', 'created_at', 'actor__username'
+    )[:limit]
+    history = [
+        {
+            'object_type': entry['object_type'],
+            'object_id': entry['object_id'],
+            'action': entry['action'],
+            'actor': entry['actor__username'],
+            'changes': entry['changes'],
+            'created_at': entry['created_at'].isoformat(),
+        }
+        for entry in entries
+    ]
+    return JsonResponse({'profile_id': pk, 'history': history})
+
 
 @login_required
 def notifications_view(request):
@@ -428,220 +573,56 @@ def update_dependent_forms(request):
 
 @login_required
 @user_passes_test(is_super_admin)
-def report_generation_view(request):
-    """Report generation view for super admins"""
-    profiles = EmployeeProfile.objects.all()
-    total_profiles = profiles.count()
-    
-    # Initialize filters
-    filters = {}
-    
-    if request.method == 'GET':
-        # Apply filters based on GET parameters (restricted set)
-        agency = request.GET.get('agency')                 # Project
-        duty_station = request.GET.get('duty_station')     # District
-        contact_type = request.GET.get('contact_type')     # Level
-        zone = request.GET.get('zone')                     # Zone
-        
-        if agency:
-            filters['agency'] = agency
-            profiles = profiles.filter(agency_project_cluster_office__iexact=agency)
-        
-        if duty_station:
-            filters['duty_station'] = duty_station
-            profiles = profiles.filter(duty_station__iexact=duty_station)
-        
-        if contact_type:
-            filters['contact_type'] = contact_type
-            profiles = profiles.filter(contact_type__iexact=contact_type)
-        if zone:
-            filters['zone'] = zone
-            # Handle case-insensitive zone filtering since we format zones with title case
-            profiles = profiles.filter(zone__iexact=zone)
-        
-        # Apply ordering
-        profiles = profiles.order_by('-created_at')
-    
-    # Get unique values for filter dropdowns (restricted to Project, District, Level, Zone)
-    all_profiles = EmployeeProfile.objects.all()
-    
-    # Get unique agencies and sort them alphabetically (handle whitespace and case)
-    agencies = sorted(set([agency.strip() for agency in 
-                          all_profiles.values_list('agency_project_cluster_office', flat=True)
-                          .exclude(agency_project_cluster_office__isnull=True)
-                          .exclude(agency_project_cluster_office='') if agency.strip()]))
-    
-    # Get unique duty stations and sort them alphabetically (handle whitespace and case)
-    duty_stations = sorted(set([station.strip() for station in 
-                               all_profiles.values_list('duty_station', flat=True)
-                               .exclude(duty_station__isnull=True)
-                               .exclude(duty_station='') if station.strip()]))
-    
-    # Get unique contact types and sort them alphabetically (handle whitespace and case)
-    contact_types = sorted(set([contact.strip() for contact in 
-                               all_profiles.values_list('contact_type', flat=True)
-                               .exclude(contact_type__isnull=True)
-                               .exclude(contact_type='') if contact.strip()]))
-    
-    # Get unique zones, filter out empty/null values, and sort them alphabetically (handle whitespace and case)
-    zones = sorted(set([zone.strip().title() for zone in 
-                       all_profiles.values_list('zone', flat=True)
-                       .exclude(zone__isnull=True)
-                       .exclude(zone='') if zone.strip()]))
-    
-    # Generate statistics based on filtered profiles
-    stats = {
-        'total_profiles': total_profiles,
-        'filtered_profiles': profiles.count(),
-        'by_agency': profiles.values('agency_project_cluster_office').annotate(count=Count('id')),
-        'by_duty_station': profiles.values('duty_station').annotate(count=Count('id')),
-        'by_nationality': profiles.values('nationality').annotate(count=Count('id')),
-        'by_contact_type': profiles.values('contact_type').annotate(count=Count('id')),
-        'by_gender': profiles.values('gender').annotate(count=Count('id')),
-        'by_role': profiles.values('created_by__role').annotate(count=Count('id')),
+def slow_query_log_view(request):
+    """Browse sampled slow queries recorded by SlowQueryLogMiddleware"""
+    entries = SlowQueryLog.objects.all()
+    view_name = request.GET.get('view')
+    if view_name:
+        entries = entries.filter(view_name=view_name)
+
+    context = {
+        'entries': entries[:200],
+        'view_names': SlowQueryLog.objects.order_by('view_name').values_list('view_name', flat=True).distinct(),
+        'selected_view': view_name or '',
+        'threshold_ms': getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None),
+        'user_role': request.user.role,
     }
-    
+    return render(request, 'core/slow_queries.html', context)
+
+@login_required
+@user_passes_test(is_super_admin)
+def request_profiles_view(request):
+    """List cProfile dumps captured by RequestProfilerMiddleware"""
     context = {
-        'profiles': profiles,
-        'stats': stats,
-        'filters': filters,
-        'filter_options': {
-            'agencies': agencies,            # Project wise
-            'duty_stations': duty_stations,  # District wise
-            'contact_types': contact_types,  # Level wise
-            'zones': zones,                  # Zone wise
-        }
+        'profiles': profiling.list_profiles(),
+        'user_role': request.user.role,
     }
-    
-    return render(request, 'core/report_generation.html', context)
+    return render(request, 'core/request_profiles.html', context)
 
 @login_required
 @user_passes_test(is_super_admin)
-def export_pdf_view(request):
-    """Export filtered profiles to PDF"""
-    profiles = EmployeeProfile.objects.all()
-    
-    # Apply the same filters as the report generation view
-    agency = request.GET.get('agency')                 # Project
-    duty_station = request.GET.get('duty_station')     # District
-    contact_type = request.GET.get('contact_type')     # Level
-    zone = request.GET.get('zone')                     # Zone
-    
-    if agency:
-        profiles = profiles.filter(agency_project_cluster_office=agency)
-    if duty_station:
-        profiles = profiles.filter(duty_station=duty_station)
-    if contact_type:
-        profiles = profiles.filter(contact_type=contact_type)
-    if zone:
-        profiles = profiles.filter(zone=zone)
-    
-    profiles = profiles.order_by('-created_at')
-    
-    # Create the HttpResponse object with PDF headers
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="employee_profiles_{dt.datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
-    
-    # Create the PDF object using ReportLab
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
-        alignment=1,  # Center alignment
-        textColor=colors.HexColor('#1e40af')  # UNDP blue
-    )
-    
-    # Add title
-    title = Paragraph("Employee Profiles Report", title_style)
-    elements.append(title)
-    
-    # Add report metadata
-    metadata_style = ParagraphStyle(
-        'Metadata',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=20,
-        textColor=colors.grey
-    )
-    
-    # Build filter description (restricted filters)
-    filter_descriptions = []
-    if agency:
-        filter_descriptions.append(f"Project: {agency}")
-    if duty_station:
-        filter_descriptions.append(f"District: {duty_station}")
-    if contact_type:
-        filter_descriptions.append(f"Level: {contact_type}")
-    if zone:
-        filter_descriptions.append(f"Zone: {zone}")
-    
-    filter_text = ', '.join(filter_descriptions) if filter_descriptions else 'None'
-    
-    # Use Bangladesh time for generation timestamp
-    metadata = f"""
-    Generated on: {timezone.localtime(timezone.now(), ZoneInfo('Asia/Dhaka')).strftime("%B %d, %Y at %I:%M %p")}<br/>
-    Total Profiles: {profiles.count()}<br/>
-    Filters Applied: {filter_text}
-    """
-    elements.append(Paragraph(metadata, metadata_style))
-    elements.append(Spacer(1, 20))
-    
-    if profiles.exists():
-        # Create table data
-        table_data = [['Name', 'Employee ID', 'Agency', 'Duty Station', 'Contact Type', 'Created Date']]
-        
-        for profile in profiles:
-            table_data.append([
-                profile.name,
-                profile.employee_id,
-                profile.agency_project_cluster_office,
-                profile.duty_station,
-                profile.contact_type,
-                profile.created_at.strftime("%b %d, %Y")
-            ])
-        
-        # Create table
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),  # UNDP blue header
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        
-        elements.append(table)
-    else:
-        no_data_style = ParagraphStyle(
-            'NoData',
-            parent=styles['Normal'],
-            fontSize=14,
-            spaceAfter=20,
-            textColor=colors.grey,
-            alignment=1  # Center alignment
-        )
-        elements.append(Paragraph("No profiles found with the applied filters.", no_data_style))
-    
-    # Build PDF
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    
-    response.write(pdf)
-    return response
+def download_request_profile_view(request, name):
+    """Download a stored .prof file"""
+    path = profiling.get_profile_path(name)
+    if path is None:
+        raise Http404('Profile not found')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+@login_required
+@user_passes_test(is_super_admin)
+def db_pool_stats_view(request):
+    """JSON connection settings and pool metrics for each configured database"""
+    databases = {}
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        databases[connection.alias] = {
+            'vendor': connection.vendor,
+            'pooled': pool is not None,
+            'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+            'health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+            'stats': pool.get_stats() if pool is not None else None,
+        }
+    return JsonResponse({'databases': databases})
 
 def forget_password_view(request):
     """Forget password view - Step 1: Enter email address"""
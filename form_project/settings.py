@@ -49,8 +49,11 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.audit.AuditActorMiddleware',  # Records the acting user on audit log entries
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.SlowQueryLogMiddleware',  # Slow query log for core views
+    'core.middleware.RequestProfilerMiddleware',  # On-demand cProfile for super admins
 ]
 
 ROOT_URLCONF = 'form_project.urls'
@@ -77,13 +80,44 @@ WSGI_APPLICATION = 'form_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuning applied on every new connection. WAL lets readers run while a
+# writer commits, and busy_timeout makes writers from other gunicorn workers
+# wait for the lock instead of failing with "database is locked". The profile
+# write paths open their transactions with BEGIN IMMEDIATE (core.transactions),
+# so a read-then-write save never has to upgrade its lock mid-transaction.
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA busy_timeout=20000;'
+        'PRAGMA mmap_size=134217728;'
+        'PRAGMA cache_size=-20000;'
+    ),
+    'timeout': 20,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_OPTIONS,
     }
 }
 
+# Read replica
+# Reports, PDF export and dashboards read from DATABASES[DATABASE_REPLICA_ALIAS]
+# when it exists (see core/routers.py). Locally, point REPLICA_DATABASE_NAME at
+# a copy of db.sqlite3 to exercise the routing with two aliases.
+DATABASE_REPLICA_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '30'))
+if os.environ.get('REPLICA_DATABASE_NAME'):
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': os.environ['REPLICA_DATABASE_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development - prints emails to console
@@ -156,3 +190,35 @@ LOGOUT_REDIRECT_URL = '/login/'
 
 # Messages
 MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
+
+# Slow query log
+# Queries issued by core views that take longer than the threshold are stored
+# with their EXPLAIN output and listed at /diagnostics/slow-queries/.
+# Set SLOW_QUERY_THRESHOLD_MS to 0 (or leave it empty) to disable the log.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200') or 0) or None
+SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', '1.0'))
+SLOW_QUERY_LOG_MAX_ROWS = int(os.environ.get('SLOW_QUERY_LOG_MAX_ROWS', '1000'))
+
+# On-demand request profiling
+# Super admins add the X-Profile-Request header or ?_profile=1 to a request to
+# run its view under cProfile; results are listed at /diagnostics/profiles/.
+PROFILE_ROOT = Path(os.environ.get('PROFILE_ROOT', BASE_DIR / 'profiles'))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '50'))
+
+# Bulk profile import (core.importers)
+# Uploads at /profile/import/ are imported within the request, so larger files
+# are rejected and must go through `manage.py import_profiles`, which keeps
+# the request under the gunicorn worker timeout (WEB_TIMEOUT).
+PROFILE_IMPORT_MAX_ROWS = int(os.environ.get('PROFILE_IMPORT_MAX_ROWS', '10000'))
+
+# Field-level audit log of profile and dependent changes (core.audit).
+# Entries are written by a background thread in batches after commit; set
+# AUDIT_LOG_BACKGROUND=0 to write them synchronously on commit instead.
+AUDIT_LOG_BACKGROUND = os.environ.get('AUDIT_LOG_BACKGROUND', '1') != '0'
+
+# Emergency read-only roster (core.emergency)
+# build_emergency_snapshot writes the contact-critical fields of every profile
+# to EMERGENCY_SNAPSHOT_PATH; /emergency/roster/?token=... serves that file
+# without database queries. The page is disabled while the token is empty.
+EMERGENCY_SNAPSHOT_PATH = Path(os.environ.get('EMERGENCY_SNAPSHOT_PATH', BASE_DIR / 'emergency_snapshot.json.gz'))
+EMERGENCY_SNAPSHOT_TOKEN = os.environ.get('EMERGENCY_SNAPSHOT_TOKEN', '')
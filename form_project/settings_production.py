@@ -20,6 +20,37 @@ ALLOWED_HOSTS = ['*', 'sddm-system.onrender.com', '.onrender.com']
 DATABASES = {
     'default': dj_database_url.parse(os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite3'))
 }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = dict(SQLITE_OPTIONS)
+elif DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    # Check reused connections before handing them to a request
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    if os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+        # psycopg 3 connection pool (requires psycopg[pool]); the pool owns
+        # connection lifetime, so persistent connections must stay off
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '300')),
+            'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+        }
+    else:
+        # Keep each worker thread's connection open between requests
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
+# Read replica for reports, exports and dashboards (see core/routers.py)
+if os.environ.get('REPLICA_DATABASE_URL'):
+    # Only where to connect comes from the URL; the connection lifetime,
+    # health checks and pool of the default alias apply to the replica too
+    replica = dj_database_url.parse(os.environ['REPLICA_DATABASE_URL'])
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        **{key: replica[key] for key in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT') if key in replica},
+        'OPTIONS': {**DATABASES['default'].get('OPTIONS', {}), **replica.get('OPTIONS', {})},
+        'TEST': {'MIRROR': 'default'},
+    }
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -0,0 +1,95 @@
+"""
+Gunicorn configuration for production.
+
+Gunicorn picks this file up automatically when started from the project root
+(see Procfile). Every value can be overridden with an environment variable:
+
+- WEB_CONCURRENCY: number of worker processes (default: sized from CPU and memory)
+- WEB_THREADS: threads per worker for the gthread worker (default: 4)
+- WEB_WORKER_MEMORY_MB: expected RSS per worker used for auto-sizing (default: 160)
+- WEB_MAX_REQUESTS / WEB_MAX_REQUESTS_JITTER: worker recycling (default: 1000 / 100)
+- WEB_TIMEOUT: worker timeout in seconds (default: 60)
+- WEB_SERVER_MODE: "wsgi" (default) or "asgi" to run uvicorn workers
+  (requires ``pip install uvicorn``)
+"""
+import gc
+import multiprocessing
+import os
+from pathlib import Path
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _available_memory_mb():
+    """Memory limit of the container (cgroup v2/v1) or of the host"""
+    for limit_file in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            raw = Path(limit_file).read_text().strip()
+        except OSError:
+            continue
+        if raw.isdigit() and int(raw) < 1 << 50:
+            return int(raw) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _auto_workers():
+    by_cpu = multiprocessing.cpu_count() * 2 + 1
+    memory_mb = _available_memory_mb()
+    if memory_mb is None:
+        return by_cpu
+    by_memory = memory_mb // _env_int('WEB_WORKER_MEMORY_MB', 160)
+    return max(1, min(by_cpu, by_memory))
+
+
+server_mode = os.environ.get('WEB_SERVER_MODE', 'wsgi').lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+raw_env = [f"DJANGO_SETTINGS_MODULE={os.environ.get('DJANGO_SETTINGS_MODULE', 'form_project.settings_production')}"]
+
+workers = _env_int('WEB_CONCURRENCY', _auto_workers())
+if server_mode == 'asgi':
+    wsgi_app = 'form_project.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'form_project.wsgi:application'
+    worker_class = 'gthread'
+    threads = _env_int('WEB_THREADS', 4)
+
+# Load Django once in the master so workers share its pages copy-on-write
+preload_app = True
+
+# Recycle workers periodically; the jitter keeps them from restarting together
+max_requests = _env_int('WEB_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('WEB_MAX_REQUESTS_JITTER', 100)
+
+timeout = _env_int('WEB_TIMEOUT', 60)
+graceful_timeout = 30
+keepalive = 5
+
+# Keep the worker heartbeat off the (possibly slow) disk
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # Import the URLconf (and with it every view module) before forking, then
+    # move everything allocated so far out of the GC's reach so collections in
+    # the workers do not touch, and thereby copy, the shared pages.
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Never share database connections opened in the master with the workers
+    from django.db import connections
+    connections.close_all()